@@ -1,52 +1,142 @@
 import traceback
 import threading
-from flask import Flask, request, jsonify, render_template, redirect, url_for
+import time
+import uuid
+from flask import Flask, Blueprint, Response, current_app, request, g, jsonify, render_template, redirect, url_for
 import os
 import json
+from contextlib import contextmanager
 from werkzeug.utils import secure_filename
 
-from config import UPLOAD_FOLDER, ALLOWED_EXTENSIONS
-from indexing.document_parser import DocumentParser
-from indexing.embeddings import EmbeddingGenerator
-from indexing.vector_store import VectorStore
-from search.semantic_search import SemanticSearch
-from llm.llm_manager import LLMManager
-from utils.helpers import allowed_file, save_uploaded_file
-from utils.cache import ResponseCache
-from search.query_processor import QueryProcessor
-from database.db_manager import DatabaseManager
-
-# Initialize Flask app
-app = Flask(__name__)
-app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
-app.config['MAX_CONTENT_LENGTH'] = 15 * 1024 * 1024  # 15MB max upload size
-
-# Initialize components
-document_parser = DocumentParser()
-embedding_generator = EmbeddingGenerator()
-vector_store = VectorStore()
-llm_manager = LLMManager()
-db_manager = DatabaseManager()
-cache = ResponseCache(db_manager)
-search_engine = SemanticSearch(embedding_generator, vector_store)
-query_processor = QueryProcessor(search_engine, llm_manager, cache)
-
-# In-memory document storage
-documents = {}
-document_id_counter = 1
-
-
-@app.route('/')
+from config import (UPLOAD_FOLDER, ALLOWED_EXTENSIONS, INDEX_PATH, INBOX_FOLDER, RESET_ON_START,
+                    PRESUMMARIZE_ENABLED, SERVER_ROLE, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, DEFAULT_COLLECTION,
+                    MAX_UPLOAD_SIZE_MB, PERSIST_UPLOADS, CLIENT_ID_HEADER, CLIENT_PRIORITIES,
+                    DEFAULT_CLIENT_PRIORITY, LLM_PRIORITIES, reset_directory)
+from utils.helpers import allowed_file, upload_path, write_json_atomic, hash_stream
+from utils.uploads import UploadRequest, UploadPersister, upload_content
+from utils.admission import AdmissionController
+from utils.metrics import REGISTRY, REQUEST_SECONDS, span, start_request_timings, stop_request_timings
+
+bp = Blueprint('pdf_search', __name__)
+
+
+class AppComponents:
+    def __init__(self, role: str = SERVER_ROLE):
+        """
+        Build the search components for the given server role.
+
+        A "standalone" app ingests uploads itself. A "reader" app is one of
+        several workers serving the read-only index generations published by
+        ingest_worker.py, and only queues uploads for it.
+        """
+        # Imported here so that importing the app module stays cheap
+        from indexing.embeddings import EmbeddingGenerator
+        from indexing.vector_store import VectorStore
+        from indexing.collections import CollectionManager
+        from search.semantic_search import SemanticSearch
+        from search.query_processor import QueryProcessor
+        from llm.llm_manager import LLMManager
+        from llm.document_summarization import DocumentSummarizer
+        from utils.cache import ResponseCache
+        from database.db_manager import DatabaseManager
+        from database.document_registry import DocumentRegistry
+
+        if role not in ("standalone", "reader"):
+            raise ValueError(f"Unsupported server role: {role}")
+
+        self.role = role
+        self.embedding_generator = EmbeddingGenerator()
+        self.llm_manager = LLMManager()
+        self.db_manager = DatabaseManager()
+        self.cache = ResponseCache(self.db_manager)
+        self.registry = DocumentRegistry()
+        self.upload_persister = UploadPersister() if PERSIST_UPLOADS else None
+        self.admission = AdmissionController()
+
+        if role == "reader":
+            from indexing.generations import SharedIndexReader
+            self.vector_store = SharedIndexReader()
+        else:
+            self.vector_store = VectorStore()
+
+        self.search_engine = SemanticSearch(self.embedding_generator, self.vector_store)
+        self.query_processor = QueryProcessor(self.search_engine, self.llm_manager, self.cache, self.admission)
+        self.document_summarizer = DocumentSummarizer(self.query_processor.summarizer, self.registry)
+
+        # Named collections live next to the default index, which readers do not own
+        self.pipeline = None
+        self.collections = None
+        if role == "standalone":
+            self.collections = CollectionManager(self.vector_store, pipeline_factory=self._build_pipeline)
+            self.pipeline = self._build_pipeline(self.collections.default)
+            self.collections.default.pipeline = self.pipeline
+
+    def _build_pipeline(self, collection):
+        """Build the ingestion pipeline of a collection."""
+        from indexing.document_parser import DocumentParser
+        from indexing.pipeline import IngestionPipeline
+
+        presummarizer = None
+        if PRESUMMARIZE_ENABLED:
+            from llm.presummarization import PreSummarizer
+            presummarizer = PreSummarizer(self.query_processor.summarizer, collection.vector_store)
+        return IngestionPipeline(DocumentParser(), self.embedding_generator, collection.vector_store,
+                                 self.registry, presummarizer, collection=collection.name)
+
+
+def create_app(role: str = SERVER_ROLE) -> Flask:
+    """
+    Create the Flask app and build its components.
+    """
+    # Readers share the writer's index, so only a process that owns it may reset it
+    if RESET_ON_START and role == "standalone":
+        reset_directory(UPLOAD_FOLDER)
+        reset_directory(INDEX_PATH)
+
+    app = Flask(__name__)
+    # Uploads are parsed from the request buffer, spooled to disk past a threshold
+    app.request_class = UploadRequest
+    app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
+    app.config['MAX_CONTENT_LENGTH'] = MAX_UPLOAD_SIZE_MB * 1024 * 1024
+
+    app.extensions['pdf_search'] = AppComponents(role)
+    app.register_blueprint(bp)
+    return app
+
+
+def get_components() -> AppComponents:
+    """Get the components of the running app."""
+    return current_app.extensions['pdf_search']
+
+
+@bp.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+
+@bp.after_request
+def record_request_latency(response):
+    REQUEST_SECONDS.observe(time.perf_counter() - g.request_start,
+                            endpoint=request.endpoint or "unknown", method=request.method)
+    return response
+
+
+@bp.teardown_request
+def clear_request_timings(exc=None):
+    stop_request_timings()
+
+
+@bp.route('/')
 def index():
     return jsonify({
         "msg" : "Welcome!!!"
     })
-    
 
-@app.route('/upload', methods=['POST'])
+
+@bp.route('/upload', methods=['POST'])
 def upload_file():
     """Upload a PDF file."""
-    global document_id_counter
+    components = get_components()
 
     if 'file' not in request.files:
         return jsonify({'error': 'No file part'}), 400
@@ -58,89 +148,157 @@ def upload_file():
     if not file.filename.lower().endswith('.pdf'):
         return jsonify({'error': 'Only PDF files are allowed'}), 400
 
+    try:
+        collection_name = _get_collection_name(request.form.get('collection'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
     if file:
         try:
-            file_path = save_uploaded_file(file)
-            document_data = document_parser.process_document(file_path)
-
-            # Generate document ID
-            document_id = document_id_counter
-            document_id_counter += 1
-
-            documents[document_id] = {
-                'id': document_id,
-                'filename': document_data['filename'],
-                'path': file_path,
-                'title': document_data['title'],
-                'page_count': document_data['page_count'],
-                'chunks': [],
-                'indexed': False
-            }
-
-            all_chunks = document_data['chunks']
-            chunk_texts = [chunk['content'] for chunk in all_chunks]
-            chunk_embeddings = embedding_generator.get_embeddings(chunk_texts)
-
-            # Prepare metadata for each chunk
-            metadata_list = []
-            for i, chunk in enumerate(all_chunks):
-                metadata = {
-                    'document_id': document_id,
-                    'document_title': document_data['title'],
-                    'content': chunk['content'],
-                    'page_number': chunk['page_number'],
-                    'chunk_index': chunk['chunk_index']
-                }
-                metadata_list.append(metadata)
-
-            # Add embeddings to vector store
-            embedding_ids = vector_store.add_embeddings(chunk_embeddings, metadata_list)
-
-            # Store chunks in memory instead of database
-            for i, chunk in enumerate(all_chunks):
-                chunk_info = {
-                    'chunk_index': chunk['chunk_index'],
-                    'page_number': chunk['page_number'],
-                    'content': chunk['content'],
-                    'embedding_id': embedding_ids[i]
-                }
-                documents[document_id]['chunks'].append(chunk_info)
-
-            # Mark document as indexed
-            documents[document_id]['indexed'] = True
+            # Exact re-uploads are answered from the registry without parsing anything
+            file_hash = hash_stream(file.stream)
+            existing = components.registry.find_document_by_hash(file_hash, collection_name)
+            if existing:
+                return _duplicate_response(file, existing)
+
+            if components.pipeline is None:
+                return _queue_upload(file)
+
+            subfolder = None if collection_name == DEFAULT_COLLECTION else collection_name
+            file_path = upload_path(file.filename, subfolder)
+            with components.collections.use(collection_name, ingest=True) as collection, \
+                    upload_content(file.stream) as content:
+                document = collection.pipeline.ingest(file_path, file_hash=file_hash, content=content)
+            if document['duplicate']:
+                return _duplicate_response(file, document)
+            _persist_upload(file, file_path)
 
             # To clear all the cache present in the db
-            db_manager.clean_all_cache()
+            components.db_manager.clean_all_cache()
 
             return jsonify({
                 'success': True,
                 'message': f'File {file.filename} uploaded and indexed successfully',
-                'document_id': document_id
+                'document_id': document['id'],
+                'collection': collection_name,
+                'near_duplicate_chunks': document['near_duplicate_chunks'],
+                'presummarization': 'scheduled' if collection.pipeline.presummarizer else 'disabled'
             })
 
         except Exception as e:
             traceback.print_exc()
-            return jsonify({'error': str(e)}), 500
+            return jsonify({'error': str(e)}), _error_status(e)
 
     return jsonify({'error': 'File type not allowed'}), 400
 
 
-@app.route('/search', methods=['POST'])
+def _persist_upload(file, file_path):
+    """Keep a copy of a parsed upload in UPLOAD_FOLDER, written in the background."""
+    persister = get_components().upload_persister
+    if persister is not None:
+        persister.submit(file.stream, file_path)
+
+
+@bp.app_errorhandler(413)
+def upload_too_large(e):
+    return jsonify({'error': f'File too large: uploads are limited to {MAX_UPLOAD_SIZE_MB} MB'}), 413
+
+
+def _error_status(error):
+    """503 while no embedding model is available (retry later), 500 otherwise."""
+    from indexing.embeddings import EmbeddingUnavailableError
+    return 503 if isinstance(error, EmbeddingUnavailableError) else 500
+
+
+def _get_collection_name(name):
+    """
+    Validate a requested collection; readers only serve the default one.
+    """
+    from indexing.collections import validate_collection_name
+
+    if not name or name == DEFAULT_COLLECTION:
+        return DEFAULT_COLLECTION
+    validate_collection_name(name)
+    if get_components().collections is None:
+        raise ValueError("Named collections are only available in standalone mode")
+    return name
+
+
+def _duplicate_response(file, document):
+    """Answer an upload whose exact content is already registered."""
+    return jsonify({
+        'success': True,
+        'message': f'File {file.filename} was already uploaded as document {document["id"]}',
+        'document_id': document['id'],
+        'duplicate': True
+    })
+
+
+def _queue_upload(file):
+    """Hand an upload to the ingest worker and return its job ID."""
+    job_id = uuid.uuid4().hex
+    os.makedirs(INBOX_FOLDER, exist_ok=True)
+
+    write_json_atomic(os.path.join(INBOX_FOLDER, f"{job_id}.json"), {'filename': secure_filename(file.filename)})
+
+    # The worker only picks up *.pdf, so it never sees a partial file
+    part_path = os.path.join(INBOX_FOLDER, f"{job_id}.pdf.part")
+    file.save(part_path)
+    os.replace(part_path, os.path.join(INBOX_FOLDER, f"{job_id}.pdf"))
+
+    return jsonify({
+        'success': True,
+        'message': f'File {file.filename} queued for indexing',
+        'job_id': job_id
+    }), 202
+
+
+@bp.route('/upload/<job_id>', methods=['GET'])
+def get_upload_status(job_id):
+    """Get the status of a queued upload."""
+    from ingest_worker import job_result_path
+
+    job_id = secure_filename(job_id)
+    try:
+        with open(job_result_path(job_id), 'r') as f:
+            return jsonify(json.load(f))
+    except FileNotFoundError:
+        if os.path.exists(os.path.join(INBOX_FOLDER, f"{job_id}.pdf")):
+            return jsonify({'status': 'queued'})
+        return jsonify({'error': 'Upload job not found'}), 404
+
+
+@bp.route('/search', methods=['POST'])
 def search():
     """Search for documents."""
+    components = get_components()
+    cache = components.cache
+
     data = request.json
     query = data.get('query', '').strip()
-    
+
     detail_level = data.get('detail_level', 'medium')
 
     if not query:
         return jsonify({'error': 'Query is required'}), 400
 
     try:
-        result = cache.get_cached_response(query, data)
+        collection_name = _get_collection_name(data.get('collection'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if components.collections and not components.collections.exists(collection_name):
+        return jsonify({'error': f'Collection {collection_name} not found'}), 404
+
+    # Per-stage timings are only added to the response when asked for
+    timings = start_request_timings() if data.get('include_timings') else None
+    priority = _client_priority()
+
+    try:
+        with span("cache_lookup"):
+            result = cache.get_cached_response(query, data)
         if result:
             result["response_type"] = "Cache"
-            return jsonify(result)
+            return jsonify(_with_timings(result, timings))
     except:
         traceback.print_exc()
         print("error in retriving from cache")
@@ -148,48 +306,194 @@ def search():
 
     try:
         # Process the query
-        result = query_processor.process_query(query, detail_level)
-        cache_thread = threading.Thread(target=cache.cache_response, args=(query, result, data), daemon=True)
-        cache_thread.start()
-        return jsonify(result)
+        with span("query_processing"):
+            if collection_name == DEFAULT_COLLECTION:
+                result = components.query_processor.process_query(query, detail_level, priority=priority)
+            else:
+                with components.collections.use(collection_name) as collection:
+                    result = components.query_processor.process_query(query, detail_level, collection, priority)
+        # A degraded answer, or one found with the fallback embedding model, is not
+        # cached, so the next request can get the full one
+        primary_model = components.embedding_generator.primary_model
+        if not result.get('degraded') and result.get('embedding_model', primary_model) == primary_model:
+            cache_thread = threading.Thread(target=cache.cache_response, args=(query, result, data), daemon=True)
+            cache_thread.start()
+        return jsonify(_with_timings(result, timings))
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return jsonify({'error': str(e)}), _error_status(e)
+
+
+def _client_priority():
+    """Priority of the requesting client, from its CLIENT_ID_HEADER."""
+    priority = CLIENT_PRIORITIES.get(request.headers.get(CLIENT_ID_HEADER, ''), DEFAULT_CLIENT_PRIORITY)
+    return priority if priority in LLM_PRIORITIES else DEFAULT_CLIENT_PRIORITY
+
 
+def _with_timings(result, timings):
+    """Add the request's stage timings to a copy of the result, if collected."""
+    if timings is None:
+        return result
+    return {**result, 'timings': {stage: round(ms, 3) for stage, ms in timings.items()}}
 
-@app.route('/documents', methods=['GET'])
+
+def _get_page_args(limit_name: str, cursor_name: str):
+    """Read and bound the pagination arguments of a listing request."""
+    limit = request.args.get(limit_name, DEFAULT_PAGE_SIZE, type=int)
+    cursor = request.args.get(cursor_name, None, type=int)
+    return max(1, min(limit, MAX_PAGE_SIZE)), cursor
+
+
+@bp.route('/documents', methods=['GET'])
 def list_documents():
-    """List all documents."""
+    """List documents, one page at a time."""
     try:
-        document_list = [doc for doc_id, doc in documents.items()]
-        return jsonify({'documents': document_list})
+        limit, cursor = _get_page_args('limit', 'cursor')
+        fields = [f for f in request.args.get('fields', '').split(',') if f]
+        collection = request.args.get('collection')
+
+        document_list, next_cursor = get_components().registry.list_documents(limit, cursor, fields, collection)
+        return jsonify({'documents': document_list, 'next_cursor': next_cursor})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
-@app.route('/documents/<int:document_id>', methods=['GET'])
+@bp.route('/documents/<int:document_id>', methods=['GET'])
 def get_document(document_id):
-    """Get a specific document."""
+    """Get a specific document, optionally with a page of its chunks."""
     try:
-        document = documents.get(document_id)
-        if document:
-            return jsonify({'document': document})
-        else:
+        components = get_components()
+        fields = [f for f in request.args.get('fields', '').split(',') if f]
+
+        document = components.registry.get_document(document_id, fields)
+        if not document:
             return jsonify({'error': 'Document not found'}), 404
+
+        response = {'document': document}
+        if request.args.get('include_chunks', 'false').lower() == 'true':
+            limit, cursor = _get_page_args('chunk_limit', 'chunk_cursor')
+            chunks, next_cursor = components.registry.list_chunks(document_id, limit, cursor)
+
+            # Chunk text is only stored once, in the vector store metadata of the document's collection
+            with _document_store(document_id) as vector_store:
+                for chunk in chunks:
+                    metadata = vector_store.get_metadata(chunk['embedding_id']) or {}
+                    chunk['content'] = metadata.get('content')
+
+            response['chunks'] = chunks
+            response['next_chunk_cursor'] = next_cursor
+
+        return jsonify(response)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
-@app.route('/stats', methods=['GET'])
+@bp.route('/documents/<int:document_id>', methods=['PUT'])
+def replace_document(document_id):
+    """Replace a document with a new version of its PDF, re-embedding only changed chunks."""
+    components = get_components()
+
+    file = request.files.get('file')
+    if file is None or file.filename == '':
+        return jsonify({'error': 'No file part'}), 400
+    if not file.filename.lower().endswith('.pdf'):
+        return jsonify({'error': 'Only PDF files are allowed'}), 400
+    if components.pipeline is None:
+        return jsonify({'error': 'Documents can only be replaced in standalone mode'}), 400
+
+    try:
+        document = components.registry.get_document(document_id, ['collection'])
+        if not document:
+            return jsonify({'error': 'Document not found'}), 404
+
+        collection_name = document['collection']
+        file_hash = hash_stream(file.stream)
+        subfolder = None if collection_name == DEFAULT_COLLECTION else collection_name
+        file_path = upload_path(file.filename, subfolder)
+        with components.collections.use(collection_name, ingest=True) as collection, \
+                upload_content(file.stream) as content:
+            document = collection.pipeline.replace(document_id, file_path, file_hash=file_hash, content=content)
+        _persist_upload(file, file_path)
+
+        # Cached answers may quote the old version
+        components.db_manager.clean_all_cache()
+
+        return jsonify({
+            'success': True,
+            'message': f'Document {document_id} replaced with {file.filename}',
+            'document': document
+        })
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), _error_status(e)
+
+
+@bp.route('/documents/<int:document_id>/summary', methods=['GET'])
+def summarize_document(document_id):
+    """Summarize a whole document with map-reduce over its chunks."""
+    components = get_components()
+    detail_level = request.args.get('detail_level', 'medium')
+    if detail_level not in ('short', 'medium', 'detailed'):
+        return jsonify({'error': 'detail_level must be short, medium or detailed'}), 400
+
+    try:
+        if not components.registry.get_document(document_id, ['id']):
+            return jsonify({'error': 'Document not found'}), 404
+
+        with _document_store(document_id) as vector_store:
+            texts = components.document_summarizer.document_chunks(document_id, vector_store.get_metadata)
+        with span("document_summary"):
+            result = components.document_summarizer.summarize_texts(texts, detail_level)
+
+        return jsonify({'document_id': document_id, 'detail_level': detail_level, **result})
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
+
+
+@contextmanager
+def _document_store(document_id):
+    """
+    The vector store of a document's collection, kept loaded while in use.
+    """
+    components = get_components()
+    collection_name = components.registry.get_document(document_id, ['collection'])['collection']
+    if components.collections is None or collection_name == DEFAULT_COLLECTION:
+        yield components.vector_store
+    else:
+        with components.collections.use(collection_name) as collection:
+            yield collection.vector_store
+
+
+@bp.route('/stats', methods=['GET'])
 def get_stats():
     """Get API usage statistics."""
     try:
-        return jsonify({
-            'documents_count': len(documents),
+        components = get_components()
+        stats = {
+            'documents_count': components.registry.count_documents(),
             'cache_hits': 0  # Removed cache tracking
-        })
+        }
+        if components.collections:
+            stats['collections'] = components.collections.stats()
+        stats['embedding_models'] = components.embedding_generator.status()
+        stats['llm_providers'] = components.llm_manager.status()
+        stats['llm_admission'] = components.admission.status()
+        return jsonify(stats)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
+@bp.route('/metrics', methods=['GET'])
+def metrics():
+    """Expose request, stage and LLM metrics in Prometheus text format."""
+    return Response(REGISTRY.expose(), mimetype='text/plain; version=0.0.4')
+
+
 if __name__ == '__main__':
-    app.run(debug=False, port=5007)
\ No newline at end of file
+    create_app().run(debug=False, port=5007)
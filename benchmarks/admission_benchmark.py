@@ -0,0 +1,134 @@
+"""
+Bursty load against a rate-limited LLM, with and without admission control.
+
+Queries arrive faster than the stub provider can answer them and are handled
+by a fixed pool of worker threads, like a gunicorn worker's threads:
+
+    python -m benchmarks.admission_benchmark --requests 600 --rate 40
+    python -m benchmarks.admission_benchmark --max-concurrency 4 --queue-size 8 --queue-timeout 2
+
+A query answered after --request-timeout seconds counts as timed out: its
+client has given up. Each scenario reports, per priority, the queries
+answered by the LLM in time, the ones degraded to search results only, the
+ones that timed out, and their latency from arrival.
+"""
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional
+
+from benchmarks.run_benchmarks import latency_summary
+
+
+class RateLimitedLLM:
+    def __init__(self, capacity: int, latency: float):
+        """
+        Stub provider that serves `capacity` calls at a time; the rest wait their turn.
+        """
+        self.slots = threading.Semaphore(capacity)
+        self.latency = latency
+
+    def generate_response(self, prompt: str, temperature: float = 0.7,
+                          system_prompt: Optional[str] = None) -> str:
+        with self.slots:
+            time.sleep(self.latency)
+        return f"answer based on {len(prompt)} prompt characters"
+
+
+def run_scenario(name: str, admission, args) -> Dict[str, Any]:
+    llm = RateLimitedLLM(args.provider_capacity, args.llm_latency)
+    rng = random.Random(0)
+    priorities = rng.choices(["high", "normal", "low"], weights=[1, 3, 1], k=args.requests)
+    outcomes: List[Dict[str, Any]] = []
+    lock = threading.Lock()
+
+    def handle(priority: str, arrived: float) -> None:
+        shed_reason = None
+        if admission is None:
+            llm.generate_response("query")
+        else:
+            with admission.admit(priority) as shed_reason:
+                if shed_reason is None:
+                    llm.generate_response("query")
+        latency = time.perf_counter() - arrived
+        if shed_reason is not None:
+            outcome = "degraded"
+        elif latency > args.request_timeout:
+            outcome = "timed_out"
+        else:
+            outcome = "answered"
+        with lock:
+            outcomes.append({"priority": priority, "outcome": outcome, "latency": latency})
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        for priority in priorities:
+            # Poisson arrivals at the given rate
+            time.sleep(rng.expovariate(args.rate))
+            pool.submit(handle, priority, time.perf_counter())
+    elapsed = time.perf_counter() - start
+
+    by_priority = {}
+    for priority in ("high", "normal", "low"):
+        selected = [o for o in outcomes if o["priority"] == priority]
+        if not selected:
+            continue
+        by_priority[priority] = {
+            "requests": len(selected),
+            **{outcome: sum(1 for o in selected if o["outcome"] == outcome)
+               for outcome in ("answered", "degraded", "timed_out")},
+            "latency": latency_summary([o["latency"] for o in selected])
+        }
+    answered = sum(1 for o in outcomes if o["outcome"] == "answered")
+    return {
+        "scenario": name,
+        "seconds": round(elapsed, 2),
+        "answered_pct": round(100 * answered / len(outcomes), 1),
+        "timed_out_pct": round(100 * sum(1 for o in outcomes if o["outcome"] == "timed_out") / len(outcomes), 1),
+        "latency": latency_summary([o["latency"] for o in outcomes]),
+        "by_priority": by_priority,
+        "admission": admission.status() if admission is not None else None
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark LLM admission control under bursty load.")
+    parser.add_argument("--requests", type=int, default=400, help="Queries sent")
+    parser.add_argument("--rate", type=float, default=30.0, help="Mean arrivals per second")
+    parser.add_argument("--workers", type=int, default=32, help="Worker threads handling queries")
+    parser.add_argument("--provider-capacity", type=int, default=4, help="Concurrent calls the provider serves")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Seconds per LLM call")
+    parser.add_argument("--request-timeout", type=float, default=5.0, help="Seconds before a client gives up")
+    parser.add_argument("--max-concurrency", type=int, default=4, help="LLM_MAX_CONCURRENCY")
+    parser.add_argument("--queue-size", type=int, default=16, help="LLM_QUEUE_SIZE")
+    parser.add_argument("--queue-timeout", type=float, default=2.0, help="LLM_QUEUE_TIMEOUT_SECONDS")
+    parser.add_argument("--output", help="Also write the JSON results to this file")
+    args = parser.parse_args()
+
+    from utils.admission import AdmissionController
+
+    results = {
+        "requests": args.requests,
+        "rate": args.rate,
+        "provider_capacity_per_sec": round(args.provider_capacity / args.llm_latency, 1),
+        "scenarios": [
+            run_scenario("no_admission", None, args),
+            run_scenario("admission", AdmissionController(args.max_concurrency, args.queue_size,
+                                                          args.queue_timeout), args)
+        ]
+    }
+
+    output = json.dumps(results, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
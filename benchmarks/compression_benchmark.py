@@ -0,0 +1,70 @@
+"""
+Bytes per vector vs recall for the compressed index options of VectorStore.
+
+Each configuration indexes the same vectors; recall@k is measured against an
+exact full-precision scan:
+
+    python -m benchmarks.compression_benchmark --vectors 50000 --subquantizers 48,96
+    python -m benchmarks.compression_benchmark --embeddings index/document_index.vectors.npy
+
+Compressed configurations take RERANK_CANDIDATES candidates from the codes and
+re-score them against the memory-mapped full vectors, as served.
+"""
+import sys
+import json
+import shutil
+import argparse
+import tempfile
+
+from config import EMBEDDING_DIMENSION, RERANK_CANDIDATES
+from benchmarks.reduction_benchmark import load_dataset, bench_config
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark vector compression: bytes per vector vs recall.")
+    parser.add_argument("--embeddings", help=".npy file of corpus vectors (default: synthetic)")
+    parser.add_argument("--vectors", type=int, default=20000, help="Synthetic corpus size")
+    parser.add_argument("--dimension", type=int, default=EMBEDDING_DIMENSION, help="Synthetic vector dimension")
+    parser.add_argument("--subquantizers", default="48,96",
+                        help="Comma-separated PQ sub-quantizer counts; each must divide the dimension")
+    parser.add_argument("--pca-dimension", type=int, default=0,
+                        help="Also run PCA reduction to this dimension followed by PQ")
+    parser.add_argument("--queries", type=int, default=200, help="Queries, held out from the corpus")
+    parser.add_argument("--k", type=int, default=10, help="Results per query")
+    parser.add_argument("--output", help="Also write the JSON results to this file")
+    args = parser.parse_args()
+
+    vectors, queries, exact = load_dataset(args.embeddings, args.vectors, args.dimension, args.queries, args.k)
+    dimension = vectors.shape[1]
+
+    configs = [{"compression": "none"}, {"compression": "sq8"}]
+    for m in (int(m) for m in args.subquantizers.split(",")):
+        if dimension % m:
+            print(f"Skipping pq with {m} sub-quantizers: {dimension} is not a multiple of it")
+            continue
+        configs.append({"compression": "pq", "pq_subquantizers": m})
+        if args.pca_dimension and args.pca_dimension % m == 0:
+            configs.append({"reduction": "pca", "reduced_dimension": args.pca_dimension,
+                            "compression": "pq", "pq_subquantizers": m})
+
+    workdir = tempfile.mkdtemp(prefix="pdf-search-compression-")
+    try:
+        results = {
+            "vectors": len(vectors),
+            "dimension": dimension,
+            "rerank_candidates": RERANK_CANDIDATES,
+            "configurations": [bench_config(workdir, vectors, queries, exact, args.k, **config) for config in configs]
+        }
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    output = json.dumps(results, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,175 @@
+"""
+Concurrency stress test of VectorStore: searches while a writer ingests.
+
+One writer thread adds batches of vectors, tombstones some of them and
+updates metadata, while reader threads search without pause:
+
+    python -m benchmarks.concurrency_stress --batches 2000 --readers 8
+    python -m benchmarks.concurrency_stress --compression sq8 --persist-every 10
+    python -m benchmarks.concurrency_stress --compression pq --dimension 96 --subquantizers 12
+
+Every search result is checked against the snapshot semantics: it has
+metadata, its score is the inner product with the vector it names, it is
+not deleted, and a search returns top_k results once that many are live.
+Exits non-zero on any violation or exception.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import threading
+import numpy as np
+from typing import Dict, Any, List
+
+from config import PQ_SUBQUANTIZERS
+from benchmarks.run_benchmarks import latency_summary
+
+
+def run(args) -> Dict[str, Any]:
+    from indexing.vector_store import VectorStore
+
+    workdir = tempfile.mkdtemp(prefix="stress-")
+    store = VectorStore(os.path.join(workdir, "index.faiss"), os.path.join(workdir, "metadata.json"),
+                        args.dimension, reduction="none", compression=args.compression,
+                        pq_subquantizers=args.subquantizers)
+
+    rng = np.random.default_rng(0)
+    total = args.batches * args.batch_size
+    vectors = rng.standard_normal((total, args.dimension)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    done = threading.Event()
+    violations: List[str] = []
+    samples: List[float] = []
+    stats = {"searches": 0, "results": 0, "max_segments": 1, "deleted": 0}
+    lock = threading.Lock()
+
+    def violation(message: str) -> None:
+        with lock:
+            if len(violations) < 20:
+                violations.append(message)
+
+    def add_batch(batch: int) -> None:
+        start = batch * args.batch_size
+        rows = range(start, start + args.batch_size)
+        ids = store.add_embeddings(list(vectors[start:start + args.batch_size]),
+                                   [{"row": row, "version": 0} for row in rows], persist=False)
+        # Tombstone a few vectors and rewrite the metadata of others
+        store.delete_embeddings(ids[:args.deletes_per_batch], persist=False)
+        store.update_metadata({embedding_id: {"version": batch} for embedding_id in ids[-5:]}, persist=False)
+        with lock:
+            stats["max_segments"] = max(stats["max_segments"], len(store._snapshot.segments))
+            stats["deleted"] += args.deletes_per_batch
+        if args.persist_every and (batch + 1) % args.persist_every == 0:
+            store.save()
+
+    def writer() -> None:
+        try:
+            for batch in range(1, args.batches):
+                add_batch(batch)
+        except Exception as e:
+            violation(f"writer: {type(e).__name__}: {e}")
+        finally:
+            done.set()
+
+    def reader(seed: int) -> None:
+        reader_rng = np.random.default_rng(seed)
+        local_samples = []
+        while not done.is_set():
+            query = vectors[reader_rng.integers(total)]
+            # Live vectors before the search: the snapshot it uses has at least as many
+            live = store._snapshot.ntotal - store._snapshot.deleted_count
+            try:
+                t0 = time.perf_counter()
+                results = store.search(query, args.k)
+                local_samples.append(time.perf_counter() - t0)
+            except Exception as e:
+                violation(f"search: {type(e).__name__}: {e}")
+                continue
+
+            if live >= args.k and len(results) != args.k:
+                violation(f"{len(results)} results with {live} live vectors")
+            for result in results:
+                metadata = result["metadata"]
+                if metadata is None or "row" not in metadata:
+                    violation(f"result without metadata: {metadata}")
+                    continue
+                if metadata.get("deleted"):
+                    violation(f"deleted vector returned: {metadata['embedding_id']}")
+                expected = float(vectors[metadata["row"]] @ query)
+                if abs(result["distance"] - expected) > 1e-3:
+                    violation(f"score {result['distance']:.4f} does not match vector {metadata['row']} "
+                              f"({expected:.4f})")
+            with lock:
+                stats["searches"] += 1
+                stats["results"] += len(results)
+
+        with lock:
+            samples.extend(local_samples)
+
+    # Readers start once there is something to find
+    add_batch(0)
+    threads = [threading.Thread(target=reader, args=(seed,)) for seed in range(args.readers)]
+    for thread in threads:
+        thread.start()
+    start = time.perf_counter()
+    writer()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    store.save()
+    reloaded = VectorStore(os.path.join(workdir, "index.faiss"), os.path.join(workdir, "metadata.json"),
+                           args.dimension, reduction="none", compression=args.compression,
+                           pq_subquantizers=args.subquantizers)
+    if reloaded.index.ntotal != total or reloaded.deleted_count != stats["deleted"]:
+        violation(f"reloaded store has {reloaded.index.ntotal} vectors and {reloaded.deleted_count} deleted")
+    shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        "compression": args.compression,
+        "vectors": total,
+        "readers": args.readers,
+        "seconds": round(elapsed, 2),
+        "writes_per_sec": round(args.batches / elapsed, 1),
+        "searches": stats["searches"],
+        "max_segments": stats["max_segments"],
+        "search": latency_summary(samples) if samples else None,
+        "violations": violations
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Stress concurrent VectorStore searches during ingestion.")
+    parser.add_argument("--batches", type=int, default=1000, help="Batches added by the writer")
+    parser.add_argument("--batch-size", type=int, default=50, help="Vectors per batch")
+    parser.add_argument("--deletes-per-batch", type=int, default=2, help="Vectors deleted after each batch")
+    parser.add_argument("--dimension", type=int, default=64, help="Vector dimension")
+    parser.add_argument("--compression", default="none", choices=("none", "sq8", "pq"), help="Index compression")
+    parser.add_argument("--subquantizers", type=int,
+                        help="PQ subquantizers (default: the largest divisor of --dimension up to PQ_SUBQUANTIZERS)")
+    parser.add_argument("--readers", type=int, default=4, help="Concurrent search threads")
+    parser.add_argument("--k", type=int, default=10, help="Results per search")
+    parser.add_argument("--persist-every", type=int, default=0, help="Save every N batches (0: only at the end)")
+    parser.add_argument("--output", help="Also write the JSON results to this file")
+    args = parser.parse_args()
+    if args.subquantizers is None:
+        args.subquantizers = max(m for m in range(1, min(PQ_SUBQUANTIZERS, args.dimension) + 1)
+                                 if args.dimension % m == 0)
+    elif args.compression == "pq" and args.dimension % args.subquantizers:
+        parser.error(f"--dimension {args.dimension} is not divisible by --subquantizers {args.subquantizers}")
+
+    result = run(args)
+    output = json.dumps(result, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    return 1 if result["violations"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
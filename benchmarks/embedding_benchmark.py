@@ -0,0 +1,103 @@
+"""
+CPU throughput of the local embedding backends.
+
+Compares the previous local path (fp32 PyTorch, one process, default batch
+size) with the LocalEncoder backends on the same synthetic chunks:
+
+    python -m benchmarks.embedding_benchmark --texts 5000 --processes 4
+    python -m benchmarks.embedding_benchmark --backends torch,onnx-int8 --batch-sizes 32,128
+
+Each configuration reports texts/sec for bulk calls, single-query latency and
+the mean cosine similarity of its vectors to the baseline's, so a faster but
+lossy backend (int8) shows what it costs. Needs sentence-transformers, and
+optimum[onnxruntime] for the ONNX backends.
+"""
+import sys
+import json
+import time
+import argparse
+import numpy as np
+from typing import List, Dict, Any, Optional, Tuple
+
+from config import LOCAL_EMBEDDING_MODEL, LOCAL_EMBEDDING_QUANTIZATION, MODEL_CACHE_PATH
+from benchmarks.run_benchmarks import latency_summary, time_calls, peak_rss_mb
+from benchmarks.synthetic import make_chunks, make_queries
+
+
+def encode_in_calls(encode, texts: List[str], call_size: int) -> np.ndarray:
+    return np.vstack([encode(texts[start:start + call_size]) for start in range(0, len(texts), call_size)])
+
+
+def measure(name: str, encode, texts: List[str], queries: List[str], call_size: int,
+            baseline: Optional[np.ndarray] = None) -> Tuple[Dict[str, Any], np.ndarray]:
+    """Throughput, query latency and agreement with the baseline vectors."""
+    encode(texts[:call_size])  # warm-up: model load, pool start, graph optimization
+
+    start = time.perf_counter()
+    vectors = encode_in_calls(encode, texts, call_size)
+    seconds = time.perf_counter() - start
+
+    vectors = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    result = {
+        "config": name,
+        "texts_per_sec": round(len(texts) / seconds, 1),
+        "query": latency_summary(time_calls(lambda query: encode([query]), queries)),
+        "peak_rss_mb": peak_rss_mb()
+    }
+    if baseline is not None:
+        result["mean_cosine_to_baseline"] = round(float(np.mean(np.sum(vectors * baseline, axis=1))), 4)
+    return result, vectors
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark local CPU embedding backends.")
+    parser.add_argument("--model", default=LOCAL_EMBEDDING_MODEL, help="SentenceTransformer model")
+    parser.add_argument("--texts", type=int, default=2000, help="Synthetic chunks to embed")
+    parser.add_argument("--queries", type=int, default=50, help="Single-text calls timed for latency")
+    parser.add_argument("--call-size", type=int, default=1000, help="Texts per encode call")
+    parser.add_argument("--backends", default="torch,onnx,onnx-int8", help="Comma-separated backends")
+    parser.add_argument("--batch-sizes", default="64", help="Comma-separated batch sizes")
+    parser.add_argument("--processes", type=int, default=0, help="Also run torch with this many processes")
+    parser.add_argument("--quantization", default=LOCAL_EMBEDDING_QUANTIZATION, help="Config for onnx-int8")
+    parser.add_argument("--output", help="Also write the JSON results to this file")
+    args = parser.parse_args()
+
+    from sentence_transformers import SentenceTransformer
+    from indexing.local_embeddings import LocalEncoder
+
+    texts = make_chunks(args.texts)
+    queries = make_queries(args.queries)
+
+    # The local path before LocalEncoder: fp32, in-process, encode() defaults
+    model = SentenceTransformer(args.model, device="cpu")
+    baseline_result, baseline = measure("baseline", model.encode, texts, queries, args.call_size)
+    results = [baseline_result]
+
+    configs = [(backend, int(batch_size), 0) for backend in args.backends.split(",")
+               for batch_size in args.batch_sizes.split(",")]
+    if args.processes > 1:
+        configs.append(("torch", int(args.batch_sizes.split(",")[0]), args.processes))
+
+    for backend, batch_size, processes in configs:
+        name = f"{backend}/batch={batch_size}" + (f"/processes={processes}" if processes else "")
+        encoder = LocalEncoder(args.model, backend, batch_size=batch_size, processes=processes,
+                               quantization=args.quantization, cache_dir=MODEL_CACHE_PATH)
+        try:
+            result, _ = measure(name, encoder.encode, texts, queries, args.call_size, baseline)
+            results.append(result)
+        except Exception as e:
+            results.append({"config": name, "error": str(e)})
+        finally:
+            encoder.close()
+
+    output = json.dumps({"model": args.model, "texts": len(texts), "call_size": args.call_size,
+                         "configurations": results}, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,81 @@
+"""
+Tail latency of LLMManager with and without hedging, on stub providers.
+
+The primary and backup stubs draw their latency from a heavy-tailed
+distribution (mostly fast, occasionally very slow) and can be made to fail:
+
+    python -m benchmarks.hedging_benchmark --requests 500
+    python -m benchmarks.hedging_benchmark --primary-failure-rate 0.3
+
+Each scenario reports p50/p95/p99 latency, the error count and the extra
+provider calls that hedging costs.
+"""
+import sys
+import json
+import random
+import argparse
+from typing import Dict, Any, Callable
+
+from benchmarks.stubs import StubLLMProvider
+from benchmarks.run_benchmarks import latency_summary, time_calls
+
+
+def heavy_tail(median: float, slow: float, slow_share: float, seed: int) -> Callable[[], float]:
+    """Latency sampler: around `median`, but `slow` seconds for a share of calls."""
+    rng = random.Random(seed)
+    return lambda: slow if rng.random() < slow_share else rng.lognormvariate(0, 0.25) * median
+
+
+def run_scenario(name: str, hedging: bool, requests: int, args) -> Dict[str, Any]:
+    from llm.llm_manager import LLMManager
+
+    primary = StubLLMProvider("primary", heavy_tail(args.median, args.slow, args.slow_share, 1),
+                              failure_rate=args.primary_failure_rate, seed=1)
+    backup = StubLLMProvider("backup", heavy_tail(args.median, args.slow, args.slow_share, 2), seed=2)
+    manager = LLMManager(providers=[primary, backup], hedging=hedging)
+
+    errors = 0
+
+    def call(prompt: str) -> None:
+        nonlocal errors
+        try:
+            manager.generate_response(prompt)
+        except Exception:
+            errors += 1
+
+    samples = time_calls(call, [f"prompt {i}" for i in range(requests)], warmup=0)
+    return {
+        "scenario": name,
+        "latency": latency_summary(samples),
+        "errors": errors,
+        "provider_calls": {"primary": primary.calls, "backup": backup.calls},
+        "extra_calls_pct": round(100 * ((primary.calls + backup.calls) / requests - 1), 1),
+        "health": manager.status()
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark hedged LLM requests on stub providers.")
+    parser.add_argument("--requests", type=int, default=300, help="Sequential requests per scenario")
+    parser.add_argument("--median", type=float, default=0.02, help="Typical latency (seconds)")
+    parser.add_argument("--slow", type=float, default=0.5, help="Latency of a slow call (seconds)")
+    parser.add_argument("--slow-share", type=float, default=0.03, help="Share of slow calls")
+    parser.add_argument("--primary-failure-rate", type=float, default=0.0, help="Share of primary calls that fail")
+    parser.add_argument("--output", help="Also write the JSON results to this file")
+    args = parser.parse_args()
+
+    results = [
+        run_scenario("failover only", False, args.requests, args),
+        run_scenario("hedging", True, args.requests, args)
+    ]
+
+    output = json.dumps(results, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
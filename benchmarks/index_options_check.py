@@ -0,0 +1,104 @@
+"""
+Check every VECTOR_REDUCTION x VECTOR_COMPRESSION pair of VectorStore.
+
+Each store gets vectors in batches across its training threshold, and is
+searched, saved and reloaded along the way:
+
+    python -m benchmarks.index_options_check
+    python -m benchmarks.index_options_check --dimension 768 --reduced-dimension 256 --subquantizers 32
+
+A search must find a stored vector as its own nearest neighbour with its
+full-precision score. Exits non-zero if any pair fails.
+"""
+import os
+import sys
+import json
+import shutil
+import argparse
+import tempfile
+import traceback
+import numpy as np
+from typing import Dict, Any
+
+from config import INDEX_TRAINING_SIZE
+
+REDUCTIONS = ("none", "pca", "matryoshka")
+COMPRESSIONS = ("none", "sq8", "pq")
+
+
+def check_pair(workdir: str, vectors: np.ndarray, reduction: str, compression: str, args) -> Dict[str, Any]:
+    from indexing.vector_store import VectorStore
+
+    store_dir = tempfile.mkdtemp(dir=workdir)
+
+    def open_store():
+        return VectorStore(os.path.join(store_dir, "index.faiss"), os.path.join(store_dir, "metadata.json"),
+                           vectors.shape[1], reduction=reduction, reduced_dimension=args.reduced_dimension,
+                           compression=compression, pq_subquantizers=args.subquantizers)
+
+    store = open_store()
+    stages = []
+    for offset in range(0, len(vectors), args.batch_size):
+        batch = vectors[offset:offset + args.batch_size]
+        store.add_embeddings(list(batch), [{"row": offset + i} for i in range(len(batch))], persist=False)
+        stages.append(type(store._snapshot.segments[0][1]).__name__)
+
+        # The latest vector is its own nearest neighbour, scored at full precision
+        row = offset + len(batch) - 1
+        results = store.search(vectors[row], 1)
+        if not results or results[0]["metadata"]["row"] != row or abs(results[0]["distance"] - 1.0) > 1e-3:
+            raise AssertionError(f"vector {row} not found after {row + 1} vectors: {results[:1]}")
+
+        if offset == 0:
+            store.save()
+            store = open_store()
+
+    store.save()
+    reloaded = open_store()
+    if reloaded.index.ntotal != len(vectors) or not reloaded.search(vectors[0], 1):
+        raise AssertionError(f"reloaded store has {reloaded.index.ntotal} vectors")
+
+    return {"index_types": list(dict.fromkeys(stages)), "uses_candidates": reloaded.uses_candidates}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Check every vector reduction and compression pair.")
+    parser.add_argument("--dimension", type=int, default=64, help="Vector dimension")
+    parser.add_argument("--reduced-dimension", type=int, default=32, help="REDUCED_DIMENSION")
+    parser.add_argument("--subquantizers", type=int, default=8, help="PQ_SUBQUANTIZERS")
+    parser.add_argument("--batch-size", type=int, default=400, help="Vectors per batch")
+    parser.add_argument("--output", help="Also write the JSON results to this file")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    count = max(INDEX_TRAINING_SIZE, 256) + 2 * args.batch_size
+    vectors = rng.standard_normal((count, args.dimension)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    results, failures = [], 0
+    workdir = tempfile.mkdtemp(prefix="pdf-search-index-options-")
+    try:
+        for reduction in REDUCTIONS:
+            for compression in COMPRESSIONS:
+                result = {"reduction": reduction, "compression": compression}
+                try:
+                    result.update(check_pair(workdir, vectors, reduction, compression, args))
+                    result["ok"] = True
+                except Exception as e:
+                    traceback.print_exc()
+                    result.update({"ok": False, "error": f"{type(e).__name__}: {e}"})
+                    failures += 1
+                results.append(result)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    output = json.dumps({"vectors": count, "dimension": args.dimension, "pairs": results}, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
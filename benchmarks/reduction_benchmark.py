@@ -0,0 +1,127 @@
+"""
+Memory saved vs recall for the vector reduction options of VectorStore.
+
+Each configuration indexes the same vectors; recall@k is measured against an
+exact full-dimension scan:
+
+    python -m benchmarks.reduction_benchmark --vectors 50000 --dims 128,256,384
+    python -m benchmarks.reduction_benchmark --embeddings index/document_index.vectors.npy
+
+Synthetic vectors have a decaying per-coordinate variance, like real
+embeddings (and Matryoshka-trained ones in particular); pass --embeddings
+with exported vectors for numbers that reflect a real model.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import numpy as np
+from typing import List, Dict, Any
+
+from config import EMBEDDING_DIMENSION, RERANK_CANDIDATES
+from benchmarks.run_benchmarks import latency_summary
+
+
+def synthetic_vectors(count: int, dimension: int, seed: int = 0) -> np.ndarray:
+    """Unit vectors whose coordinate variance decays with the coordinate index."""
+    rng = np.random.RandomState(seed)
+    scales = 1.0 / np.sqrt(1.0 + np.arange(dimension) / 8.0)
+    vectors = (rng.randn(count, dimension) * scales).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def load_dataset(embeddings: str, count: int, dimension: int, queries: int, k: int):
+    """Corpus vectors, held-out queries and their exact top-k neighbours."""
+    if embeddings:
+        data = np.asarray(np.load(embeddings, mmap_mode='r'), dtype=np.float32)
+    else:
+        data = synthetic_vectors(count + queries, dimension)
+    vectors, query_vectors = data[:-queries], data[-queries:]
+    exact = np.argsort(-(query_vectors @ vectors.T), axis=1)[:, :k]
+    return vectors, query_vectors, exact
+
+
+def recall_at_k(found: List[List[int]], exact: np.ndarray, k: int) -> float:
+    hits = sum(len(set(ids[:k]) & set(truth[:k].tolist())) for ids, truth in zip(found, exact))
+    return round(hits / (k * len(exact)), 4)
+
+
+def bench_config(workdir: str, vectors: np.ndarray, queries: np.ndarray, exact: np.ndarray, k: int,
+                 **store_options) -> Dict[str, Any]:
+    """Build a VectorStore with the given options and measure it."""
+    from indexing.vector_store import VectorStore
+
+    store_dir = tempfile.mkdtemp(dir=workdir)
+    store = VectorStore(os.path.join(store_dir, "index.faiss"), os.path.join(store_dir, "metadata.json"),
+                        vectors.shape[1], **store_options)
+
+    start = time.perf_counter()
+    for offset in range(0, len(vectors), 10000):
+        batch = vectors[offset:offset + 10000]
+        store.add_embeddings(list(batch), [{"row": offset + i} for i in range(len(batch))], persist=False)
+    build_seconds = time.perf_counter() - start
+
+    found, samples = [], []
+    for query in queries:
+        t0 = time.perf_counter()
+        results = store.search(query, k)
+        samples.append(time.perf_counter() - t0)
+        found.append([result["metadata"]["row"] for result in results])
+
+    full_bytes = len(vectors) * vectors.shape[1] * 4
+    resident_bytes = store.index.ntotal * store.index.sa_code_size()
+    return {
+        **store_options,
+        "index_type": type(store.index).__name__,
+        "index_dimension": store.index.d,
+        "bytes_per_vector": store.index.sa_code_size(),
+        "resident_index_bytes": resident_bytes,
+        "memory_saved_pct": round(100 * (1 - resident_bytes / full_bytes), 1),
+        "on_disk_full_vector_bytes": store.full_vectors.count * vectors.shape[1] * 4 if store.full_vectors else 0,
+        f"recall@{k}": recall_at_k(found, exact, k),
+        "build_seconds": round(build_seconds, 3),
+        "search": latency_summary(samples)
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark vector reduction: memory saved vs recall.")
+    parser.add_argument("--embeddings", help=".npy file of corpus vectors (default: synthetic)")
+    parser.add_argument("--vectors", type=int, default=20000, help="Synthetic corpus size")
+    parser.add_argument("--dimension", type=int, default=EMBEDDING_DIMENSION, help="Synthetic vector dimension")
+    parser.add_argument("--dims", default="128,256", help="Comma-separated reduced dimensions")
+    parser.add_argument("--queries", type=int, default=200, help="Queries, held out from the corpus")
+    parser.add_argument("--k", type=int, default=10, help="Results per query")
+    parser.add_argument("--output", help="Also write the JSON results to this file")
+    args = parser.parse_args()
+
+    vectors, queries, exact = load_dataset(args.embeddings, args.vectors, args.dimension, args.queries, args.k)
+
+    workdir = tempfile.mkdtemp(prefix="pdf-search-reduction-")
+    try:
+        configs = [{"reduction": "none"}] + [
+            {"reduction": kind, "reduced_dimension": int(dim)}
+            for dim in args.dims.split(",") for kind in ("pca", "matryoshka")
+        ]
+        results = {
+            "vectors": len(vectors),
+            "dimension": vectors.shape[1],
+            "rerank_candidates": RERANK_CANDIDATES,
+            "configurations": [bench_config(workdir, vectors, queries, exact, args.k, **config) for config in configs]
+        }
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    output = json.dumps(results, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,125 @@
+"""
+Recall vs vectors scanned for two-stage (document-routed) retrieval.
+
+Chunks are grouped into documents; every query is answered by the flat scan
+and by routed searches that only score the chunks of the top-N documents
+by centroid. Recall@k is measured against the flat scan:
+
+    python -m benchmarks.routing_benchmark --documents 2000 --chunks-per-document 50
+    python -m benchmarks.routing_benchmark --top-documents 10,25,50,100 --spread 1.5
+
+Synthetic documents have a topic vector; their chunks are the topic plus
+--spread times as much noise, so higher spreads make documents less
+separable by their centroid. Queries are perturbed chunks of random
+documents, like a question about one passage.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import numpy as np
+from typing import List, Dict, Any
+
+from benchmarks.run_benchmarks import latency_summary
+from benchmarks.reduction_benchmark import recall_at_k
+
+
+def synthetic_documents(documents: int, chunks_per_document: int, dimension: int, spread: float,
+                        seed: int = 0):
+    """Unit chunk vectors and the document of each."""
+    rng = np.random.RandomState(seed)
+    topics = rng.randn(documents, dimension).astype(np.float32)
+    topics /= np.linalg.norm(topics, axis=1, keepdims=True)
+    owners = np.repeat(np.arange(documents), chunks_per_document)
+    noise = rng.randn(len(owners), dimension).astype(np.float32) * spread / np.sqrt(dimension)
+    vectors = topics[owners] + noise
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True), owners
+
+
+def synthetic_queries(vectors: np.ndarray, count: int, seed: int = 1) -> np.ndarray:
+    """Queries close to randomly chosen chunks."""
+    rng = np.random.RandomState(seed)
+    queries = vectors[rng.randint(len(vectors), size=count)]
+    queries = queries + rng.randn(*queries.shape).astype(np.float32) * 0.5 / np.sqrt(vectors.shape[1])
+    return queries / np.linalg.norm(queries, axis=1, keepdims=True)
+
+
+def measure(store, queries: np.ndarray, k: int) -> Dict[str, Any]:
+    found, samples = [], []
+    for query in queries:
+        t0 = time.perf_counter()
+        results = store.search(query, k)
+        samples.append(time.perf_counter() - t0)
+        found.append([result["metadata"]["row"] for result in results])
+    return {"found": found, "search": latency_summary(samples)}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark document-routed search against the flat scan.")
+    parser.add_argument("--documents", type=int, default=1000, help="Synthetic documents")
+    parser.add_argument("--chunks-per-document", type=int, default=50, help="Chunks per document")
+    parser.add_argument("--dimension", type=int, default=384, help="Vector dimension")
+    parser.add_argument("--spread", type=float, default=2.0, help="Chunk noise relative to the topic")
+    parser.add_argument("--top-documents", default="5,10,25,50,100",
+                        help="Comma-separated numbers of documents to route to")
+    parser.add_argument("--queries", type=int, default=200, help="Queries")
+    parser.add_argument("--k", type=int, default=10, help="Results per query")
+    parser.add_argument("--output", help="Also write the JSON results to this file")
+    args = parser.parse_args()
+
+    from indexing.vector_store import VectorStore
+
+    vectors, owners = synthetic_documents(args.documents, args.chunks_per_document, args.dimension, args.spread)
+    queries = synthetic_queries(vectors, args.queries)
+
+    workdir = tempfile.mkdtemp(prefix="pdf-search-routing-")
+    try:
+        store = VectorStore(os.path.join(workdir, "index.faiss"), os.path.join(workdir, "metadata.json"),
+                            args.dimension, reduction="none", compression="none",
+                            routing_top_documents=1, routing_min_documents=1)
+        for offset in range(0, len(vectors), 10000):
+            batch = vectors[offset:offset + 10000]
+            store.add_embeddings(list(batch), [{"row": offset + i, "document_id": int(owners[offset + i])}
+                                               for i in range(len(batch))], persist=False)
+
+        # The flat scan is the reference routed searches are measured against
+        store.routing_min_documents = args.documents + 1
+        flat = measure(store, queries, args.k)
+        exact = np.asarray(flat["found"])
+        store.routing_min_documents = 1
+
+        configs = []
+        for top_documents in [int(n) for n in args.top_documents.split(",")]:
+            store.routing_top_documents = top_documents
+            routed = measure(store, queries, args.k)
+            configs.append({
+                "top_documents": top_documents,
+                "vectors_scanned_pct": round(100 * min(top_documents, args.documents) / args.documents, 2),
+                f"recall@{args.k}": recall_at_k(routed["found"], exact, args.k),
+                "search": routed["search"]
+            })
+
+        results = {
+            "documents": args.documents,
+            "vectors": len(vectors),
+            "dimension": args.dimension,
+            "spread": args.spread,
+            "flat": {"search": flat["search"]},
+            "routed": configs
+        }
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    output = json.dumps(results, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,169 @@
+"""
+Benchmark suite for ingest throughput, search latency and memory.
+
+Uses synthetic PDFs and local deterministic stand-ins for the embedding and
+LLM providers, and prints the results as JSON so runs can be compared:
+
+    python -m benchmarks.run_benchmarks --sizes 1000,10000,50000 --output bench.json
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import resource
+import argparse
+import tempfile
+import numpy as np
+from typing import List, Dict, Any, Callable
+
+from config import EMBEDDING_DIMENSION
+from benchmarks.stubs import HashingEmbeddingGenerator, StubLLMManager, NullCache
+from benchmarks.synthetic import generate_pdf, make_chunks, make_queries
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def latency_summary(samples: List[float]) -> Dict[str, float]:
+    """p50/p95/p99 and mean of latency samples, in milliseconds."""
+    values = np.array(samples) * 1000
+    return {
+        "count": len(samples),
+        "mean_ms": round(float(values.mean()), 3),
+        "p50_ms": round(float(np.percentile(values, 50)), 3),
+        "p95_ms": round(float(np.percentile(values, 95)), 3),
+        "p99_ms": round(float(np.percentile(values, 99)), 3)
+    }
+
+
+def time_calls(fn: Callable[[str], Any], queries: List[str], warmup: int = 5) -> List[float]:
+    """Time fn once per query after a few warm-up calls."""
+    for query in queries[:warmup]:
+        fn(query)
+    samples = []
+    for query in queries:
+        start = time.perf_counter()
+        fn(query)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def bench_parsing(workdir: str, documents: int, pages: int) -> Dict[str, Any]:
+    """Pages/sec of DocumentParser.process_document on synthetic PDFs."""
+    from indexing.document_parser import DocumentParser
+
+    parser = DocumentParser()
+    paths = [generate_pdf(os.path.join(workdir, "pdfs", f"doc_{i}.pdf"), pages, seed=i) for i in range(documents)]
+
+    chunks = 0
+    start = time.perf_counter()
+    for path in paths:
+        chunks += len(parser.process_document(path)["chunks"])
+    elapsed = time.perf_counter() - start
+
+    return {
+        "documents": documents,
+        "pages": documents * pages,
+        "chunks": chunks,
+        "seconds": round(elapsed, 3),
+        "pages_per_sec": round(documents * pages / elapsed, 1),
+        "peak_rss_mb": peak_rss_mb()
+    }
+
+
+def build_store(workdir: str, texts: List[str], embedder: HashingEmbeddingGenerator, batch_size: int):
+    """Fill a fresh VectorStore with the texts and time add_embeddings."""
+    from indexing.vector_store import VectorStore
+
+    store_dir = tempfile.mkdtemp(dir=workdir)
+    store = VectorStore(os.path.join(store_dir, "index.faiss"), os.path.join(store_dir, "metadata.json"),
+                        embedder.embedding_dim)
+
+    add_seconds = 0.0
+    for start in range(0, len(texts), batch_size):
+        batch = texts[start:start + batch_size]
+        embeddings = embedder.get_embeddings(batch)
+        metadata = [{"document_id": 1, "document_title": "Synthetic", "content": text,
+                     "page_number": 1, "chunk_index": start + i} for i, text in enumerate(batch)]
+        t0 = time.perf_counter()
+        store.add_embeddings(embeddings, metadata)
+        add_seconds += time.perf_counter() - t0
+
+    return store, add_seconds
+
+
+def bench_corpus(workdir: str, size: int, queries: List[str], batch_size: int,
+                 llm_latency: float, threshold: float) -> Dict[str, Any]:
+    """Indexing throughput and search/query latency for one corpus size."""
+    from search.semantic_search import SemanticSearch
+    from search.query_processor import QueryProcessor
+
+    embedder = HashingEmbeddingGenerator(EMBEDDING_DIMENSION)
+    store, add_seconds = build_store(workdir, make_chunks(size, seed=size), embedder, batch_size)
+
+    # The hashing embedder scores lower than a real model, so the threshold is
+    # configurable to keep results (and the LLM path) in the measurement
+    search_engine = SemanticSearch(embedder, store, threshold=threshold)
+    processor = QueryProcessor(search_engine, StubLLMManager(latency=llm_latency), NullCache())
+
+    return {
+        "corpus_size": size,
+        "add_embeddings": {
+            "vectors": size,
+            "batch_size": batch_size,
+            "seconds": round(add_seconds, 3),
+            "vectors_per_sec": round(size / add_seconds, 1)
+        },
+        "semantic_search": latency_summary(time_calls(search_engine.search, queries)),
+        "process_query": latency_summary(time_calls(processor.process_query, queries)),
+        "peak_rss_mb": peak_rss_mb()
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark ingest throughput, search latency and memory.")
+    parser.add_argument("--sizes", default="1000,10000", help="Comma-separated corpus sizes (chunks)")
+    parser.add_argument("--documents", type=int, default=10, help="Synthetic PDFs for the parsing benchmark")
+    parser.add_argument("--pages", type=int, default=20, help="Pages per synthetic PDF")
+    parser.add_argument("--queries", type=int, default=200, help="Queries per latency measurement")
+    parser.add_argument("--batch-size", type=int, default=256, help="Vectors per add_embeddings call")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Simulated LLM latency in seconds")
+    parser.add_argument("--threshold", type=float, default=0.0, help="Similarity threshold for search results")
+    parser.add_argument("--output", help="Also write the JSON results to this file")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="pdf-search-bench-")
+    try:
+        queries = make_queries(args.queries)
+        results = {
+            "environment": {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpu_count": os.cpu_count(),
+                "embedding_dimension": EMBEDDING_DIMENSION
+            },
+            "parsing": bench_parsing(workdir, args.documents, args.pages),
+            "corpora": [
+                bench_corpus(workdir, int(size), queries, args.batch_size, args.llm_latency, args.threshold)
+                for size in args.sizes.split(",")
+            ]
+        }
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    output = json.dumps(results, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,86 @@
+"""
+Cold-start guard for the app module.
+
+Runs `python -X importtime -c "import app"` in a fresh interpreter, reports
+the total import time and the slowest top-level imports as JSON, and exits
+non-zero when the budget is exceeded or a heavy provider module is imported
+eagerly.
+
+    python benchmarks/startup_time.py --budget-ms 1500
+"""
+import os
+import re
+import sys
+import json
+import argparse
+import subprocess
+from typing import List, Dict, Any
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that must only load once a provider or feature is actually used
+LAZY_MODULES = ("torch", "sentence_transformers", "google.generativeai", "openai", "textstat", "nltk")
+
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def measure_imports(statement: str) -> List[Dict[str, Any]]:
+    """
+    Run a statement under -X importtime and parse the per-module timings.
+    """
+    env = dict(os.environ, RESET_ON_START="false")
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=REPO_ROOT, env=env, capture_output=True, text=True
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"Import failed:\n{completed.stderr}")
+
+    imports = []
+    for line in completed.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            imports.append({
+                "module": module,
+                "self_ms": int(self_us) / 1000,
+                "cumulative_ms": int(cumulative_us) / 1000,
+                # importtime indents nested imports by two spaces per level
+                "depth": (len(indent) - 1) // 2
+            })
+    return imports
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Measure the cold-start import time of the app.")
+    parser.add_argument("--statement", default="import app", help="Python statement to time")
+    parser.add_argument("--budget-ms", type=float, default=1500.0, help="Maximum total import time")
+    parser.add_argument("--top", type=int, default=10, help="Number of slowest top-level imports to report")
+    args = parser.parse_args()
+
+    imports = measure_imports(args.statement)
+    top_level = [item for item in imports if item["depth"] == 0]
+    total_ms = sum(item["cumulative_ms"] for item in top_level)
+    eager = sorted({item["module"] for item in imports
+                    if any(item["module"] == lazy or item["module"].startswith(lazy + ".") for lazy in LAZY_MODULES)})
+
+    report = {
+        "statement": args.statement,
+        "total_import_ms": round(total_ms, 1),
+        "budget_ms": args.budget_ms,
+        "eager_heavy_modules": eager,
+        "slowest_imports": sorted(top_level, key=lambda item: item["cumulative_ms"], reverse=True)[:args.top]
+    }
+    print(json.dumps(report, indent=2))
+
+    if eager:
+        print(f"FAIL: heavy modules imported eagerly: {', '.join(eager)}", file=sys.stderr)
+        return 1
+    if total_ms > args.budget_ms:
+        print(f"FAIL: import took {total_ms:.1f} ms, budget is {args.budget_ms:.1f} ms", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+"""
+Local, deterministic stand-ins for the embedding and LLM providers.
+
+They keep benchmark numbers free of network latency and API quotas while
+exercising the same code paths as the real components.
+"""
+import re
+import time
+import random
+import threading
+import zlib
+import numpy as np
+from typing import List, Dict, Any, Optional, Tuple, Union, Callable
+
+from config import EMBEDDING_DIMENSION
+
+WORD_PATTERN = re.compile(r"\w+")
+
+
+class HashingEmbeddingGenerator:
+    def __init__(self, embedding_dim: int = EMBEDDING_DIMENSION, latency: float = 0.0):
+        """
+        Embed text by hashing its words into a fixed number of signed buckets.
+
+        Texts sharing words get similar vectors, so searches return sensible
+        neighbours without a model.
+        """
+        self.embedding_dim = embedding_dim
+        self.model_name = "benchmark/hashing"
+        self.latency = latency
+
+    def _embed(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.embedding_dim, dtype=np.float32)
+        for word in WORD_PATTERN.findall(text.lower()):
+            h = zlib.crc32(word.encode("utf-8"))
+            vector[h % self.embedding_dim] += 1.0 if (h >> 31) & 1 else -1.0
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def embed(self, texts: List[str]) -> Tuple[List[np.ndarray], Optional[str]]:
+        if not texts:
+            return [], None
+        if self.latency:
+            time.sleep(self.latency)
+        return [self._embed(text) for text in texts], self.model_name
+
+    def get_embeddings(self, texts: List[str]) -> List[np.ndarray]:
+        return self.embed(texts)[0]
+
+    def get_embedding(self, text: str) -> np.ndarray:
+        return self.get_embeddings([text])[0]
+
+
+class StubLLMManager:
+    def __init__(self, latency: float = 0.0, provider: str = "stub", model: str = "stub"):
+        """
+        Answer every prompt with a short deterministic text after a fixed delay.
+        """
+        self.latency = latency
+        self.provider = provider
+        self.model = model
+        self.max_tokens = 500
+        self.calls = 0
+
+    def generate_response(self, prompt: str, temperature: float = 0.7,
+                          system_prompt: Optional[str] = None) -> str:
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return f"[{self.model}] answer based on {len(prompt)} prompt characters"
+
+
+class StubLLMProvider:
+    name = "stub"
+
+    def __init__(self, model: str = "stub", latency: Union[float, Callable[[], float]] = 0.0,
+                 failure_rate: float = 0.0, seed: int = 0):
+        """
+        LLMProvider stand-in for LLMManager(providers=[...]).
+
+        latency is a fixed delay in seconds or a function drawing one per
+        call; failure_rate is the share of calls that raise.
+        """
+        self.model = model
+        self.max_tokens = 500
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.calls = 0
+
+    @property
+    def key(self) -> str:
+        return f"{self.name}/{self.model}"
+
+    def generate(self, prompt: str, temperature: float, system_prompt: Optional[str] = None) -> str:
+        with self.lock:
+            self.calls += 1
+            fails = self.rng.random() < self.failure_rate
+        delay = self.latency() if callable(self.latency) else self.latency
+        if delay:
+            time.sleep(delay)
+        if fails:
+            raise RuntimeError(f"{self.key} failed")
+        return f"[{self.model}] answer based on {len(prompt)} prompt characters"
+
+
+class NullCache:
+    """Response cache that never hits, so every query does the full work."""
+
+    def get_cached_response(self, query: str, params: Optional[Dict[str, Any]] = None) -> Optional[str]:
+        return None
+
+    def cache_response(self, query: str, response: Any, params: Optional[Dict[str, Any]] = None) -> None:
+        return None
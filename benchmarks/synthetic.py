@@ -0,0 +1,56 @@
+"""
+Synthetic corpus generation for benchmarks.
+"""
+import os
+import fitz  # PyMuPDF
+import numpy as np
+from typing import List
+
+VOCABULARY = (
+    "pump valve pressure flange bolt torque seal gasket bearing shaft motor voltage current "
+    "sensor gauge calibration maintenance inspection schedule warranty liability operator "
+    "installation procedure manual section figure table limit threshold alarm fault reset "
+    "temperature flow rate capacity filter cartridge housing inlet outlet coupling alignment "
+    "vibration lubrication interval replacement component assembly clearance tolerance "
+    "specification requirement safety hazard warning caution ground wiring circuit breaker "
+    "controller firmware parameter configuration display keypad menu setting default value"
+).split()
+
+
+def make_sentence(rng: np.random.RandomState, min_words: int = 8, max_words: int = 24) -> str:
+    """Random sentence drawn from the benchmark vocabulary."""
+    words = rng.choice(VOCABULARY, size=rng.randint(min_words, max_words + 1))
+    return " ".join(words).capitalize() + "."
+
+
+def make_paragraph(rng: np.random.RandomState, sentences: int = 6) -> str:
+    return " ".join(make_sentence(rng) for _ in range(sentences))
+
+
+def make_chunks(count: int, seed: int = 0) -> List[str]:
+    """Chunk-sized texts for corpora too large to go through PDFs."""
+    rng = np.random.RandomState(seed)
+    return [make_paragraph(rng, sentences=rng.randint(3, 7)) for _ in range(count)]
+
+
+def make_queries(count: int, seed: int = 1) -> List[str]:
+    """Short question-like queries over the benchmark vocabulary."""
+    rng = np.random.RandomState(seed)
+    return [f"What is the {' '.join(rng.choice(VOCABULARY, size=3))}?" for _ in range(count)]
+
+
+def generate_pdf(path: str, pages: int, seed: int = 0, paragraphs_per_page: int = 4) -> str:
+    """
+    Write a PDF of the given number of pages filled with synthetic text.
+    """
+    rng = np.random.RandomState(seed)
+    doc = fitz.open()
+    for _ in range(pages):
+        page = doc.new_page()
+        text = "\n\n".join(make_paragraph(rng) for _ in range(paragraphs_per_page))
+        page.insert_textbox(fitz.Rect(50, 50, page.rect.width - 50, page.rect.height - 50), text, fontsize=9)
+    doc.set_metadata({"title": f"Synthetic manual {seed}"})
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    doc.save(path)
+    doc.close()
+    return path
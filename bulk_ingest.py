@@ -0,0 +1,235 @@
+"""
+Bulk ingestion of a PDF archive.
+
+Parses files in a process pool, embeds their chunks in large batches and
+writes the index once per batch of documents. A checkpoint file records the
+files already done, so an interrupted run resumes where it stopped.
+
+    python bulk_ingest.py /path/to/archive
+    python bulk_ingest.py --manifest files.txt --workers 8
+
+Run it while no other process writes to the index.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple
+
+from config import (BULK_BATCH_DOCUMENTS, BULK_EMBEDDING_BATCH_SIZE, BULK_CHECKPOINT_FILE, INDEX_PATH,
+                    LOCAL_EMBEDDING_PROCESSES)
+from utils.helpers import hash_file, write_json_atomic
+
+# Parser of each pool process, built once by _init_parser
+_parser = None
+
+
+def _init_parser() -> None:
+    global _parser
+    from indexing.document_parser import DocumentParser
+    _parser = DocumentParser()
+
+
+def _parse_file(file_path: str) -> Tuple[str, Optional[Dict[str, Any]], Optional[str]]:
+    """Parse one PDF in a pool process; returns (path, document data, error)."""
+    try:
+        return file_path, _parser.process_document(file_path), None
+    except Exception as e:
+        return file_path, None, str(e)
+
+
+def collect_files(directory: Optional[str], manifest: Optional[str]) -> List[str]:
+    """
+    List the PDFs of a directory (recursively) or of a manifest with one path per line.
+    """
+    files = []
+    if directory:
+        for root, _, names in os.walk(directory):
+            files.extend(os.path.join(root, name) for name in names if name.lower().endswith(".pdf"))
+    if manifest:
+        with open(manifest, 'r') as f:
+            files.extend(line.strip() for line in f if line.strip() and not line.startswith("#"))
+    return sorted(dict.fromkeys(os.path.abspath(path) for path in files))
+
+
+def load_checkpoint(path: str) -> Dict[str, Any]:
+    """Load the checkpoint of a previous run, or start a new one."""
+    if os.path.exists(path):
+        try:
+            with open(path, 'r') as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"Error loading checkpoint: {str(e)}. Starting over.")
+    return {"done": {}, "stats": {"documents": 0, "duplicates": 0, "failed": 0, "pages": 0, "chunks": 0,
+                                  "seconds": 0.0}}
+
+
+class BulkIngester:
+    def __init__(self, checkpoint_file: str = BULK_CHECKPOINT_FILE, workers: Optional[int] = None,
+                 batch_documents: int = BULK_BATCH_DOCUMENTS,
+                 embedding_batch_size: int = BULK_EMBEDDING_BATCH_SIZE,
+                 embedding_processes: int = LOCAL_EMBEDDING_PROCESSES):
+        """
+        Build the writer-side components.
+
+        Args:
+            checkpoint_file: File recording the files already processed
+            workers: Parser processes (defaults to the CPU count)
+            batch_documents: Documents per embedding/index-write batch
+            embedding_batch_size: Texts per embedding request
+            embedding_processes: Encoding processes of the local embedding model
+        """
+        from indexing.document_parser import DocumentParser
+        from indexing.embeddings import EmbeddingGenerator
+        from indexing.vector_store import VectorStore
+        from indexing.pipeline import IngestionPipeline
+        from database.document_registry import DocumentRegistry
+
+        self.checkpoint_file = checkpoint_file
+        self.workers = workers or os.cpu_count()
+        self.batch_documents = batch_documents
+        self.embedding_batch_size = embedding_batch_size
+
+        self.vector_store = VectorStore()
+        self.registry = DocumentRegistry()
+
+        # Leftovers of an interrupted batch are registered but were never saved
+        discarded = self.registry.discard_unindexed(self.vector_store.next_id)
+        if discarded:
+            print(f"Discarded {discarded} document(s) from an interrupted batch")
+
+        self.embedding_generator = EmbeddingGenerator(local_processes=embedding_processes)
+        self.pipeline = IngestionPipeline(DocumentParser(), self.embedding_generator, self.vector_store, self.registry)
+        self.checkpoint = load_checkpoint(checkpoint_file)
+
+    def run(self, files: List[str]) -> Dict[str, Any]:
+        """
+        Ingest the files not done yet and return the cumulative stats.
+        """
+        done = self.checkpoint["done"]
+        pending = [path for path in files if path not in done]
+        print(f"{len(files)} file(s), {len(files) - len(pending)} already done, {len(pending)} to ingest")
+
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_parser) as pool:
+            for start in range(0, len(pending), self.batch_documents):
+                batch = pending[start:start + self.batch_documents]
+                batch_start = time.perf_counter()
+                self._ingest_batch(pool, batch)
+
+                stats = self.checkpoint["stats"]
+                stats["seconds"] = round(stats["seconds"] + time.perf_counter() - batch_start, 3)
+                write_json_atomic(self.checkpoint_file, self.checkpoint)
+                print(f"{len(done)}/{len(files)} files, {stats['pages']} pages, {stats['chunks']} chunks "
+                      f"in {stats['seconds']:.1f}s")
+
+        return self.report()
+
+    def _ingest_batch(self, pool: ProcessPoolExecutor, batch: List[str]) -> None:
+        """Parse, embed and index one batch, then save the index once."""
+        done = self.checkpoint["done"]
+        stats = self.checkpoint["stats"]
+
+        # Files already registered (e.g. uploaded through the app) are not parsed again
+        parse_paths, hashes = [], {}
+        for path in batch:
+            try:
+                hashes[path] = hash_file(path)
+            except OSError as e:
+                done[path] = {"status": "failed", "error": str(e)}
+                stats["failed"] += 1
+                continue
+
+            existing = self.registry.find_document_by_hash(hashes[path])
+            if existing:
+                done[path] = {"status": "duplicate", "document_id": existing["id"]}
+                stats["duplicates"] += 1
+            else:
+                parse_paths.append(path)
+
+        parsed = []
+        for path, document_data, error in pool.map(_parse_file, parse_paths):
+            if error is not None:
+                done[path] = {"status": "failed", "error": error}
+                stats["failed"] += 1
+            else:
+                parsed.append((path, hashes[path], document_data))
+
+        documents = self.pipeline.ingest_parsed(parsed, mark_indexed=False, persist=False,
+                                                embedding_batch_size=self.embedding_batch_size)
+        self.vector_store.save()
+
+        # Only now are the batch's vectors on disk
+        self.registry.mark_indexed([document["id"] for document in documents if not document["duplicate"]])
+
+        for (path, _, document_data), document in zip(parsed, documents):
+            if document["duplicate"]:
+                done[path] = {"status": "duplicate", "document_id": document["id"]}
+                stats["duplicates"] += 1
+            else:
+                done[path] = {"status": "indexed", "document_id": document["id"]}
+                stats["documents"] += 1
+                stats["pages"] += document_data["page_count"]
+                stats["chunks"] += len(document_data["chunks"])
+
+    def report(self) -> Dict[str, Any]:
+        """Overall throughput of the run, including resumed parts."""
+        stats = dict(self.checkpoint["stats"])
+        seconds = stats["seconds"] or 1e-9
+        stats["documents_per_sec"] = round(stats["documents"] / seconds, 2)
+        stats["pages_per_sec"] = round(stats["pages"] / seconds, 2)
+        stats["chunks_per_sec"] = round(stats["chunks"] / seconds, 2)
+        stats["vectors"] = self.vector_store.index.ntotal
+        return stats
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Bulk-ingest a directory or manifest of PDFs.")
+    parser.add_argument("directory", nargs="?", help="Directory to scan recursively for PDFs")
+    parser.add_argument("--manifest", help="Text file with one PDF path per line")
+    parser.add_argument("--workers", type=int, default=None, help="Parser processes (default: CPU count)")
+    parser.add_argument("--batch-documents", type=int, default=BULK_BATCH_DOCUMENTS,
+                        help="Documents per index write")
+    parser.add_argument("--embedding-batch-size", type=int, default=BULK_EMBEDDING_BATCH_SIZE,
+                        help="Texts per embedding request")
+    parser.add_argument("--embedding-processes", type=int, default=LOCAL_EMBEDDING_PROCESSES,
+                        help="Encoding processes of the local embedding model (0: in-process)")
+    parser.add_argument("--checkpoint", default=BULK_CHECKPOINT_FILE, help="Checkpoint file for resuming")
+    parser.add_argument("--publish", action="store_true",
+                        help="Publish an index generation for reader workers when done")
+    args = parser.parse_args()
+
+    if not args.directory and not args.manifest:
+        parser.error("give a directory or --manifest")
+
+    files = collect_files(args.directory, args.manifest)
+    ingester = BulkIngester(args.checkpoint, args.workers, args.batch_documents, args.embedding_batch_size,
+                            args.embedding_processes)
+    try:
+        report = ingester.run(files)
+    except KeyboardInterrupt:
+        print("Interrupted; run the same command again to resume")
+        return 1
+    finally:
+        ingester.embedding_generator.close()
+
+    if args.publish:
+        from indexing.generations import publish_generation
+        report["generation"] = publish_generation(ingester.vector_store, INDEX_PATH)
+
+    # Cached answers may be missing the new documents
+    try:
+        from database.db_manager import DatabaseManager
+        DatabaseManager().clean_all_cache()
+    except Exception:
+        traceback.print_exc()
+        print("error in clearing the response cache")
+
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,6 +6,22 @@ load_dotenv()
 
 EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "gemini/text-embedding-004")
 EMBEDDING_DIMENSION = 768
+
+# Local CPU embedding model, used without a provider API key (e.g. air-gapped).
+# Backend: "torch" (fp32), "onnx" or "onnx-int8" (needs optimum[onnxruntime]).
+LOCAL_EMBEDDING_MODEL = os.getenv("LOCAL_EMBEDDING_MODEL", "sentence-transformers/all-mpnet-base-v2")
+LOCAL_EMBEDDING_BACKEND = os.getenv("LOCAL_EMBEDDING_BACKEND", "torch")
+LOCAL_EMBEDDING_QUANTIZATION = os.getenv("LOCAL_EMBEDDING_QUANTIZATION", "avx512_vnni")
+LOCAL_EMBEDDING_BATCH_SIZE = int(os.getenv("LOCAL_EMBEDDING_BATCH_SIZE", "64"))
+# Encoding processes for large calls (bulk ingestion); 0 encodes in-process
+LOCAL_EMBEDDING_PROCESSES = int(os.getenv("LOCAL_EMBEDDING_PROCESSES", "0"))
+
+# Model used while the primary embedding model's circuit breaker is open, e.g.
+# LOCAL_EMBEDDING_MODEL. It must produce EMBEDDING_DIMENSION vectors; empty disables fallback.
+EMBEDDING_FALLBACK_MODEL = os.getenv("EMBEDDING_FALLBACK_MODEL", "")
+# Consecutive failures that open a breaker, and seconds before it lets a probe through
+EMBEDDING_BREAKER_FAILURES = 3
+EMBEDDING_BREAKER_RESET_SECONDS = 30.0
 CHUNK_SIZE = 500
 CHUNK_OVERLAP = 50
 
@@ -19,22 +35,153 @@ LLM_PROVIDER = os.getenv("LLM_PROVIDER", "google")
 LLM_MODEL = os.getenv("LLM_MODEL", "gemini-1.5-pro")
 MAX_TOKENS = 500
 
+# Optional backup for failover and hedging; LLM_BACKUP_PROVIDER defaults to LLM_PROVIDER
+LLM_BACKUP_PROVIDER = os.getenv("LLM_BACKUP_PROVIDER", "")
+LLM_BACKUP_MODEL = os.getenv("LLM_BACKUP_MODEL", "")
+# Hedging: when the primary has not answered within its LLM_HEDGE_PERCENTILE latency
+# (LLM_HEDGE_DELAY_SECONDS until LLM_HEDGE_MIN_SAMPLES calls), also ask the backup
+LLM_HEDGING = os.getenv("LLM_HEDGING", "false").lower() == "true"
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))
+LLM_HEDGE_DELAY_SECONDS = 2.0
+LLM_HEDGE_MIN_SAMPLES = 20
+LLM_HEDGE_WORKERS = 16
+# Health scoring: latencies kept per provider, weight of the past in the success
+# rate, and the score under which a provider loses its place in the failover order
+LLM_HEALTH_WINDOW = 200
+LLM_HEALTH_DECAY = 0.9
+LLM_FAILOVER_MIN_SCORE = 0.5
+LLM_BREAKER_FAILURES = 3
+LLM_BREAKER_RESET_SECONDS = 30.0
+# Admission control: at most LLM_MAX_CONCURRENCY LLM calls per process, and up to
+# LLM_QUEUE_SIZE more waiting LLM_QUEUE_TIMEOUT_SECONDS for a slot, served by priority.
+# Queries that are not admitted get search results without an LLM answer.
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_QUEUE_SIZE = int(os.getenv("LLM_QUEUE_SIZE", "16"))
+LLM_QUEUE_TIMEOUT_SECONDS = float(os.getenv("LLM_QUEUE_TIMEOUT_SECONDS", "5"))
+# Priority of each client, named by the CLIENT_ID_HEADER request header:
+# "dashboard:high,batch-jobs:low". Other clients get DEFAULT_CLIENT_PRIORITY.
+LLM_PRIORITIES = ("high", "normal", "low")
+CLIENT_ID_HEADER = "X-Client-Id"
+CLIENT_PRIORITIES = dict(
+    entry.strip().rsplit(":", 1) for entry in os.getenv("CLIENT_PRIORITIES", "").split(",") if ":" in entry
+)
+DEFAULT_CLIENT_PRIORITY = os.getenv("DEFAULT_CLIENT_PRIORITY", "normal")
+
+# Token budget for the context passed to the LLM on enhanced answers
+CONTEXT_TOKEN_BUDGET = 2000
+CONTEXT_MAX_RESULTS = 3
+CONTEXT_DEDUP_THRESHOLD = 0.8
+TOKENIZER_ENCODING = "cl100k_base"
+MAX_SNIPPETS = 3
+
+# Background pre-summarization of long chunks at ingest
+PRESUMMARIZE_ENABLED = os.getenv("PRESUMMARIZE_ENABLED", "false").lower() == "true"
+PRESUMMARIZE_SCOPE = os.getenv("PRESUMMARIZE_SCOPE", "chunk")  # "chunk" or "page"
+PRESUMMARIZE_LEVELS = ["short", "medium"]
+PRESUMMARIZE_CONCURRENCY = 4
+
+# Passages longer than this many characters are summarized on the direct-answer
+# path and pre-summarized; a page is pre-summarized when its text is this long.
+# Chunks hold about CHUNK_SIZE characters, so only pre-summarization, which makes
+# the direct path a lookup, lowers the default enough to pick out the fuller ones
+SUMMARY_MIN_CHARS = int(os.getenv("SUMMARY_MIN_CHARS", CHUNK_SIZE * 4 // 5 if PRESUMMARIZE_ENABLED else 1000))
+
+# Whole-document map-reduce summaries: token budget of each group sent to the
+# LLM, average chunks per group, and concurrent LLM calls across requests
+SUMMARY_GROUP_TOKENS = 3000
+SUMMARY_GROUP_CHUNKS = 12
+SUMMARY_CONCURRENCY = 4
+# The summary cache keeps its newest SUMMARY_CACHE_MAX_ENTRIES summaries, none
+# older than SUMMARY_CACHE_MAX_AGE_DAYS; older ones are pruned as new ones are stored
+SUMMARY_CACHE_MAX_ENTRIES = int(os.getenv("SUMMARY_CACHE_MAX_ENTRIES", 50000))
+SUMMARY_CACHE_MAX_AGE_DAYS = int(os.getenv("SUMMARY_CACHE_MAX_AGE_DAYS", 30))
+
+# Near-duplicate chunk detection at ingest (MinHash + LSH)
+NEAR_DUPLICATE_DETECTION = os.getenv("NEAR_DUPLICATE_DETECTION", "true").lower() == "true"
+MINHASH_PERMUTATIONS = 128
+MINHASH_BANDS = 16
+MINHASH_SHINGLE_SIZE = 5
+NEAR_DUPLICATE_THRESHOLD = 0.9
+
 TOP_K_RESULTS = 5
 SIMILARITY_THRESHOLD = 0.7
+# Most hits a search fetches while looking for TOP_K_RESULTS vectors of the query's
+# embedding model, when the index mixes models
+MAX_SEARCH_FETCH = 1000
 
 INDEX_PATH = os.path.join(os.getcwd(), "index")
 FAISS_INDEX_FILE = os.path.join(INDEX_PATH, "document_index.faiss")
 METADATA_FILE = os.path.join(INDEX_PATH, "metadata.json")
+REGISTRY_FILE = os.path.join(INDEX_PATH, "documents.db")
 UPLOAD_FOLDER = os.path.join(os.getcwd(), "uploads")
+MODEL_CACHE_PATH = os.path.join(os.getcwd(), "models")
+
+# Uploads are parsed from the request buffer. Files up to UPLOAD_SPOOL_THRESHOLD_MB
+# stay in memory while they stream in, larger ones are spooled to a temporary file.
+MAX_UPLOAD_SIZE_MB = int(os.getenv("MAX_UPLOAD_SIZE_MB", "100"))
+UPLOAD_SPOOL_THRESHOLD_MB = int(os.getenv("UPLOAD_SPOOL_THRESHOLD_MB", "16"))
+# Keep a copy of each uploaded PDF in UPLOAD_FOLDER, written in the background
+PERSIST_UPLOADS = os.getenv("PERSIST_UPLOADS", "true").lower() == "true"
+
+# "standalone" serves and ingests in one process; "reader" workers serve the
+# generations published by a separate ingest_worker.py process
+SERVER_ROLE = os.getenv("SERVER_ROLE", "standalone")
+INBOX_FOLDER = os.path.join(os.getcwd(), "inbox")
+GENERATIONS_TO_KEEP = 3
+GENERATION_POLL_INTERVAL = 2.0
+
+# Bulk ingestion (bulk_ingest.py): documents per index write, texts per embedding request
+BULK_BATCH_DOCUMENTS = 64
+BULK_EMBEDDING_BATCH_SIZE = 100
+BULK_CHECKPOINT_FILE = os.path.join(INDEX_PATH, "bulk_checkpoint.json")
+
+# Optional reduction of the indexed vectors: "none", "pca" (learned from the
+# corpus) or "matryoshka" (truncation, for models trained for it). Candidates
+# from the reduced index are re-scored against the full vectors on disk.
+VECTOR_REDUCTION = os.getenv("VECTOR_REDUCTION", "none")
+REDUCED_DIMENSION = int(os.getenv("REDUCED_DIMENSION", "256"))
+
+# Optional compression of the resident index: "none", "sq8" (1 byte per
+# dimension) or "pq" (PQ_SUBQUANTIZERS bytes per vector)
+VECTOR_COMPRESSION = os.getenv("VECTOR_COMPRESSION", "none")
+PQ_SUBQUANTIZERS = int(os.getenv("PQ_SUBQUANTIZERS", "96"))
+
+# Vectors stored before the projection/quantizer is learned, and candidates re-scored per search
+INDEX_TRAINING_SIZE = 1000
+RERANK_CANDIDATES = 100
+
+# Vectors added since the last save are searched as extra index segments; more
+# than this many are merged even when their sizes would not call for it
+MAX_INDEX_SEGMENTS = 8
+
+# Two-stage retrieval: each query is routed to the ROUTING_TOP_DOCUMENTS documents
+# whose chunk centroid is closest, and only their chunks are scored. Used once a
+# store holds ROUTING_MIN_DOCUMENTS documents; 0 disables routing.
+ROUTING_TOP_DOCUMENTS = int(os.getenv("ROUTING_TOP_DOCUMENTS", "0"))
+ROUTING_MIN_DOCUMENTS = int(os.getenv("ROUTING_MIN_DOCUMENTS", "100"))
+
+# Named collections, each with its own index under COLLECTIONS_PATH. The default
+# collection uses FAISS_INDEX_FILE/METADATA_FILE and stays loaded; others load on
+# first use and the least recently used are evicted above the memory budget.
+DEFAULT_COLLECTION = "default"
+COLLECTIONS_PATH = os.path.join(INDEX_PATH, "collections")
+COLLECTION_MEMORY_BUDGET_MB = int(os.getenv("COLLECTION_MEMORY_BUDGET_MB", "1024"))
+
+# Pagination of /documents listings
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# Upper bounds (seconds) of the latency histograms served on /metrics
+METRICS_LATENCY_BUCKETS = [0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0]
+
+# Wipe uploads and the index when the app starts (development default)
+RESET_ON_START = os.getenv("RESET_ON_START", "true").lower() == "true"
 
 def reset_directory(path):
     if os.path.exists(path): 
         shutil.rmtree(path)
     os.makedirs(path, exist_ok=True)
 
-reset_directory(UPLOAD_FOLDER)
-reset_directory(INDEX_PATH)
-
 
 CACHE_EXPIRATION = 36000
 CACHE_ENABLED = True
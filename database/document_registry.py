@@ -0,0 +1,341 @@
+import os
+import sqlite3
+import threading
+import numpy as np
+from datetime import datetime, timedelta
+from typing import List, Dict, Any, Optional, Tuple, Iterator
+
+from config import REGISTRY_FILE, DEFAULT_COLLECTION, SUMMARY_CACHE_MAX_ENTRIES, SUMMARY_CACHE_MAX_AGE_DAYS
+
+DOCUMENT_FIELDS = ("id", "collection", "filename", "path", "title", "page_count", "chunk_count", "indexed",
+                   "created_at", "file_hash")
+DEFAULT_DOCUMENT_FIELDS = ("id", "collection", "filename", "title", "page_count", "chunk_count", "indexed",
+                           "created_at")
+CHUNK_FIELDS = ("position", "chunk_index", "page_number", "embedding_id")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    collection TEXT NOT NULL DEFAULT 'default',
+    filename TEXT NOT NULL,
+    path TEXT,
+    title TEXT,
+    page_count INTEGER NOT NULL DEFAULT 0,
+    chunk_count INTEGER NOT NULL DEFAULT 0,
+    indexed INTEGER NOT NULL DEFAULT 0,
+    created_at TEXT NOT NULL,
+    file_hash TEXT
+);
+
+-- Clustered on document_id, so a document's chunks are one range scan
+CREATE TABLE IF NOT EXISTS chunks (
+    document_id INTEGER NOT NULL REFERENCES documents(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    chunk_index INTEGER NOT NULL,
+    page_number INTEGER NOT NULL,
+    embedding_id TEXT NOT NULL,
+    PRIMARY KEY (document_id, position)
+) WITHOUT ROWID;
+
+-- MinHash signatures of the chunks that own a vector, for near-duplicate detection.
+-- Embedding IDs are only unique within a collection.
+CREATE TABLE IF NOT EXISTS chunk_signatures (
+    collection TEXT NOT NULL DEFAULT 'default',
+    embedding_id TEXT NOT NULL,
+    signature BLOB NOT NULL,
+    PRIMARY KEY (collection, embedding_id)
+);
+
+-- Intermediate summaries of whole-document summarization, keyed by a hash of
+-- their input; kept across response cache clears
+CREATE TABLE IF NOT EXISTS summary_cache (
+    key TEXT PRIMARY KEY,
+    summary TEXT NOT NULL,
+    created_at TEXT NOT NULL
+) WITHOUT ROWID;
+"""
+
+# Columns added after the first release, applied to existing databases on open
+MIGRATIONS = (
+    ("documents", "file_hash", "ALTER TABLE documents ADD COLUMN file_hash TEXT;"),
+    ("documents", "collection", "ALTER TABLE documents ADD COLUMN collection TEXT NOT NULL DEFAULT 'default';"),
+    ("chunk_signatures", "collection", """
+        ALTER TABLE chunk_signatures RENAME TO chunk_signatures_old;
+        CREATE TABLE chunk_signatures (
+            collection TEXT NOT NULL DEFAULT 'default',
+            embedding_id TEXT NOT NULL,
+            signature BLOB NOT NULL,
+            PRIMARY KEY (collection, embedding_id)
+        );
+        INSERT INTO chunk_signatures (embedding_id, signature) SELECT embedding_id, signature FROM chunk_signatures_old;
+        DROP TABLE chunk_signatures_old;
+    """),
+)
+
+# The same file may be uploaded once per collection
+INDEXES = """
+DROP INDEX IF EXISTS idx_documents_file_hash;
+CREATE UNIQUE INDEX IF NOT EXISTS idx_documents_collection_file_hash ON documents(collection, file_hash);
+CREATE INDEX IF NOT EXISTS idx_documents_collection ON documents(collection, id);
+CREATE INDEX IF NOT EXISTS idx_summary_cache_created_at ON summary_cache(created_at);
+"""
+
+
+class DocumentRegistry:
+    def __init__(self, db_file: str = REGISTRY_FILE):
+        """
+        Initialize the document registry.
+
+        Only document-level fields and chunk references are stored here; the
+        chunk text lives once, in the vector store metadata.
+        """
+        self.db_file = db_file
+        self._local = threading.local()
+
+        os.makedirs(os.path.dirname(self.db_file), exist_ok=True)
+        conn = self._connect()
+        conn.executescript(SCHEMA)
+        for table, column, statement in MIGRATIONS:
+            columns = [row["name"] for row in conn.execute(f"PRAGMA table_info({table})")]
+            if column not in columns:
+                conn.executescript(statement)
+        conn.executescript(INDEXES)
+        conn.commit()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Get this thread's connection, opening it on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_file, timeout=30)
+            conn.row_factory = sqlite3.Row
+            # WAL lets reader processes query while the writer ingests
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+        return conn
+
+    def create_document(self, filename: str, path: str, title: str, page_count: int,
+                        file_hash: Optional[str] = None, collection: str = DEFAULT_COLLECTION) -> int:
+        """
+        Register a new, not yet indexed document and return its ID.
+
+        Raises sqlite3.IntegrityError if a document with the same file hash
+        exists in the collection.
+        """
+        conn = self._connect()
+        with conn:
+            cursor = conn.execute(
+                "INSERT INTO documents (collection, filename, path, title, page_count, created_at, file_hash) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (collection, filename, path, title, page_count, datetime.now().isoformat(timespec="seconds"),
+                 file_hash)
+            )
+        return cursor.lastrowid
+
+    def find_document_by_hash(self, file_hash: str, collection: str = DEFAULT_COLLECTION) -> Optional[Dict[str, Any]]:
+        """
+        Get the document of the collection uploaded with this file content, if any.
+        """
+        row = self._connect().execute(
+            f"SELECT {', '.join(DEFAULT_DOCUMENT_FIELDS)} FROM documents WHERE collection = ? AND file_hash = ?",
+            (collection, file_hash)
+        ).fetchone()
+        return self._row_to_dict(row) if row else None
+
+    def add_signatures(self, signatures: Dict[str, np.ndarray], collection: str = DEFAULT_COLLECTION) -> None:
+        """Store the MinHash signatures of newly embedded chunks."""
+        conn = self._connect()
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO chunk_signatures (collection, embedding_id, signature) VALUES (?, ?, ?)",
+                [(collection, embedding_id, signature.astype(np.uint64).tobytes())
+                 for embedding_id, signature in signatures.items()]
+            )
+
+    def iter_signatures(self, collection: str = DEFAULT_COLLECTION) -> Iterator[Tuple[str, np.ndarray]]:
+        """Iterate over the stored chunk signatures of a collection."""
+        rows = self._connect().execute(
+            "SELECT embedding_id, signature FROM chunk_signatures WHERE collection = ?", (collection,)
+        )
+        for row in rows:
+            yield row["embedding_id"], np.frombuffer(row["signature"], dtype=np.uint64)
+
+    def delete_signatures(self, embedding_ids: List[str], collection: str = DEFAULT_COLLECTION) -> None:
+        """Remove the signatures of deleted vectors."""
+        conn = self._connect()
+        with conn:
+            conn.executemany("DELETE FROM chunk_signatures WHERE collection = ? AND embedding_id = ?",
+                             [(collection, embedding_id) for embedding_id in embedding_ids])
+
+    def add_chunks(self, document_id: int, chunks: List[Dict[str, Any]]) -> None:
+        """
+        Record the chunk references of a document.
+        """
+        conn = self._connect()
+        with conn:
+            conn.executemany(
+                "INSERT INTO chunks (document_id, position, chunk_index, page_number, embedding_id) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(document_id, position, chunk['chunk_index'], chunk['page_number'], chunk['embedding_id'])
+                 for position, chunk in enumerate(chunks)]
+            )
+            conn.execute(
+                "UPDATE documents SET chunk_count = ? WHERE id = ?",
+                (len(chunks), document_id)
+            )
+
+    def replace_document(self, document_id: int, filename: str, path: str, title: str, page_count: int,
+                         file_hash: str, chunks: List[Dict[str, Any]]) -> None:
+        """
+        Point a document at a new version of its file and chunks, in one transaction.
+        """
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "UPDATE documents SET filename = ?, path = ?, title = ?, page_count = ?, file_hash = ?, "
+                "chunk_count = ? WHERE id = ?",
+                (filename, path, title, page_count, file_hash, len(chunks), document_id)
+            )
+            conn.execute("DELETE FROM chunks WHERE document_id = ?", (document_id,))
+            conn.executemany(
+                "INSERT INTO chunks (document_id, position, chunk_index, page_number, embedding_id) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(document_id, position, chunk['chunk_index'], chunk['page_number'], chunk['embedding_id'])
+                 for position, chunk in enumerate(chunks)]
+            )
+
+    def mark_indexed(self, document_ids: List[int]) -> None:
+        """Mark documents as searchable."""
+        conn = self._connect()
+        with conn:
+            conn.executemany("UPDATE documents SET indexed = 1 WHERE id = ?", [(i,) for i in document_ids])
+
+    def delete_documents(self, document_ids: List[int]) -> None:
+        """Remove documents and, by cascade, their chunk references."""
+        conn = self._connect()
+        with conn:
+            conn.executemany("DELETE FROM documents WHERE id = ?", [(i,) for i in document_ids])
+
+    def discard_unindexed(self, next_embedding_id: int, collection: str = DEFAULT_COLLECTION) -> int:
+        """
+        Drop documents left unindexed by an interrupted writer, and the
+        signatures of vectors that were never saved (IDs from next_embedding_id on).
+
+        Only call this while no other writer is ingesting into the collection.
+        Returns the number of documents dropped.
+        """
+        conn = self._connect()
+        with conn:
+            cursor = conn.execute("DELETE FROM documents WHERE collection = ? AND indexed = 0", (collection,))
+            conn.execute("DELETE FROM chunk_signatures WHERE collection = ? AND CAST(embedding_id AS INTEGER) >= ?",
+                         (collection, next_embedding_id))
+        return cursor.rowcount
+
+    def get_document(self, document_id: int, fields: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Get the summary fields of a document.
+        """
+        columns = self._columns(fields, DOCUMENT_FIELDS, DEFAULT_DOCUMENT_FIELDS)
+        row = self._connect().execute(
+            f"SELECT {', '.join(columns)} FROM documents WHERE id = ?", (document_id,)
+        ).fetchone()
+        return self._row_to_dict(row) if row else None
+
+    def list_documents(self, limit: int = 50, cursor: Optional[int] = None, fields: Optional[List[str]] = None,
+                       collection: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """
+        List documents in ID order, one page at a time, optionally of one collection only.
+
+        Returns the page and the cursor for the next page (None on the last page).
+        """
+        columns = self._columns(fields, DOCUMENT_FIELDS, DEFAULT_DOCUMENT_FIELDS)
+        # The ID is needed for the cursor even when it is not projected
+        select = columns if "id" in columns else ["id"] + columns
+
+        where, params = "id > ?", [cursor or 0]
+        if collection is not None:
+            where += " AND collection = ?"
+            params.append(collection)
+
+        rows = self._connect().execute(
+            f"SELECT {', '.join(select)} FROM documents WHERE {where} ORDER BY id LIMIT ?",
+            (*params, limit + 1)
+        ).fetchall()
+
+        next_cursor = rows[limit - 1]["id"] if len(rows) > limit else None
+        documents = []
+        for row in rows[:limit]:
+            document = self._row_to_dict(row)
+            documents.append({column: document[column] for column in columns})
+        return documents, next_cursor
+
+    def list_chunks(self, document_id: int, limit: int = 50,
+                    cursor: Optional[int] = None) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """
+        List the chunk references of a document, one page at a time.
+        """
+        rows = self._connect().execute(
+            f"SELECT {', '.join(CHUNK_FIELDS)} FROM chunks "
+            "WHERE document_id = ? AND position > ? ORDER BY position LIMIT ?",
+            (document_id, -1 if cursor is None else cursor, limit + 1)
+        ).fetchall()
+
+        next_cursor = rows[limit - 1]["position"] if len(rows) > limit else None
+        return [dict(row) for row in rows[:limit]], next_cursor
+
+    def get_cached_summaries(self, keys: List[str]) -> Dict[str, str]:
+        """Get the cached summaries of the given keys that exist."""
+        summaries = {}
+        conn = self._connect()
+        # Stay under SQLite's bound-parameter limit
+        for start in range(0, len(keys), 500):
+            batch = keys[start:start + 500]
+            rows = conn.execute(
+                f"SELECT key, summary FROM summary_cache WHERE key IN ({', '.join('?' * len(batch))})", batch
+            )
+            summaries.update((row["key"], row["summary"]) for row in rows)
+        return summaries
+
+    def cache_summaries(self, summaries: Dict[str, str]) -> None:
+        """Store summaries by key, pruning the oldest ones."""
+        created_at = datetime.now().isoformat(timespec="seconds")
+        conn = self._connect()
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO summary_cache (key, summary, created_at) VALUES (?, ?, ?)",
+                [(key, summary, created_at) for key, summary in summaries.items()]
+            )
+            self._prune_summary_cache(conn)
+
+    def _prune_summary_cache(self, conn: sqlite3.Connection, max_entries: int = SUMMARY_CACHE_MAX_ENTRIES,
+                             max_age_days: int = SUMMARY_CACHE_MAX_AGE_DAYS) -> int:
+        """Delete cached summaries past the age limit, then all but the newest max_entries."""
+        cutoff = (datetime.now() - timedelta(days=max_age_days)).isoformat(timespec="seconds")
+        deleted = conn.execute("DELETE FROM summary_cache WHERE created_at < ?", (cutoff,)).rowcount
+        deleted += conn.execute(
+            "DELETE FROM summary_cache WHERE key IN "
+            "(SELECT key FROM summary_cache ORDER BY created_at DESC LIMIT -1 OFFSET ?)", (max_entries,)
+        ).rowcount
+        return deleted
+
+    def count_documents(self) -> int:
+        """Count registered documents."""
+        return self._connect().execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+    def _columns(self, fields: Optional[List[str]], allowed: Tuple[str, ...],
+                 default: Tuple[str, ...]) -> List[str]:
+        """Validate a field projection against the allowed columns."""
+        if not fields:
+            return list(default)
+
+        unknown = [field for field in fields if field not in allowed]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+        return list(dict.fromkeys(fields))
+
+    def _row_to_dict(self, row: sqlite3.Row) -> Dict[str, Any]:
+        """Convert a row, turning the indexed flag back into a bool."""
+        document = dict(row)
+        if "indexed" in document:
+            document["indexed"] = bool(document["indexed"])
+        return document
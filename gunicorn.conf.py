@@ -0,0 +1,16 @@
+# Multi-worker serving: N reader workers share the memory-mapped index
+# generations published by `python ingest_worker.py`.
+#
+#     gunicorn -c gunicorn.conf.py
+import os
+import multiprocessing
+
+wsgi_app = "app:create_app()"
+bind = os.getenv("BIND", "0.0.0.0:5007")
+workers = int(os.getenv("WEB_WORKERS", multiprocessing.cpu_count()))
+threads = int(os.getenv("WEB_THREADS", 4))
+timeout = 120
+
+# Every worker opens the index itself; the mmap'd pages are shared by the OS
+preload_app = False
+raw_env = ["SERVER_ROLE=reader"]
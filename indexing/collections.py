@@ -0,0 +1,155 @@
+import os
+import re
+import threading
+from contextlib import contextmanager
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Callable
+
+from indexing.vector_store import VectorStore
+from utils.metrics import REGISTRY
+from config import DEFAULT_COLLECTION, COLLECTIONS_PATH, COLLECTION_MEMORY_BUDGET_MB, EMBEDDING_DIMENSION
+
+COLLECTION_NAME_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+COLLECTION_LOADS = REGISTRY.counter(
+    "pdf_search_collection_loads_total", "Collections loaded from disk")
+COLLECTION_EVICTIONS = REGISTRY.counter(
+    "pdf_search_collection_evictions_total", "Collections evicted to stay under the memory budget")
+
+
+def validate_collection_name(name: str) -> str:
+    """Check that a collection name is safe to use as a directory name."""
+    if not COLLECTION_NAME_PATTERN.match(name or ""):
+        raise ValueError("Collection names must be 1-64 letters, digits, '-' or '_'")
+    return name
+
+
+class Collection:
+    def __init__(self, name: str, vector_store: VectorStore):
+        """
+        A named vector store and, once something is uploaded to it, its ingestion pipeline.
+        """
+        self.name = name
+        self.vector_store = vector_store
+        self.pipeline = None
+        # Requests currently using the collection; it is not evicted while in use
+        self.users = 0
+
+    def estimate_bytes(self) -> int:
+        """Approximate resident size: the index codes, their metadata and the dedup signatures."""
+        size = self.vector_store.index_bytes
+        if os.path.exists(self.vector_store.metadata_file):
+            size += os.path.getsize(self.vector_store.metadata_file)
+        if self.pipeline is not None and self.pipeline.dedup_index is not None:
+            size += len(self.pipeline.dedup_index) * self.pipeline.minhasher.num_perm * 8
+        return size
+
+
+class CollectionManager:
+    def __init__(self, default_store: VectorStore, root: str = COLLECTIONS_PATH,
+                 memory_budget_mb: int = COLLECTION_MEMORY_BUDGET_MB, dimension: int = EMBEDDING_DIMENSION,
+                 pipeline_factory: Optional[Callable[[Collection], Any]] = None):
+        """
+        Initialize the collection manager.
+
+        Args:
+            default_store: Vector store of the default collection, which is never evicted
+            root: Directory holding one subdirectory per named collection
+            memory_budget_mb: Resident size above which least recently used collections are evicted
+            dimension: Embedding dimension of new collections
+            pipeline_factory: Builds the ingestion pipeline of a collection on its first upload
+        """
+        self.root = root
+        self.memory_budget = memory_budget_mb * 1024 * 1024
+        self.dimension = dimension
+        self.pipeline_factory = pipeline_factory
+
+        self.default = Collection(DEFAULT_COLLECTION, default_store)
+        # Loaded named collections, least recently used first
+        self.loaded: "OrderedDict[str, Collection]" = OrderedDict()
+        self.lock = threading.Lock()
+
+        self.loads = 0
+        self.evictions = 0
+
+    @contextmanager
+    def use(self, name: Optional[str] = None, ingest: bool = False):
+        """
+        Hold a collection for the duration of a request so it cannot be
+        evicted (and reloaded as a second copy) while it is being written.
+
+        With ingest=True the collection's pipeline is built if needed.
+        """
+        if not name or name == DEFAULT_COLLECTION:
+            collection = self.default
+        else:
+            validate_collection_name(name)
+            with self.lock:
+                collection = self._get_locked(name)
+                collection.users += 1
+
+        try:
+            if ingest and collection.pipeline is None:
+                with self.lock:
+                    if collection.pipeline is None:
+                        collection.pipeline = self.pipeline_factory(collection)
+                    self._evict(keep=collection.name)
+            yield collection
+        finally:
+            if collection is not self.default:
+                with self.lock:
+                    collection.users -= 1
+
+    def _get_locked(self, name: str) -> Collection:
+        collection = self.loaded.get(name)
+        if collection is not None:
+            self.loaded.move_to_end(name)
+            return collection
+
+        directory = os.path.join(self.root, name)
+        collection = Collection(name, VectorStore(
+            index_file=os.path.join(directory, "document_index.faiss"),
+            metadata_file=os.path.join(directory, "metadata.json"),
+            dimension=self.dimension
+        ))
+        self.loaded[name] = collection
+        self.loads += 1
+        COLLECTION_LOADS.inc(collection=name)
+
+        self._evict(keep=name)
+        return collection
+
+    def exists(self, name: Optional[str]) -> bool:
+        """Whether a collection has been created (the default always exists)."""
+        if not name or name == DEFAULT_COLLECTION:
+            return True
+        validate_collection_name(name)
+        return name in self.loaded or os.path.isdir(os.path.join(self.root, name))
+
+    def _evict(self, keep: str) -> None:
+        """
+        Drop least recently used collections until the loaded ones fit the budget.
+
+        Vector stores save on every write, so an evicted collection is simply
+        loaded again from disk on its next use.
+        """
+        total = sum(collection.estimate_bytes() for collection in self.loaded.values())
+        for name in list(self.loaded):
+            if total <= self.memory_budget:
+                break
+            if name == keep or self.loaded[name].users:
+                continue
+            total -= self.loaded.pop(name).estimate_bytes()
+            self.evictions += 1
+            COLLECTION_EVICTIONS.inc(collection=name)
+
+    def stats(self) -> Dict[str, Any]:
+        """Loaded collections and load/evict counts."""
+        with self.lock:
+            return {
+                'loaded': list(self.loaded),
+                'resident_bytes': sum(collection.estimate_bytes() for collection in self.loaded.values()),
+                'memory_budget_bytes': self.memory_budget,
+                'loads': self.loads,
+                'evictions': self.evictions
+            }
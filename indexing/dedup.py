@@ -0,0 +1,118 @@
+import re
+import zlib
+import numpy as np
+from typing import List, Dict, Any, Optional, Iterable, Tuple
+
+from config import MINHASH_PERMUTATIONS, MINHASH_BANDS, MINHASH_SHINGLE_SIZE, NEAR_DUPLICATE_THRESHOLD
+
+# Smallest prime above 2**32, so (a * x + b) % p never overflows uint64 for 32-bit a, b and x
+MINHASH_PRIME = np.uint64(4294967311)
+WORD_PATTERN = re.compile(r"\w+")
+
+
+class MinHasher:
+    def __init__(self, num_perm: int = MINHASH_PERMUTATIONS, shingle_size: int = MINHASH_SHINGLE_SIZE,
+                 seed: int = 1):
+        """
+        Initialize the MinHash signature generator.
+
+        Args:
+            num_perm: Number of hash permutations (signature length)
+            shingle_size: Number of words per shingle
+            seed: Seed for the permutations; signatures are only comparable under the same seed
+        """
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+
+        rng = np.random.RandomState(seed)
+        self.a = rng.randint(1, 2 ** 32 - 1, size=num_perm, dtype=np.uint64)
+        self.b = rng.randint(0, 2 ** 32 - 1, size=num_perm, dtype=np.uint64)
+
+    def _shingle_hashes(self, text: str) -> np.ndarray:
+        """Hash the word shingles of a text to 32-bit integers."""
+        words = WORD_PATTERN.findall(text.lower())
+        if len(words) < self.shingle_size:
+            shingles = [" ".join(words)] if words else []
+        else:
+            shingles = {" ".join(words[i:i + self.shingle_size]) for i in range(len(words) - self.shingle_size + 1)}
+        return np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64)
+
+    def signature(self, text: str) -> Optional[np.ndarray]:
+        """
+        Compute the MinHash signature of a text, or None if it has no words.
+        """
+        hashes = self._shingle_hashes(text)
+        if hashes.size == 0:
+            return None
+
+        # All permutations of all shingles at once: (num_perm, num_shingles)
+        permuted = (np.outer(self.a, hashes) + self.b[:, None]) % MINHASH_PRIME
+        return permuted.min(axis=1)
+
+    def signatures(self, texts: List[str]) -> List[Optional[np.ndarray]]:
+        """Compute the signatures of a batch of texts."""
+        return [self.signature(text) for text in texts]
+
+
+class NearDuplicateIndex:
+    def __init__(self, num_perm: int = MINHASH_PERMUTATIONS, bands: int = MINHASH_BANDS,
+                 threshold: float = NEAR_DUPLICATE_THRESHOLD):
+        """
+        Locality-sensitive hashing index over MinHash signatures.
+
+        Signatures are split into bands; two chunks become candidates when any
+        band matches exactly, and are confirmed as duplicates when their
+        estimated Jaccard similarity reaches the threshold.
+        """
+        if num_perm % bands != 0:
+            raise ValueError(f"num_perm ({num_perm}) must be divisible by bands ({bands})")
+
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self.buckets: List[Dict[bytes, List[str]]] = [{} for _ in range(bands)]
+        self.signatures: Dict[str, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self.signatures)
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        return [signature[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+
+    def add(self, key: str, signature: np.ndarray) -> None:
+        """Index a signature under a key (the chunk's embedding ID)."""
+        self.signatures[key] = signature
+        for band, band_key in zip(self.buckets, self._band_keys(signature)):
+            band.setdefault(band_key, []).append(key)
+
+    def load(self, entries: Iterable[Tuple[str, np.ndarray]]) -> None:
+        """Index previously stored signatures."""
+        for key, signature in entries:
+            self.add(key, signature)
+
+    def remove(self, key: str) -> None:
+        """Drop a key from the index."""
+        signature = self.signatures.pop(key, None)
+        if signature is None:
+            return
+        for band, band_key in zip(self.buckets, self._band_keys(signature)):
+            keys = band.get(band_key)
+            if keys and key in keys:
+                keys.remove(key)
+                if not keys:
+                    del band[band_key]
+
+    def find_duplicate(self, signature: np.ndarray) -> Optional[str]:
+        """
+        Find the most similar indexed key at or above the threshold.
+        """
+        candidates = set()
+        for band, band_key in zip(self.buckets, self._band_keys(signature)):
+            candidates.update(band.get(band_key, ()))
+
+        best_key, best_similarity = None, self.threshold
+        for key in candidates:
+            similarity = float(np.mean(self.signatures[key] == signature))
+            if similarity >= best_similarity:
+                best_key, best_similarity = key, similarity
+        return best_key
@@ -2,7 +2,7 @@ import os
 import fitz  # PyMuPDF
 import re
 from pathlib import Path
-from typing import List, Dict, Tuple, Any, Generator
+from typing import List, Dict, Tuple, Any, Generator, Optional, Union
 
 from config import CHUNK_SIZE, CHUNK_OVERLAP
 
@@ -11,16 +11,21 @@ class DocumentParser:
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
 
-    def extract_pages(self, file_path: str) -> Dict[str, Any]:
+    def extract_pages(self, source: Union[str, bytes, memoryview], filename: Optional[str] = None) -> Dict[str, Any]:
         """
-        Extract text content from each page in the PDF
+        Extract text content from each page in the PDF, given its path or its bytes
         """
         pages_info = {}
         pages = []
-        doc = fitz.open(file_path)
+        if isinstance(source, str):
+            doc = fitz.open(source)
+            filename = filename or source
+        else:
+            # Parsed straight from memory, e.g. the buffer of an upload
+            doc = fitz.open(stream=source, filetype="pdf")
         title = doc.metadata.get("title", None)
         if not title:
-            title = Path(file_path).stem
+            title = Path(filename or "document").stem
         page_count = len(doc)
 
         for page_num, page in enumerate(doc):
@@ -29,6 +34,7 @@ class DocumentParser:
                 "page_number": page_num + 1,
                 "content": text
             })
+        doc.close()
 
         pages_info.update({
             "title": title,
@@ -93,12 +99,16 @@ class DocumentParser:
 
         return chunks
             
-    def process_document(self, file_path: str) -> Dict[str, Any]:
+    def process_document(self, source: Union[str, bytes, memoryview], filename: Optional[str] = None) -> Dict[str, Any]:
         """
         Process a document: parse metadata and extract chunked content.
+
+        The source is a file path, or the PDF bytes with their filename.
         """
+        file_path = source if isinstance(source, str) else None
+        filename = filename or os.path.basename(file_path or "")
 
-        pages_info = self.extract_pages(file_path)
+        pages_info = self.extract_pages(source, filename)
         title = pages_info.get('title')
         page_count = pages_info.get('page_count')
         pages = pages_info.get('pages')
@@ -113,7 +123,7 @@ class DocumentParser:
 
         return {
             "title": title,
-            "filename": os.path.basename(file_path),
+            "filename": filename,
             "path": file_path,
             "page_count": page_count,
             "chunks": all_chunks
@@ -0,0 +1,87 @@
+import numpy as np
+from typing import List, Dict, Any, Optional
+
+
+class DocumentRouter:
+    def __init__(self, document_ids: List[Any], centroids: np.ndarray, chunk_ids: Dict[Any, tuple]):
+        """
+        Immutable document-level index: one centroid per document and the
+        embedding IDs of the document's chunks.
+        """
+        self.document_ids = document_ids
+        self.centroids = centroids
+        self.chunk_ids = chunk_ids
+
+    def __len__(self) -> int:
+        return len(self.document_ids)
+
+    def route(self, query: np.ndarray, top_n: int) -> List[Any]:
+        """The top_n documents whose centroid is closest to the query."""
+        scores = self.centroids @ np.asarray(query, dtype=np.float32).reshape(-1)
+        if top_n < len(scores):
+            top = np.argpartition(-scores, top_n)[:top_n]
+        else:
+            top = np.arange(len(scores))
+        return [self.document_ids[i] for i in top[np.argsort(-scores[top])]]
+
+    def candidates(self, document_ids: List[Any]) -> np.ndarray:
+        """Embedding IDs of the chunks of the given documents."""
+        ids = [np.asarray(self.chunk_ids[document_id], dtype=np.int64) for document_id in document_ids]
+        return np.concatenate(ids) if ids else np.zeros(0, dtype=np.int64)
+
+
+class DocumentCentroids:
+    def __init__(self, dimension: int):
+        """
+        Running sums of each document's chunk vectors, kept by the writer.
+
+        Vectors whose metadata has no document_id are counted, since a
+        search routed by document would never reach them.
+        """
+        self.dimension = dimension
+        self.sums: Dict[Any, np.ndarray] = {}
+        self.chunk_ids: Dict[Any, tuple] = {}
+        self.unassigned = 0
+        self._router: Optional[DocumentRouter] = None
+
+    def add(self, document_id: Any, embedding_ids: List[int], vectors: np.ndarray) -> None:
+        if document_id is None:
+            self.unassigned += len(embedding_ids)
+            return
+        total = np.asarray(vectors, dtype=np.float64).sum(axis=0)
+        self.sums[document_id] = self.sums.get(document_id, 0) + total
+        # Replaced rather than extended, so published routers keep their own tuple
+        self.chunk_ids[document_id] = self.chunk_ids.get(document_id, ()) + tuple(embedding_ids)
+        self._router = None
+
+    def remove(self, document_id: Any, embedding_ids: List[int], vectors: np.ndarray) -> None:
+        if document_id is None:
+            self.unassigned -= len(embedding_ids)
+            return
+        if document_id not in self.sums:
+            return
+        removed = set(embedding_ids)
+        remaining = tuple(i for i in self.chunk_ids[document_id] if i not in removed)
+        if remaining:
+            self.sums[document_id] = self.sums[document_id] - np.asarray(vectors, dtype=np.float64).sum(axis=0)
+            self.chunk_ids[document_id] = remaining
+        else:
+            del self.sums[document_id]
+            del self.chunk_ids[document_id]
+        self._router = None
+
+    def router(self) -> Optional[DocumentRouter]:
+        """
+        The current DocumentRouter, or None while some vectors belong to no document.
+        """
+        if self.unassigned:
+            return None
+        if self._router is None:
+            document_ids = list(self.sums)
+            centroids = np.zeros((len(document_ids), self.dimension), dtype=np.float32)
+            for row, document_id in enumerate(document_ids):
+                centroid = self.sums[document_id]
+                norm = np.linalg.norm(centroid)
+                centroids[row] = centroid / norm if norm else centroid
+            self._router = DocumentRouter(document_ids, centroids, dict(self.chunk_ids))
+        return self._router
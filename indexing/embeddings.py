@@ -1,84 +1,202 @@
 import os
-import torch
 import numpy as np
-from typing import List, Dict, Any, Union
-from sentence_transformers import SentenceTransformer
-import google.generativeai as genai
+from typing import List, Dict, Any, Union, Optional, Tuple
 import uuid
-import openai
 
-from config import EMBEDDING_MODEL, EMBEDDING_DIMENSION, OPENAI_API_KEY, GEMINI_API_KEY
+from config import (EMBEDDING_MODEL, EMBEDDING_DIMENSION, OPENAI_API_KEY, GEMINI_API_KEY, LOCAL_EMBEDDING_MODEL,
+                    LOCAL_EMBEDDING_BACKEND, LOCAL_EMBEDDING_QUANTIZATION, LOCAL_EMBEDDING_BATCH_SIZE,
+                    LOCAL_EMBEDDING_PROCESSES, MODEL_CACHE_PATH, EMBEDDING_FALLBACK_MODEL,
+                    EMBEDDING_BREAKER_FAILURES, EMBEDDING_BREAKER_RESET_SECONDS)
+from indexing.local_embeddings import LocalEncoder
+from utils.circuit_breaker import CircuitBreaker
+from utils.metrics import REGISTRY
+
+GEMINI_EMBEDDING_MODEL = "gemini/text-embedding-004"
+OPENAI_EMBEDDING_MODEL = "openai/text-embedding-ada-002"
+PROVIDER_PREFIXES = ("gemini", "openai/")
+
+# Output dimension of the provider models; local models report their own once loaded
+PROVIDER_DIMENSIONS = {
+    "gemini/text-embedding-004": 768,
+    "openai/text-embedding-ada-002": 1536,
+    "openai/text-embedding-3-small": 1536,
+    "openai/text-embedding-3-large": 3072
+}
+
+EMBEDDING_REQUESTS = REGISTRY.counter(
+    "pdf_search_embedding_requests_total", "Embedding requests by model and outcome")
+
+
+class EmbeddingUnavailableError(RuntimeError):
+    """No embedding model could serve the request."""
+
 
 class EmbeddingGenerator:
-    def __init__(self, model_name=EMBEDDING_MODEL, embedding_dim=EMBEDDING_DIMENSION, use_openai=False, use_gemini=True):
+    def __init__(self, model_name=EMBEDDING_MODEL, embedding_dim=EMBEDDING_DIMENSION, use_openai=False, use_gemini=True,
+                 local_model_name=LOCAL_EMBEDDING_MODEL, local_backend=LOCAL_EMBEDDING_BACKEND,
+                 local_processes=LOCAL_EMBEDDING_PROCESSES, fallback_model=EMBEDDING_FALLBACK_MODEL):
         """
         Initialize the embedding generator.
+
+        Each model has a circuit breaker. While the primary model's breaker is
+        open, requests go to fallback_model, which must produce vectors of the
+        same dimension; the breaker probes the primary again after a while.
         """
 
         self.model_name = model_name
-        self.use_openai = use_openai and openai is not None and OPENAI_API_KEY
+        self.use_openai = use_openai and bool(OPENAI_API_KEY)
         self.use_gemini = self.model_name.startswith("gemini") and GEMINI_API_KEY is not None and use_gemini
+        self.embedding_dim = embedding_dim
+
+        # Provider SDKs and local models are heavy, so they load on first use
+        self._genai = None
+        self._openai = None
+        self.local_backend = local_backend
+        self.local_processes = local_processes
+        # A model_name that is no provider model is a local model, and stays the primary
+        if not model_name.startswith(PROVIDER_PREFIXES):
+            local_model_name = model_name
+        self.local = self._create_local_encoder(local_model_name)
+        self._local_encoders = {local_model_name: self.local}
 
         if self.use_gemini:
-            genai.configure(api_key=GEMINI_API_KEY)
-            self.embedding_dim = embedding_dim
+            primary = model_name if "/" in model_name else GEMINI_EMBEDDING_MODEL
         elif self.use_openai:
-            openai.api_key = OPENAI_API_KEY
-            self.embedding_dim = embedding_dim
+            primary = OPENAI_EMBEDDING_MODEL
         else:
-            self.model = SentenceTransformer(model_name)
-            self.embedding_dim = self.model.get_sentence_embedding_dimension()
+            primary = local_model_name
 
-    def get_embeddings(self, texts: List[str]) -> List[np.ndarray]:
+        self.models = [primary]
+        if fallback_model and fallback_model != primary:
+            fallback_dim = PROVIDER_DIMENSIONS.get(fallback_model)
+            if fallback_dim is not None and fallback_dim != embedding_dim:
+                raise ValueError(f"Fallback embedding model {fallback_model} produces {fallback_dim}-dimensional "
+                                 f"vectors, but the index expects {embedding_dim}")
+            self.models.append(fallback_model)
+
+        self.breakers = {
+            model: CircuitBreaker(f"embedding:{model}", EMBEDDING_BREAKER_FAILURES, EMBEDDING_BREAKER_RESET_SECONDS)
+            for model in self.models
+        }
+
+    @property
+    def primary_model(self) -> str:
+        return self.models[0]
+
+    def _create_local_encoder(self, model_name: str) -> LocalEncoder:
+        return LocalEncoder(model_name, self.local_backend, batch_size=LOCAL_EMBEDDING_BATCH_SIZE,
+                            processes=self.local_processes, quantization=LOCAL_EMBEDDING_QUANTIZATION,
+                            cache_dir=MODEL_CACHE_PATH)
+
+    def _get_genai(self):
+        """Import and configure the Gemini SDK on first use."""
+        if self._genai is None:
+            import google.generativeai as genai
+            genai.configure(api_key=GEMINI_API_KEY)
+            self._genai = genai
+        return self._genai
+
+    def _get_openai(self):
+        """Import and configure the OpenAI SDK on first use."""
+        if self._openai is None:
+            import openai
+            openai.api_key = OPENAI_API_KEY
+            self._openai = openai
+        return self._openai
+
+    def _get_local(self, model_name: str) -> LocalEncoder:
+        """The local encoder of a model, loaded on first use."""
+        if model_name not in self._local_encoders:
+            self._local_encoders[model_name] = self._create_local_encoder(model_name)
+        encoder = self._local_encoders[model_name]
+        encoder.load()
+        return encoder
+
+    def _embed_with(self, model: str, texts: List[str]) -> List[np.ndarray]:
+        """Call one model, raising on any failure."""
+        if model.startswith("gemini/"):
+            response = self._get_genai().embed_content(
+                model=f"models/{model.split('/', 1)[1]}",
+                content=texts,
+                task_type="retrieval_document"
+            )
+            return [np.array(embedding) for embedding in response["embedding"]]
+
+        if model.startswith("openai/"):
+            response = self._get_openai().embeddings.create(
+                model=model.split('/', 1)[1],
+                input=texts
+            )
+            return [np.array(item.embedding) for item in response.data]
+
+        return list(self._get_local(model).encode(texts))
+
+    def embed(self, texts: List[str]) -> Tuple[List[np.ndarray], Optional[str]]:
         """
         Generate embeddings for a list of text strings.
-        """
 
+        Returns the embeddings and the model that produced them. Raises
+        EmbeddingUnavailableError if every model failed or has its breaker open.
+        """
         if not texts:
-            return []
+            return [], None
+
+        last_error = None
+        for model in self.models:
+            breaker = self.breakers[model]
+            if not breaker.allow():
+                continue
 
-        if self.use_gemini:
-            try:
-                response = genai.embed_content(
-                    model="models/text-embedding-004",
-                    content=texts,
-                    task_type="retrieval_document"
-                )
-                return [np.array(embedding) for embedding in response["embedding"]]
-            except Exception as e:
-                print(f"Error generating Gemini embeddings: {str(e)}")
-                self.use_gemini = False
-                self.model = SentenceTransformer(self.model_name)
-                self.embedding_dim = self.model.get_sentence_embedding_dimension()
-                return self.get_embeddings(texts)
-        
-        elif self.use_openai:
             try:
-                response = openai.embeddings.create(
-                    model="text-embedding-ada-002",
-                    input=texts
-                )
-                return [np.array(item.embedding) for item in response.data]
+                embeddings = self._embed_with(model, texts)
             except Exception as e:
-                print(f"Error generating OpenAI embeddings: {str(e)}")
-                self.use_openai = False
-                self.model = SentenceTransformer(self.model_name)
-                self.embedding_dim = self.model.get_sentence_embedding_dimension()
-                return self.get_embeddings(texts)
-        else:
-            # Use local embedding model
-            embeddings = self.model.encode(texts)
-            return [np.array(embedding) for embedding in embeddings]
-        
+                print(f"Error generating embeddings with {model}: {str(e)}")
+                breaker.record_failure()
+                EMBEDDING_REQUESTS.inc(model=model, outcome="error")
+                last_error = e
+                continue
+
+            breaker.record_success()
+            EMBEDDING_REQUESTS.inc(model=model, outcome="success")
+
+            # Vectors of another size would corrupt the index, so this is never retried elsewhere
+            if len(embeddings[0]) != self.embedding_dim:
+                raise ValueError(f"Embedding model {model} produced {len(embeddings[0])}-dimensional vectors, "
+                                 f"but the index expects {self.embedding_dim}")
+            return embeddings, model
+
+        raise EmbeddingUnavailableError(
+            f"No embedding model available ({', '.join(self.models)}): {str(last_error) if last_error else 'circuit open'}"
+        )
+
+    def get_embeddings(self, texts: List[str]) -> List[np.ndarray]:
+        """
+        Generate embeddings for a list of text strings.
+        """
+        return self.embed(texts)[0]
+
     def get_embedding(self, text: str) -> np.ndarray:
         """
         Generate embedding for a single text string.
         """
         results = self.get_embeddings([text])
         return results[0] if results else np.zeros(self.embedding_dim)
-    
+
     def generate_embedding_ids(self, count: int) -> List[str]:
         """
         Generate unique IDs for embeddings.
         """
-        return [str(uuid.uuid4()) for _ in range(count)]
\ No newline at end of file
+        return [str(uuid.uuid4()) for _ in range(count)]
+
+    def status(self) -> Dict[str, Any]:
+        """
+        Breaker state of each model, primary first.
+        """
+        return {model: self.breakers[model].status() for model in self.models}
+
+    def close(self) -> None:
+        """
+        Stop the local encoding processes, if any were started.
+        """
+        for encoder in self._local_encoders.values():
+            encoder.close()
@@ -0,0 +1,232 @@
+import os
+import json
+import mmap
+import time
+import shutil
+import threading
+import faiss
+import numpy as np
+from typing import List, Dict, Any, Optional
+
+from indexing.vector_store import VectorStore, ExcludedIds
+from indexing.reduction import load_reducer, rerank
+from utils.metrics import span
+from config import INDEX_PATH, GENERATIONS_TO_KEEP, GENERATION_POLL_INTERVAL, RERANK_CANDIDATES
+
+GENERATIONS_DIR = "generations"
+CURRENT_FILE = "CURRENT"
+INDEX_FILE = "index.faiss"
+METADATA_FILE = "metadata.jsonl"
+OFFSETS_FILE = "offsets.npy"
+VECTORS_FILE = "vectors.npy"
+REDUCER_FILE = "reducer.npz"
+
+# Memory-map flat index codes when faiss supports it, so workers share pages
+MMAP_FLAG = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP)
+
+
+def publish_generation(vector_store: VectorStore, root: str = INDEX_PATH, keep: int = GENERATIONS_TO_KEEP) -> str:
+    """
+    Write an immutable snapshot of the index and point readers at it.
+
+    The snapshot is written to a fresh directory first and the CURRENT pointer
+    is then swapped with an atomic rename, so readers only ever see a
+    complete generation.
+    """
+    generations_path = os.path.join(root, GENERATIONS_DIR)
+    os.makedirs(generations_path, exist_ok=True)
+
+    existing = sorted(name for name in os.listdir(generations_path) if name.startswith("gen-"))
+    number = int(existing[-1].split("-")[1]) + 1 if existing else 1
+    name = f"gen-{number:06d}"
+    staging_path = os.path.join(generations_path, f".{name}.tmp")
+    os.makedirs(staging_path, exist_ok=True)
+
+    faiss.write_index(vector_store.index, os.path.join(staging_path, INDEX_FILE))
+
+    # A reduced or compressed index needs the full vectors (and the projection) to re-score candidates
+    if vector_store.uses_candidates:
+        shutil.copyfile(vector_store.full_vectors.path, os.path.join(staging_path, VECTORS_FILE))
+        if vector_store.reducer is not None:
+            vector_store.reducer.save(os.path.join(staging_path, REDUCER_FILE))
+
+    # One JSON line per embedding ID; offsets[i]:offsets[i + 1] is the line of ID i
+    offsets = np.zeros(vector_store.next_id + 1, dtype=np.int64)
+    position = 0
+    with open(os.path.join(staging_path, METADATA_FILE), 'wb') as f:
+        for embedding_id in range(vector_store.next_id):
+            offsets[embedding_id] = position
+            # Deleted embeddings get an empty line range, like missing ones
+            metadata = vector_store.get_metadata(str(embedding_id))
+            if metadata is not None:
+                line = json.dumps(metadata).encode("utf-8") + b"\n"
+                f.write(line)
+                position += len(line)
+        offsets[vector_store.next_id] = position
+    np.save(os.path.join(staging_path, OFFSETS_FILE), offsets)
+
+    os.rename(staging_path, os.path.join(generations_path, name))
+
+    pointer_tmp = os.path.join(root, f".{CURRENT_FILE}.tmp")
+    with open(pointer_tmp, 'w') as f:
+        f.write(name)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(pointer_tmp, os.path.join(root, CURRENT_FILE))
+
+    # Readers that still map an old generation keep working after the unlink
+    for old_name in (existing + [name])[:-keep]:
+        shutil.rmtree(os.path.join(generations_path, old_name), ignore_errors=True)
+
+    return name
+
+
+class ReadOnlyVectorStore:
+    def __init__(self, generation_path: str):
+        """
+        Open a published generation read-only and memory-mapped.
+        """
+        self.generation_path = generation_path
+        self.name = os.path.basename(generation_path)
+
+        self.index = faiss.read_index(os.path.join(generation_path, INDEX_FILE),
+                                      MMAP_FLAG | faiss.IO_FLAG_READ_ONLY)
+        self.offsets = np.load(os.path.join(generation_path, OFFSETS_FILE), mmap_mode='r')
+        # IDs without metadata were deleted but their vectors are still in the index; searches skip them
+        deleted_ids = np.flatnonzero(np.diff(self.offsets) == 0)
+        self.deleted_count = len(deleted_ids)
+        self._exclusion = ExcludedIds(self.index, deleted_ids) if len(deleted_ids) else None
+
+        self.full_vectors = None
+        self.reducer = None
+        if os.path.exists(os.path.join(generation_path, VECTORS_FILE)):
+            self.full_vectors = np.load(os.path.join(generation_path, VECTORS_FILE), mmap_mode='r')
+            self.reducer = load_reducer(os.path.join(generation_path, REDUCER_FILE), self.full_vectors.shape[1])
+
+        self._metadata_file = open(os.path.join(generation_path, METADATA_FILE), 'rb')
+        size = os.fstat(self._metadata_file.fileno()).st_size
+        self._metadata_map = mmap.mmap(self._metadata_file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+    @property
+    def next_id(self) -> int:
+        return len(self.offsets) - 1
+
+    def get_metadata(self, embedding_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get metadata for an embedding.
+        """
+        idx = int(embedding_id)
+        if idx < 0 or idx >= self.next_id:
+            return None
+
+        start, end = int(self.offsets[idx]), int(self.offsets[idx + 1])
+        if start == end:
+            return None
+        return json.loads(self._metadata_map[start:end])
+
+    def _index_search(self, query: np.ndarray, k: int):
+        """Search the FAISS index, skipping deleted vectors."""
+        if self._exclusion is not None:
+            return self._exclusion.search(self.index, query, k)
+        return self.index.search(query, k)
+
+    def search(self, query_embedding: np.ndarray, top_k: int = 5) -> List[Dict[str, Any]]:
+        """
+        Search for similar vectors.
+        """
+        if self.index.ntotal == 0:
+            return []
+
+        query_embedding = np.array([query_embedding]).astype('float32')
+        fetch_k = min(top_k, self.index.ntotal)
+        if self.full_vectors is not None:
+            index_query = self.reducer.transform(query_embedding) if self.reducer is not None else query_embedding
+            with span("faiss_search"):
+                _, candidates = self._index_search(index_query, max(RERANK_CANDIDATES, fetch_k))
+            with span("rerank"):
+                distances, indices = rerank(query_embedding[0], candidates[0].tolist(), self.full_vectors, fetch_k)
+        else:
+            with span("faiss_search"):
+                distances, indices = self._index_search(query_embedding, fetch_k)
+            distances, indices = distances[0].tolist(), indices[0].tolist()
+
+        results = []
+        with span("metadata_lookup"):
+            for distance, idx in zip(distances, indices):
+                if idx == -1:
+                    continue
+
+                metadata = self.get_metadata(str(idx))
+                if metadata is not None:
+                    results.append({
+                        "distance": distance,
+                        "score": (1 + distance) / 2,
+                        "metadata": metadata
+                    })
+
+        return results[:top_k]
+
+
+class SharedIndexReader:
+    def __init__(self, root: str = INDEX_PATH, poll_interval: float = GENERATION_POLL_INTERVAL):
+        """
+        Serve searches from the latest published generation.
+
+        Args:
+            root: Index directory the writer publishes generations into
+            poll_interval: Minimum seconds between checks for a new generation
+        """
+        self.root = root
+        self.poll_interval = poll_interval
+        self.current = None
+        self._last_check = 0.0
+        self._reload_lock = threading.Lock()
+        self.reload()
+
+    def reload(self) -> bool:
+        """
+        Switch to the generation CURRENT points at, if it changed.
+        """
+        with self._reload_lock:
+            return self._reload_locked()
+
+    def _reload_locked(self) -> bool:
+        """Reload while holding the reload lock."""
+        self._last_check = time.monotonic()
+        try:
+            with open(os.path.join(self.root, CURRENT_FILE), 'r') as f:
+                name = f.read().strip()
+        except FileNotFoundError:
+            return False
+
+        if self.current is not None and self.current.name == name:
+            return False
+
+        try:
+            snapshot = ReadOnlyVectorStore(os.path.join(self.root, GENERATIONS_DIR, name))
+        except Exception as e:
+            print(f"Error loading index generation {name}: {str(e)}. Keeping the current one.")
+            return False
+
+        # Searches in flight keep the snapshot they started with
+        self.current = snapshot
+        print(f"Loaded index generation {name} ({snapshot.index.ntotal} vectors)")
+        return True
+
+    def _get_current(self) -> Optional[ReadOnlyVectorStore]:
+        """Get the current snapshot, checking for a newer one at most every poll interval."""
+        # Only one thread checks; the others carry on with the current snapshot
+        if time.monotonic() - self._last_check >= self.poll_interval and self._reload_lock.acquire(blocking=False):
+            try:
+                self._reload_locked()
+            finally:
+                self._reload_lock.release()
+        return self.current
+
+    def get_metadata(self, embedding_id: str) -> Optional[Dict[str, Any]]:
+        current = self._get_current()
+        return current.get_metadata(embedding_id) if current else None
+
+    def search(self, query_embedding: np.ndarray, top_k: int = 5) -> List[Dict[str, Any]]:
+        current = self._get_current()
+        return current.search(query_embedding, top_k) if current else []
@@ -0,0 +1,113 @@
+import os
+import numpy as np
+from typing import List, Optional
+
+LOCAL_BACKENDS = ("torch", "onnx", "onnx-int8")
+
+
+class LocalEncoder:
+    def __init__(self, model_name: str, backend: str = "torch", batch_size: int = 64, processes: int = 0,
+                 quantization: str = "avx512_vnni", cache_dir: Optional[str] = None):
+        """
+        CPU embedding model run through sentence-transformers.
+
+        Args:
+            model_name: SentenceTransformer model name or path
+            backend: "torch" (fp32), "onnx" (ONNX Runtime) or "onnx-int8" (dynamically quantized ONNX)
+            batch_size: Texts per forward pass
+            processes: Encoding processes for large calls; 0 encodes in this process
+            quantization: ONNX Runtime quantization config for "onnx-int8" (avx512_vnni, avx512, avx2 or arm64)
+            cache_dir: Where a quantized export of the model is kept if the model ships none
+        """
+        if backend not in LOCAL_BACKENDS:
+            raise ValueError(f"Unsupported local embedding backend: {backend}")
+
+        self.model_name = model_name
+        self.backend = backend
+        self.batch_size = batch_size
+        self.processes = processes
+        self.quantization = quantization
+        self.cache_dir = cache_dir
+        self.model = None
+        self._pool = None
+
+    @property
+    def quantized_file(self) -> str:
+        return f"onnx/model_qint8_{self.quantization}.onnx"
+
+    def load(self):
+        """Load the model on first use."""
+        if self.model is None:
+            from sentence_transformers import SentenceTransformer
+
+            if self.backend == "torch":
+                self.model = SentenceTransformer(self.model_name, device="cpu")
+            elif self.backend == "onnx":
+                self.model = SentenceTransformer(self.model_name, device="cpu", backend="onnx")
+            else:
+                self.model = self._load_quantized()
+        return self.model
+
+    def _load_quantized(self):
+        """
+        Load the int8 ONNX model shipped with the model, or quantize it once
+        into cache_dir if there is none.
+        """
+        from sentence_transformers import SentenceTransformer
+
+        try:
+            return SentenceTransformer(self.model_name, device="cpu", backend="onnx",
+                                       model_kwargs={"file_name": self.quantized_file})
+        except Exception as e:
+            print(f"No {self.quantized_file} for {self.model_name} ({str(e)}). Quantizing locally.")
+
+        if not self.cache_dir:
+            raise ValueError("A cache directory is needed to quantize the model")
+        export_dir = os.path.join(self.cache_dir, self.model_name.replace("/", "__"))
+        if not os.path.exists(os.path.join(export_dir, self.quantized_file)):
+            from sentence_transformers import export_dynamic_quantized_onnx_model
+
+            model = SentenceTransformer(self.model_name, device="cpu", backend="onnx")
+            model.save_pretrained(export_dir)
+            export_dynamic_quantized_onnx_model(model, self.quantization, export_dir)
+
+        return SentenceTransformer(export_dir, device="cpu", backend="onnx",
+                                   model_kwargs={"file_name": self.quantized_file})
+
+    @property
+    def dimension(self) -> int:
+        return self.load().get_sentence_embedding_dimension()
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """
+        Embed texts; returns a float32 array with one row per text.
+        """
+        model = self.load()
+        if self.processes > 1 and len(texts) >= self.processes * self.batch_size:
+            return self._encode_in_pool(texts)
+        # encode() sorts the texts by length itself, so batches carry little padding
+        return model.encode(texts, batch_size=self.batch_size, convert_to_numpy=True).astype(np.float32)
+
+    def _encode_in_pool(self, texts: List[str]) -> np.ndarray:
+        """
+        Spread a large call over the encoding processes.
+
+        The pool hands out consecutive chunks, so texts are sorted by length
+        first: each process then gets texts of similar length and pads little.
+        """
+        if self._pool is None:
+            self._pool = self.model.start_multi_process_pool(target_devices=["cpu"] * self.processes)
+
+        order = np.argsort([len(text) for text in texts], kind="stable")
+        chunk_size = max(self.batch_size, -(-len(texts) // (self.processes * 4)))
+        embeddings = self.model.encode_multi_process([texts[i] for i in order], self._pool,
+                                                     batch_size=self.batch_size, chunk_size=chunk_size)
+        result = np.empty_like(embeddings, dtype=np.float32)
+        result[order] = embeddings
+        return result
+
+    def close(self) -> None:
+        """Stop the encoding processes, if any were started."""
+        if self._pool is not None:
+            self.model.stop_multi_process_pool(self._pool)
+            self._pool = None
@@ -0,0 +1,483 @@
+import os
+import hashlib
+import sqlite3
+import threading
+from typing import List, Dict, Any, Optional, Tuple, Union
+
+from database.document_registry import DocumentRegistry
+from indexing.document_parser import DocumentParser
+from indexing.embeddings import EmbeddingGenerator
+from indexing.vector_store import VectorStore
+from indexing.text_features import compute_text_features
+from indexing.dedup import MinHasher, NearDuplicateIndex
+from utils.helpers import hash_file
+from config import NEAR_DUPLICATE_DETECTION, DEFAULT_COLLECTION
+
+
+def _content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _content_digest(content: Union[bytes, memoryview]) -> str:
+    return hashlib.sha256(content).hexdigest()
+
+
+class IngestionPipeline:
+    def __init__(self, document_parser: DocumentParser, embedding_generator: EmbeddingGenerator,
+                 vector_store: VectorStore, registry: DocumentRegistry, presummarizer=None,
+                 detect_near_duplicates: bool = NEAR_DUPLICATE_DETECTION, collection: str = DEFAULT_COLLECTION):
+        """
+        Initialize the ingestion pipeline.
+
+        Args:
+            document_parser: Parser that extracts and chunks PDF text
+            embedding_generator: Embedding generator for the chunks
+            vector_store: Vector store the chunks are indexed into
+            registry: Persistent registry of documents and their chunks
+            presummarizer: Optional PreSummarizer run in the background after indexing
+            detect_near_duplicates: Store near-identical chunks once and reference them
+            collection: Collection the vector store belongs to
+        """
+        self.document_parser = document_parser
+        self.embedding_generator = embedding_generator
+        self.vector_store = vector_store
+        self.registry = registry
+        self.presummarizer = presummarizer
+        self.collection = collection
+
+        self.minhasher = None
+        self.dedup_index = None
+        self.dedup_lock = threading.Lock()
+        if detect_near_duplicates:
+            self.minhasher = MinHasher()
+            self.dedup_index = NearDuplicateIndex()
+            self.dedup_index.load(self.registry.iter_signatures(collection))
+
+    def ingest(self, file_path: str, mark_indexed: bool = True, file_hash: Optional[str] = None,
+               content: Optional[Union[bytes, memoryview]] = None) -> Dict[str, Any]:
+        """
+        Parse, embed and index a PDF file, and register it as a document.
+
+        A file whose content was uploaded before is not processed again; the
+        existing document is returned with duplicate=True.
+
+        Pass mark_indexed=False when the chunks only become searchable later,
+        e.g. once the ingest worker publishes the next index generation.
+        Pass the PDF bytes as content to parse them from memory; file_path is
+        then only recorded as where the file is kept.
+        """
+        if file_hash is None:
+            file_hash = _content_digest(content) if content is not None else hash_file(file_path)
+
+        existing = self.registry.find_document_by_hash(file_hash, self.collection)
+        if existing:
+            return {**existing, 'duplicate': True}
+
+        document_data = self._parse(file_path, content)
+        return self.ingest_parsed([(file_path, file_hash, document_data)], mark_indexed=mark_indexed)[0]
+
+    def _parse(self, file_path: str, content: Optional[Union[bytes, memoryview]]) -> Dict[str, Any]:
+        if content is None:
+            return self.document_parser.process_document(file_path)
+        return self.document_parser.process_document(content, filename=os.path.basename(file_path))
+
+    def ingest_parsed(self, parsed_documents: List[Tuple[str, str, Dict[str, Any]]], mark_indexed: bool = True,
+                      persist: bool = True, embedding_batch_size: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Embed and index already parsed documents together.
+
+        Args:
+            parsed_documents: (file_path, file_hash, DocumentParser.process_document output) per document
+            mark_indexed: Mark the documents as searchable once registered
+            persist: Save the vector store; pass False to save once after several batches
+            embedding_batch_size: Texts per embedding request (all at once if None)
+
+        Returns the registered document per input, in order.
+        """
+        documents: List[Optional[Dict[str, Any]]] = [None] * len(parsed_documents)
+
+        new_documents = []
+        first_embedding_id = self.vector_store.next_id
+        shared_before: Dict[str, List[int]] = {}
+        try:
+            # Register the documents, skipping files whose content is already known
+            for i, (file_path, file_hash, document_data) in enumerate(parsed_documents):
+                existing = self.registry.find_document_by_hash(file_hash, self.collection)
+                if existing:
+                    documents[i] = {**existing, 'duplicate': True}
+                    continue
+
+                try:
+                    document_id = self.registry.create_document(
+                        filename=document_data['filename'],
+                        path=file_path,
+                        title=document_data['title'],
+                        page_count=document_data['page_count'],
+                        file_hash=file_hash,
+                        collection=self.collection
+                    )
+                except sqlite3.IntegrityError:
+                    # The same file was registered concurrently
+                    existing = self.registry.find_document_by_hash(file_hash, self.collection)
+                    documents[i] = {**existing, 'duplicate': True}
+                    continue
+                new_documents.append((i, document_id, document_data))
+
+            # Chunks of all new documents are embedded and deduplicated as one batch
+            all_chunks = []
+            for i, document_id, document_data in new_documents:
+                for chunk in document_data['chunks']:
+                    all_chunks.append((document_id, document_data['title'], chunk))
+
+            with self.dedup_lock:
+                embedding_ids, duplicate_of, unique_ids, shared_before = self._index_chunks(
+                    all_chunks, persist, embedding_batch_size
+                )
+
+            # The registry only references chunks; their text stays in the vector store
+            offset = 0
+            for i, document_id, document_data in new_documents:
+                chunks = document_data['chunks']
+                self.registry.add_chunks(document_id, [
+                    {
+                        'chunk_index': chunk['chunk_index'],
+                        'page_number': chunk['page_number'],
+                        'embedding_id': embedding_ids[offset + position]
+                    }
+                    for position, chunk in enumerate(chunks)
+                ])
+
+                document = self.registry.get_document(document_id)
+                document['duplicate'] = False
+                document['near_duplicate_chunks'] = sum(
+                    1 for position in range(offset, offset + len(chunks)) if duplicate_of[position] is not None
+                )
+                documents[i] = document
+                offset += len(chunks)
+
+            if mark_indexed and new_documents:
+                self.registry.mark_indexed([document_id for _, document_id, _ in new_documents])
+                for i, _, _ in new_documents:
+                    documents[i]['indexed'] = True
+        except BaseException:
+            # Unregister the documents so the same files can be uploaded again later
+            self._discard_documents([document_id for _, document_id, _ in new_documents], first_embedding_id,
+                                    shared_before)
+            raise
+
+        # Summaries are generated in the background so ingestion is not held up
+        if self.presummarizer and unique_ids:
+            self.presummarizer.submit(unique_ids)
+
+        return documents
+
+    def _discard_documents(self, document_ids: List[int], first_embedding_id: int,
+                           shared_before: Dict[str, List[int]]) -> None:
+        """
+        Undo a failed ingest: unregister the documents, delete the vectors
+        added for them from first_embedding_id on, and take them off the
+        shared_by_documents of the vectors they were near duplicates of.
+        """
+        if not document_ids:
+            return
+        try:
+            self.registry.delete_documents(document_ids)
+            with self.dedup_lock:
+                discarded = set(document_ids)
+                updates = {}
+                for embedding_id in shared_before:
+                    metadata = self.vector_store.get_metadata(embedding_id) or {}
+                    updates[embedding_id] = {'shared_by_documents': [i for i in metadata.get('shared_by_documents', [])
+                                                                     if i not in discarded]}
+                self.vector_store.update_metadata(updates)
+
+                added = [str(i) for i in range(first_embedding_id, self.vector_store.next_id)
+                         if (self.vector_store.get_metadata(str(i)) or {}).get('document_id') in discarded]
+                self._delete_vectors(added)
+        except Exception as e:
+            print(f"Error discarding documents {document_ids}: {str(e)}")
+
+    def _delete_vectors(self, embedding_ids: List[str]) -> None:
+        """Delete vectors along with their near-duplicate signatures. Call with dedup_lock held."""
+        if not embedding_ids:
+            return
+        if self.dedup_index is not None:
+            for embedding_id in embedding_ids:
+                self.dedup_index.remove(embedding_id)
+        self.registry.delete_signatures(embedding_ids, self.collection)
+        self.vector_store.delete_embeddings(embedding_ids)
+
+    def replace(self, document_id: int, file_path: str, file_hash: Optional[str] = None,
+                content: Optional[Union[bytes, memoryview]] = None) -> Dict[str, Any]:
+        """
+        Replace a document with a new version of its file, keeping its ID.
+
+        Chunks are matched to the old version by a hash of their content:
+        unchanged chunks keep their vectors and embedding IDs, only new or
+        edited chunks are embedded, and the vectors of chunks that disappeared
+        are deleted. The file can be given as content, as in ingest().
+
+        Returns the updated document with the re-indexing stats.
+        """
+        document = self.registry.get_document(document_id, fields=['id', 'collection', 'file_hash'])
+        if document is None or document['collection'] != self.collection:
+            raise ValueError(f"Document {document_id} is not in collection '{self.collection}'")
+
+        if file_hash is None:
+            file_hash = _content_digest(content) if content is not None else hash_file(file_path)
+        if file_hash == document['file_hash']:
+            document = self.registry.get_document(document_id)
+            chunk_count = document['chunk_count']
+            document['reindex'] = {'chunks': chunk_count, 'unchanged': chunk_count, 'embedded': 0,
+                                   'near_duplicates': 0, 'removed': 0, 'embedding_work_saved_pct': 100.0}
+            return document
+
+        existing = self.registry.find_document_by_hash(file_hash, self.collection)
+        if existing and existing['id'] != document_id:
+            raise ValueError(f"This file is already uploaded as document {existing['id']}")
+
+        document_data = self._parse(file_path, content)
+        chunks = document_data['chunks']
+
+        # Old chunks that own their vector, by content hash
+        old_ids, cursor = [], None
+        while True:
+            page, cursor = self.registry.list_chunks(document_id, limit=500, cursor=cursor)
+            old_ids.extend(chunk['embedding_id'] for chunk in page)
+            if cursor is None:
+                break
+        owned = {}
+        for embedding_id in dict.fromkeys(old_ids):
+            metadata = self.vector_store.get_metadata(embedding_id)
+            if metadata is not None and metadata.get('document_id') == document_id:
+                owned.setdefault(_content_hash(metadata['content']), []).append(embedding_id)
+
+        embedding_ids: List[Optional[str]] = [None] * len(chunks)
+        reused = {}
+        for position, chunk in enumerate(chunks):
+            matches = owned.get(_content_hash(chunk['content']))
+            if matches:
+                embedding_ids[position] = matches.pop(0)
+                reused[embedding_ids[position]] = {
+                    'document_title': document_data['title'],
+                    'page_number': chunk['page_number'],
+                    'chunk_index': chunk['chunk_index']
+                }
+        leftover = [embedding_id for ids in owned.values() for embedding_id in ids]
+        changed = [position for position, embedding_id in enumerate(embedding_ids) if embedding_id is None]
+
+        with self.dedup_lock:
+            # Vectors about to be deleted must not be matched as near duplicates of the new chunks
+            removed_signatures = {}
+            for embedding_id in leftover:
+                if self.dedup_index is not None and embedding_id in self.dedup_index.signatures:
+                    removed_signatures[embedding_id] = self.dedup_index.signatures[embedding_id]
+                    self.dedup_index.remove(embedding_id)
+
+            deleted = set()
+            try:
+                new_ids, duplicate_of, unique_ids, shared_before = self._index_chunks(
+                    [(document_id, document_data['title'], chunks[position]) for position in changed], persist=False
+                )
+                for position, embedding_id in zip(changed, new_ids):
+                    embedding_ids[position] = embedding_id
+                updates, to_delete = self._release_vectors(document_id, leftover, old_ids, embedding_ids)
+
+                # The registry switches to the new chunks first; until it has, the old version stays intact
+                try:
+                    self.registry.replace_document(
+                        document_id,
+                        filename=document_data['filename'],
+                        path=file_path,
+                        title=document_data['title'],
+                        page_count=document_data['page_count'],
+                        file_hash=file_hash,
+                        chunks=[
+                            {
+                                'chunk_index': chunk['chunk_index'],
+                                'page_number': chunk['page_number'],
+                                'embedding_id': embedding_ids[position]
+                            }
+                            for position, chunk in enumerate(chunks)
+                        ]
+                    )
+                except BaseException:
+                    self.vector_store.update_metadata({embedding_id: {'shared_by_documents': shared_by}
+                                                       for embedding_id, shared_by in shared_before.items()},
+                                                      persist=False)
+                    self._delete_vectors(unique_ids)
+                    raise
+
+                self.vector_store.update_metadata({**reused, **updates}, persist=False)
+                self.vector_store.delete_embeddings(to_delete, persist=False)
+                deleted = set(to_delete)
+                self.registry.delete_signatures(to_delete, self.collection)
+                self.vector_store.save()
+            finally:
+                # Every vector that was not deleted stays available for deduplication:
+                # all of the old version's on failure, those handed over on success
+                if self.dedup_index is not None:
+                    self.dedup_index.load((embedding_id, signature) for embedding_id, signature
+                                          in removed_signatures.items() if embedding_id not in deleted)
+
+        if self.presummarizer and unique_ids:
+            self.presummarizer.submit(unique_ids)
+
+        document = self.registry.get_document(document_id)
+        document['reindex'] = {
+            'chunks': len(chunks),
+            'unchanged': len(chunks) - len(changed),
+            'embedded': len(unique_ids),
+            'near_duplicates': sum(1 for match in duplicate_of if match is not None),
+            'removed': len(leftover),
+            'embedding_work_saved_pct': round(100 * (1 - len(unique_ids) / len(chunks)), 1) if chunks else 100.0
+        }
+        return document
+
+    def _release_vectors(self, document_id: int, leftover: List[str], old_ids: List[str],
+                         new_ids: List[str]) -> Tuple[Dict[str, Dict[str, Any]], List[str]]:
+        """
+        Work out what happens to the vectors a replaced document no longer references.
+
+        Its own vectors are deleted, unless other documents share them, in
+        which case one of those documents takes them over. Vectors of other
+        documents stop listing it in shared_by_documents.
+
+        Returns the metadata updates and the IDs of the vectors to delete.
+        """
+        updates, deleted = {}, []
+        for embedding_id in leftover:
+            metadata = self.vector_store.get_metadata(embedding_id)
+            shared_by = [i for i in metadata.get('shared_by_documents', []) if i != document_id]
+            if not shared_by:
+                deleted.append(embedding_id)
+                continue
+            owner = self.registry.get_document(shared_by[0], fields=['title'])
+            updates[embedding_id] = {'document_id': shared_by[0], 'document_title': owner['title'] if owner else '',
+                                     'shared_by_documents': shared_by[1:]}
+
+        still_referenced = set(new_ids)
+        for embedding_id in set(old_ids) - still_referenced:
+            metadata = self.vector_store.get_metadata(embedding_id)
+            if metadata is not None and document_id in metadata.get('shared_by_documents', []):
+                updates[embedding_id] = {'shared_by_documents': [i for i in metadata['shared_by_documents']
+                                                                 if i != document_id]}
+        return updates, deleted
+
+    def _index_chunks(self, all_chunks: List[Tuple[int, str, Dict[str, Any]]], persist: bool,
+                      embedding_batch_size: Optional[int] = None
+                      ) -> Tuple[List[str], List[Optional[Tuple[str, Any]]], List[str], Dict[str, List[int]]]:
+        """
+        Deduplicate, embed and add chunks to the vector store. Call with dedup_lock held.
+
+        Args:
+            all_chunks: (document_id, document_title, chunk) per chunk
+            persist: Save the vector store
+            embedding_batch_size: Texts per embedding request (all at once if None)
+
+        Returns the embedding ID of each chunk, its near-duplicate match (see
+        _find_near_duplicates), the IDs of the vectors added, and the previous
+        shared_by_documents of the existing vectors that chunks now share.
+        """
+        chunk_texts = [chunk['content'] for _, _, chunk in all_chunks]
+        signatures, duplicate_of = self._find_near_duplicates(chunk_texts)
+        unique = [i for i in range(len(all_chunks)) if duplicate_of[i] is None]
+
+        unique_texts = [chunk_texts[i] for i in unique]
+        batch_size = embedding_batch_size or max(len(unique_texts), 1)
+        chunk_embeddings, chunk_models = [], []
+        for start in range(0, len(unique_texts), batch_size):
+            embeddings, model = self.embedding_generator.embed(unique_texts[start:start + batch_size])
+            chunk_embeddings.extend(embeddings)
+            chunk_models.extend([model] * len(embeddings))
+        chunk_features = compute_text_features(unique_texts)
+
+        # Prepare metadata for each chunk that gets its own vector
+        metadata_list = []
+        for i, chunk_position in enumerate(unique):
+            document_id, title, chunk = all_chunks[chunk_position]
+            metadata = {
+                'document_id': document_id,
+                'document_title': title,
+                'content': chunk['content'],
+                'page_number': chunk['page_number'],
+                'chunk_index': chunk['chunk_index'],
+                'features': chunk_features[i],
+                'embedding_model': chunk_models[i]
+            }
+            metadata_list.append(metadata)
+
+        # Add embeddings to vector store
+        unique_ids = self.vector_store.add_embeddings(chunk_embeddings, metadata_list, persist=persist)
+
+        embedding_ids = [None] * len(all_chunks)
+        for chunk_position, embedding_id in zip(unique, unique_ids):
+            embedding_ids[chunk_position] = embedding_id
+
+        new_signatures = {}
+        for chunk_position, embedding_id in zip(unique, unique_ids):
+            if signatures[chunk_position] is not None:
+                new_signatures[embedding_id] = signatures[chunk_position]
+                self.dedup_index.add(embedding_id, signatures[chunk_position])
+        if new_signatures:
+            self.registry.add_signatures(new_signatures, self.collection)
+
+        # Near duplicates point at the vector of the chunk they duplicate
+        shared = {}
+        for chunk_position, match in enumerate(duplicate_of):
+            if match is None:
+                continue
+            kind, target = match
+            if kind == "batch":
+                target = embedding_ids[target]
+            embedding_ids[chunk_position] = target
+
+            document_id = all_chunks[chunk_position][0]
+            metadata = self.vector_store.get_metadata(target) or {}
+            if metadata.get('document_id') != document_id:
+                shared.setdefault(target, set()).add(document_id)
+
+        shared_before = {}
+        if shared:
+            updates = {}
+            for embedding_id, document_ids in shared.items():
+                metadata = self.vector_store.get_metadata(embedding_id) or {}
+                shared_before[embedding_id] = metadata.get('shared_by_documents', [])
+                updates[embedding_id] = {'shared_by_documents': sorted(set(shared_before[embedding_id]) | document_ids)}
+            self.vector_store.update_metadata(updates, persist=persist)
+
+        return embedding_ids, duplicate_of, unique_ids, shared_before
+
+    def _find_near_duplicates(self, chunk_texts: List[str]) -> Tuple[List[Any], List[Optional[Tuple[str, Any]]]]:
+        """
+        Match each chunk against indexed chunks and earlier chunks of the batch.
+
+        Returns the chunk signatures and, per chunk, None if it is unique,
+        ("indexed", embedding_id) or ("batch", position) if it is a near duplicate.
+        """
+        if self.minhasher is None:
+            return [None] * len(chunk_texts), [None] * len(chunk_texts)
+
+        signatures = self.minhasher.signatures(chunk_texts)
+        batch_index = NearDuplicateIndex(bands=self.dedup_index.bands, threshold=self.dedup_index.threshold)
+
+        duplicate_of = []
+        for position, signature in enumerate(signatures):
+            if signature is None:
+                duplicate_of.append(None)
+                continue
+
+            match = self.dedup_index.find_duplicate(signature)
+            if match is not None:
+                duplicate_of.append(("indexed", match))
+                continue
+
+            match = batch_index.find_duplicate(signature)
+            if match is not None:
+                duplicate_of.append(("batch", int(match)))
+                continue
+
+            batch_index.add(str(position), signature)
+            duplicate_of.append(None)
+
+        return signatures, duplicate_of
@@ -0,0 +1,125 @@
+import os
+import numpy as np
+from typing import List, Optional, Tuple
+
+
+class PCAReducer:
+    kind = "pca"
+
+    def __init__(self, dimension: int, target_dimension: int):
+        """
+        Project vectors onto the top principal directions of the corpus.
+
+        The projection is learned without centering, so inner products in the
+        reduced space approximate the full-dimension inner products.
+        """
+        if target_dimension >= dimension:
+            raise ValueError(f"Reduced dimension ({target_dimension}) must be below {dimension}")
+
+        self.dimension = dimension
+        self.target_dimension = target_dimension
+        self.components: Optional[np.ndarray] = None
+
+    @property
+    def is_trained(self) -> bool:
+        return self.components is not None
+
+    def fit(self, vectors: np.ndarray, block_size: int = 65536) -> None:
+        """
+        Learn the projection from corpus vectors.
+        """
+        # The d x d second-moment matrix is accumulated in blocks, so the
+        # vectors may be a memory-mapped array larger than RAM
+        moment = np.zeros((self.dimension, self.dimension), dtype=np.float64)
+        for start in range(0, len(vectors), block_size):
+            block = np.asarray(vectors[start:start + block_size], dtype=np.float64)
+            moment += block.T @ block
+
+        eigenvalues, eigenvectors = np.linalg.eigh(moment)
+        top = np.argsort(eigenvalues)[::-1][:self.target_dimension]
+        self.components = np.ascontiguousarray(eigenvectors[:, top].T, dtype=np.float32)
+
+    def transform(self, vectors: np.ndarray) -> np.ndarray:
+        return np.ascontiguousarray(np.asarray(vectors, dtype=np.float32) @ self.components.T)
+
+    def save(self, path: str) -> None:
+        np.savez(path, kind=self.kind, target_dimension=self.target_dimension, components=self.components)
+
+    def _load(self, data) -> None:
+        self.components = data["components"].astype(np.float32)
+
+
+class MatryoshkaReducer:
+    kind = "matryoshka"
+
+    def __init__(self, dimension: int, target_dimension: int):
+        """
+        Keep the leading dimensions of embeddings trained Matryoshka-style,
+        whose prefixes are themselves usable embeddings.
+        """
+        if target_dimension >= dimension:
+            raise ValueError(f"Reduced dimension ({target_dimension}) must be below {dimension}")
+
+        self.dimension = dimension
+        self.target_dimension = target_dimension
+
+    @property
+    def is_trained(self) -> bool:
+        return True
+
+    def fit(self, vectors: np.ndarray) -> None:
+        pass
+
+    def transform(self, vectors: np.ndarray) -> np.ndarray:
+        truncated = np.array(np.asarray(vectors, dtype=np.float32)[:, :self.target_dimension])
+        norms = np.linalg.norm(truncated, axis=1, keepdims=True)
+        return truncated / np.where(norms == 0, 1, norms)
+
+    def save(self, path: str) -> None:
+        np.savez(path, kind=self.kind, target_dimension=self.target_dimension)
+
+    def _load(self, data) -> None:
+        pass
+
+
+REDUCERS = {reducer.kind: reducer for reducer in (PCAReducer, MatryoshkaReducer)}
+
+
+def create_reducer(kind: str, dimension: int, target_dimension: int):
+    """
+    Build the reducer of the given kind, or None for "none".
+    """
+    if not kind or kind == "none":
+        return None
+    if kind not in REDUCERS:
+        raise ValueError(f"Unsupported vector reduction: {kind}")
+    return REDUCERS[kind](dimension, target_dimension)
+
+
+def load_reducer(path: str, dimension: int):
+    """Load a reducer saved with save(), or None if there is none."""
+    if not os.path.exists(path):
+        return None
+
+    with np.load(path) as data:
+        reducer = REDUCERS[str(data["kind"])](dimension, int(data["target_dimension"]))
+        reducer._load(data)
+    return reducer
+
+
+def rerank(query_embedding: np.ndarray, candidate_ids: List[int], full_vectors: np.ndarray,
+           top_k: int) -> Tuple[List[float], List[int]]:
+    """
+    Re-score candidates exactly against their full-dimension vectors.
+
+    Returns the top_k inner products and IDs, best first.
+    """
+    candidate_ids = [idx for idx in candidate_ids if 0 <= idx < len(full_vectors)]
+    if not candidate_ids:
+        return [], []
+
+    # Sorted row order keeps reads from the memory-mapped file sequential
+    rows = np.array(sorted(candidate_ids))
+    scores = np.asarray(full_vectors[rows], dtype=np.float32) @ np.asarray(query_embedding, dtype=np.float32)
+    order = np.argsort(-scores)[:top_k]
+    return scores[order].tolist(), rows[order].tolist()
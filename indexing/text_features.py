@@ -0,0 +1,124 @@
+import re
+import numpy as np
+from functools import lru_cache
+from typing import List, Dict, Any
+
+from utils.helpers import split_sentences, count_tokens
+
+TECHNICAL_TERMS = frozenset({
+    "hereby", "aforementioned", "hereinafter", "pursuant",
+    "wherein", "therein", "thereto", "whereby", "whereas",
+    "notwithstanding", "henceforth", "thereupon", "heretofore",
+    "inasmuch", "aforestated"
+})
+
+TECHNICAL_TERMS_PATTERN = re.compile('|'.join(sorted(TECHNICAL_TERMS)), re.IGNORECASE)
+PASSIVE_VOICE_PATTERN = re.compile(r'\b(is|was|were|are|been|being) (\w+ed)\b', re.IGNORECASE)
+VOWEL_GROUP_PATTERN = re.compile(r'[aeiouy]+', re.IGNORECASE)
+
+
+@lru_cache(maxsize=1)
+def _get_syllable_counter():
+    """
+    Load textstat's syllable counter, or None if it (or its data) is unavailable.
+    """
+    try:
+        # textstat downloads the CMU dictionary when it is missing, which hangs an offline start
+        import nltk
+        nltk.data.find("corpora/cmudict")
+    except (ImportError, LookupError):
+        return None
+
+    try:
+        from textstat import syllable_count
+        syllable_count("probe")
+        return syllable_count
+    except Exception as e:
+        print(f"textstat syllable counter unavailable ({type(e).__name__}). Estimating from vowel groups.")
+        return None
+
+
+def _count_syllables(text: str) -> int:
+    """
+    Count syllables with textstat, or estimate them from vowel groups.
+    """
+    syllable_count = _get_syllable_counter()
+    if syllable_count is not None:
+        return syllable_count(text)
+    return sum(max(len(VOWEL_GROUP_PATTERN.findall(word)), 1) for word in text.split())
+
+
+def _flesch_kincaid_grade(word_counts: np.ndarray, sentence_counts: np.ndarray,
+                          syllable_counts: np.ndarray) -> np.ndarray:
+    """
+    Flesch-Kincaid grade level for arrays of word, sentence and syllable counts.
+    """
+    words = np.maximum(word_counts, 1)
+    sentences = np.maximum(sentence_counts, 1)
+    grades = 0.39 * (words / sentences) + 11.8 * (syllable_counts / words) - 15.59
+    return np.where(word_counts > 0, grades, 0.0)
+
+
+def compute_text_features(texts: List[str]) -> List[Dict[str, Any]]:
+    """
+    Compute the readability and style features of a batch of chunks.
+
+    Sentences, words and syllables are counted text by text; the scores
+    derived from them are computed with numpy over the batch. This runs
+    once at ingest, and queries read the stored features.
+    """
+    if not texts:
+        return []
+
+    counts = np.array([
+        (len(split_sentences(text)), len(text.split()), _count_syllables(text))
+        for text in texts
+    ], dtype=np.float64).reshape(-1, 3)
+    sentence_counts, word_counts, syllable_counts = counts.T
+
+    avg_sentence_lengths = word_counts / np.maximum(sentence_counts, 1)
+    grades = _flesch_kincaid_grade(word_counts, sentence_counts, syllable_counts)
+
+    features = []
+    for i, text in enumerate(texts):
+        features.append({
+            "char_count": len(text),
+            "token_count": count_tokens(text),
+            "sentence_count": int(sentence_counts[i]),
+            "word_count": int(word_counts[i]),
+            "syllable_count": int(syllable_counts[i]),
+            "avg_sentence_length": round(float(avg_sentence_lengths[i]), 2),
+            "readability_grade": round(float(grades[i]), 2),
+            "has_technical_jargon": bool(TECHNICAL_TERMS_PATTERN.search(text)),
+            "has_passive_voice": bool(PASSIVE_VOICE_PATTERN.search(text))
+        })
+
+    return features
+
+
+def aggregate_text_features(features_list: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Combine per-chunk features into the features of the chunks read together.
+    """
+    if not features_list:
+        return compute_text_features([""])[0]
+
+    totals = np.array([
+        (f["char_count"], f["token_count"], f["sentence_count"], f["word_count"], f["syllable_count"])
+        for f in features_list
+    ], dtype=np.float64).sum(axis=0)
+    char_count, token_count, sentence_count, word_count, syllable_count = totals
+
+    grade = _flesch_kincaid_grade(np.array([word_count]), np.array([sentence_count]), np.array([syllable_count]))[0]
+
+    return {
+        "char_count": int(char_count),
+        "token_count": int(token_count),
+        "sentence_count": int(sentence_count),
+        "word_count": int(word_count),
+        "syllable_count": int(syllable_count),
+        "avg_sentence_length": round(float(word_count / max(sentence_count, 1)), 2),
+        "readability_grade": round(float(grade), 2),
+        "has_technical_jargon": any(f["has_technical_jargon"] for f in features_list),
+        "has_passive_voice": any(f["has_passive_voice"] for f in features_list)
+    }
@@ -0,0 +1,86 @@
+import os
+import ast
+import numpy as np
+from typing import Optional
+
+# Fixed header size, so the shape can be rewritten in place as vectors are appended
+NPY_HEADER_SIZE = 128
+NPY_MAGIC = b"\x93NUMPY\x01\x00"
+
+
+class FullVectorFile:
+    def __init__(self, path: str, dimension: int):
+        """
+        Append-only .npy file of float32 vectors, read memory-mapped.
+
+        Row i holds the full-precision vector of embedding ID i. The file is a
+        regular .npy, so np.load(path, mmap_mode='r') opens it as well.
+        """
+        self.path = path
+        self.dimension = dimension
+        self.count = 0
+        self._array: Optional[np.ndarray] = None
+
+        if os.path.exists(path):
+            self.count = self._read_count()
+        else:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            with open(path, 'wb') as f:
+                f.write(self._header(0))
+
+    def _header(self, count: int) -> bytes:
+        header = repr({'descr': '<f4', 'fortran_order': False, 'shape': (count, self.dimension)})
+        padding = NPY_HEADER_SIZE - len(NPY_MAGIC) - 2 - len(header) - 1
+        header = header + " " * padding + "\n"
+        return NPY_MAGIC + len(header).to_bytes(2, "little") + header.encode("latin1")
+
+    def _read_count(self) -> int:
+        with open(self.path, 'rb') as f:
+            prefix = f.read(NPY_HEADER_SIZE)
+        if not prefix.startswith(NPY_MAGIC) or len(prefix) < NPY_HEADER_SIZE:
+            raise ValueError(f"Not a vector file: {self.path}")
+
+        header = ast.literal_eval(prefix[len(NPY_MAGIC) + 2:].decode("latin1"))
+        count, dimension = header['shape']
+        if dimension != self.dimension:
+            raise ValueError(f"Vector file dimension mismatch: Expected {self.dimension}, but got {dimension}")
+        return count
+
+    def _write_count(self, f, count: int) -> None:
+        f.seek(0)
+        f.write(self._header(count))
+        f.flush()
+        os.fsync(f.fileno())
+
+    def append(self, vectors: np.ndarray) -> None:
+        """Append vectors; the header is only updated once the data is written."""
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32).reshape(-1, self.dimension)
+        if not len(vectors):
+            return
+
+        with open(self.path, 'r+b') as f:
+            f.seek(NPY_HEADER_SIZE + self.count * self.dimension * 4)
+            f.write(vectors.tobytes())
+            self._write_count(f, self.count + len(vectors))
+
+        self.count += len(vectors)
+        self._array = None
+
+    def truncate(self, count: int) -> None:
+        """Drop rows from `count` on, e.g. vectors appended before a crash but never indexed."""
+        if count >= self.count:
+            return
+        with open(self.path, 'r+b') as f:
+            self._write_count(f, count)
+            f.truncate(NPY_HEADER_SIZE + count * self.dimension * 4)
+        self.count = count
+        self._array = None
+
+    def array(self) -> np.ndarray:
+        """All vectors, memory-mapped read-only."""
+        if self._array is None:
+            if self.count == 0:
+                return np.zeros((0, self.dimension), dtype=np.float32)
+            self._array = np.memmap(self.path, dtype=np.float32, mode='r', offset=NPY_HEADER_SIZE,
+                                    shape=(self.count, self.dimension))
+        return self._array
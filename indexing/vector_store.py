@@ -1,27 +1,338 @@
 import os
 import json
+import threading
 import faiss
 import numpy as np
 from typing import List, Dict, Any, Optional, Tuple
 
-from config import FAISS_INDEX_FILE, METADATA_FILE, EMBEDDING_DIMENSION
+from indexing.reduction import create_reducer, load_reducer, rerank
+from indexing.vector_file import FullVectorFile
+from indexing.document_router import DocumentCentroids, DocumentRouter
+from utils.metrics import span
+from config import (FAISS_INDEX_FILE, METADATA_FILE, EMBEDDING_DIMENSION, VECTOR_REDUCTION, REDUCED_DIMENSION,
+                    VECTOR_COMPRESSION, PQ_SUBQUANTIZERS, INDEX_TRAINING_SIZE, RERANK_CANDIDATES,
+                    MAX_INDEX_SEGMENTS, ROUTING_TOP_DOCUMENTS, ROUTING_MIN_DOCUMENTS)
+
+# Largest sample used to learn a projection or quantizer
+MAX_TRAINING_VECTORS = 65536
+
+
+class ExcludedIds:
+    def __init__(self, index: faiss.Index, ids: np.ndarray):
+        """
+        FAISS search parameters that skip the given IDs of an index, so
+        deleted vectors never take a place in the top k.
+        """
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.parameters = None
+        if not isinstance(index, faiss.IndexPQ):
+            # The parameters only point at the selectors, which must outlive them
+            self._batch = faiss.IDSelectorBatch(self.ids)
+            self._selector = faiss.IDSelectorNot(self._batch)
+            self.parameters = faiss.SearchParameters(sel=self._selector)
+
+    def search(self, index: faiss.Index, query: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Top k of the index without the excluded IDs."""
+        if self.parameters is not None:
+            return index.search(query, k, params=self.parameters)
+        # IndexPQ takes no selector: the excluded IDs are over-fetched and dropped
+        distances, indices = index.search(query, min(k + len(self.ids), index.ntotal))
+        keep = ~np.isin(indices[0], self.ids)
+        return distances[:, keep][:, :k], indices[:, keep][:, :k]
+
+
+class IndexSnapshot:
+    def __init__(self, segments: List[Tuple[int, faiss.Index]], reducer=None,
+                 full_vectors: Optional[np.ndarray] = None, deleted_ids: Optional[np.ndarray] = None,
+                 router: Optional[DocumentRouter] = None, previous: Optional["IndexSnapshot"] = None):
+        """
+        Immutable view of a VectorStore that searches run against.
+
+        Each segment is (first embedding ID, FAISS index) and is never
+        modified once published. With full_vectors, the segments hold
+        reduced/compressed vectors (queries go through the reducer, if any)
+        and candidates are re-scored with the full vectors. Otherwise the
+        segments are flat indexes of the full vectors.
+
+        Searches skip deleted_ids inside FAISS. The exclusions of segments
+        unchanged since the previous snapshot are reused.
+        """
+        self.segments = tuple(segments)
+        self.reducer = reducer
+        self.full_vectors = full_vectors
+        self.deleted_ids = deleted_ids if deleted_ids is not None else np.zeros(0, dtype=np.int64)
+        self.deleted_count = len(self.deleted_ids)
+        self.router = router
+        self.ntotal = sum(index.ntotal for _, index in self.segments)
+
+        reusable = {}
+        if previous is not None and previous.deleted_ids is self.deleted_ids:
+            reusable = {id(index): exclusion for (_, index), exclusion in zip(previous.segments, previous.exclusions)}
+        self.exclusions: List[Optional[ExcludedIds]] = []
+        for start_id, index in self.segments:
+            if id(index) in reusable:
+                self.exclusions.append(reusable[id(index)])
+                continue
+            low, high = np.searchsorted(self.deleted_ids, [start_id, start_id + index.ntotal])
+            local_ids = self.deleted_ids[low:high] - start_id
+            self.exclusions.append(ExcludedIds(index, local_ids) if len(local_ids) else None)
+
+    def vectors(self, ids: np.ndarray) -> np.ndarray:
+        """Full-precision vectors of embedding IDs."""
+        if self.full_vectors is not None:
+            return np.asarray(self.full_vectors[ids], dtype=np.float32)
+
+        vectors = np.empty((len(ids), self.segments[0][1].d), dtype=np.float32)
+        for start_id, index in self.segments:
+            mask = (ids >= start_id) & (ids < start_id + index.ntotal)
+            if mask.any():
+                vectors[mask] = index.reconstruct_batch(ids[mask] - start_id)
+        return vectors
+
+    def exact_search(self, query: np.ndarray, ids: np.ndarray, k: int) -> Tuple[List[float], List[int]]:
+        """Top k of the given embedding IDs, scored with their full vectors."""
+        if not len(ids):
+            return [], []
+        scores = self.vectors(ids) @ query
+        top = np.argsort(-scores, kind="stable")[:k]
+        return scores[top].tolist(), ids[top].tolist()
+
+    def search(self, query: np.ndarray, k: int) -> Tuple[List[float], List[int]]:
+        """Top k over all segments, as (scores, embedding IDs)."""
+        scores, ids = [], []
+        for (start_id, index), exclusion in zip(self.segments, self.exclusions):
+            if index.ntotal == 0:
+                continue
+            if exclusion is not None:
+                distances, indices = exclusion.search(index, query, min(k, index.ntotal))
+            else:
+                distances, indices = index.search(query, min(k, index.ntotal))
+            for distance, idx in zip(distances[0].tolist(), indices[0].tolist()):
+                if idx != -1:
+                    scores.append(distance)
+                    ids.append(start_id + idx)
+
+        order = np.argsort(-np.asarray(scores, dtype=np.float32), kind="stable")[:k]
+        return [scores[i] for i in order], [ids[i] for i in order]
 
 
 class VectorStore:
-    def __init__(self, index_file=FAISS_INDEX_FILE, metadata_file=METADATA_FILE, dimension=EMBEDDING_DIMENSION):
+    def __init__(self, index_file=FAISS_INDEX_FILE, metadata_file=METADATA_FILE, dimension=EMBEDDING_DIMENSION,
+                 reduction=VECTOR_REDUCTION, reduced_dimension=REDUCED_DIMENSION,
+                 compression=VECTOR_COMPRESSION, pq_subquantizers=PQ_SUBQUANTIZERS,
+                 routing_top_documents=ROUTING_TOP_DOCUMENTS, routing_min_documents=ROUTING_MIN_DOCUMENTS):
         """
         Initialize the vector store.
+
+        With a reduction ("pca" or "matryoshka") and/or a compression ("sq8"
+        for 8-bit scalar quantization, "pq" for product quantization), the
+        FAISS index holds reduced or compressed vectors for candidate
+        generation. The full vectors are kept in a memory-mapped .npy file
+        next to it, read only to re-score the candidates exactly.
+
+        The projection and quantizer are learned once INDEX_TRAINING_SIZE
+        vectors are stored; until then searches use a flat index of the full
+        vectors.
+
+        Searches run against an immutable IndexSnapshot and never block.
+        Writers add vectors as a new index segment and publish the next
+        snapshot by swapping one reference, so a search never sees a vector
+        without its metadata. Segments are merged back into one on save().
+
+        With routing_top_documents, a search first picks that many documents
+        by the centroid of their chunk vectors and only scores their chunks,
+        once the store holds routing_min_documents documents.
         """
+        if compression not in ("none", "sq8", "pq"):
+            raise ValueError(f"Unsupported vector compression: {compression}")
+
         self.index_file = index_file
         self.metadata_file = metadata_file
         self.dimension = dimension
+        self.compression = compression
+        self.pq_subquantizers = pq_subquantizers
+        self.routing_top_documents = routing_top_documents
+        self.routing_min_documents = routing_min_documents
+
+        self.reducer = None
+        self.full_vectors = None
+        base_path = os.path.splitext(index_file)[0]
+        self.reducer_file = f"{base_path}.reducer.npz"
+        if reduction and reduction != "none":
+            self.reducer = load_reducer(self.reducer_file, dimension) or \
+                create_reducer(reduction, dimension, reduced_dimension)
+
+        if compression == "pq":
+            target_dimension = self.reducer.target_dimension if self.reducer else dimension
+            if target_dimension % pq_subquantizers != 0:
+                raise ValueError(f"Indexed dimension ({target_dimension}) must be divisible by "
+                                 f"PQ_SUBQUANTIZERS ({pq_subquantizers})")
+
+        if self.reducer is not None or compression != "none":
+            self.full_vectors = FullVectorFile(f"{base_path}.vectors.npy", dimension)
+
+        # Writers are serialized; searches never take this lock
+        self._write_lock = threading.RLock()
+        self._segment_template = None
 
         # Initialize or load index,Load metadata, Keep track of the next available ID
-        self.index = self._load_or_create_index()
+        index = self._load_or_create_index()
         self.metadata = self._load_metadata()
         self.next_id = len(self.metadata)
+        deleted_ids = np.array(sorted(int(embedding_id) for embedding_id, metadata in self.metadata.items()
+                                      if metadata.get("deleted")), dtype=np.int64)
+
+        # Vectors appended after the last save belong to a batch that was never indexed
+        if self.full_vectors is not None:
+            self.full_vectors.truncate(self.next_id)
+
+        self._snapshot: IndexSnapshot = None
+        self.centroids = DocumentCentroids(dimension)
+        self._publish([(0, index)], deleted_ids)
+        if routing_top_documents:
+            self._load_centroids()
+            self._publish([(0, index)])
+
+    @property
+    def index_dimension(self) -> int:
+        """Dimension of the vectors in the FAISS index."""
+        if self.reducer is not None and self.reducer.is_trained:
+            return self.reducer.target_dimension
+        return self.dimension
+
+    @property
+    def index(self) -> faiss.Index:
+        """The FAISS index, with its segments merged into one."""
+        with self._write_lock:
+            self._compact()
+            return self._snapshot.segments[0][1]
+
+    @property
+    def index_bytes(self) -> int:
+        """Size of the index codes of the current segments, without merging them."""
+        return sum(index.ntotal * index.sa_code_size() for _, index in self._snapshot.segments)
+
+    @property
+    def deleted_count(self) -> int:
+        return self._snapshot.deleted_count
+
+    @property
+    def uses_candidates(self) -> bool:
+        """Whether searches go through the reduced/compressed index and re-score."""
+        return self._is_candidate_index(self._snapshot.segments[0][1])
+
+    def _is_candidate_index(self, index: faiss.Index) -> bool:
+        if self.full_vectors is None:
+            return False
+        if self.reducer is not None and not self.reducer.is_trained:
+            return False
+        # Until the quantizer is trained the index is a flat one
+        return self.compression == "none" or not isinstance(index, faiss.IndexFlat)
+
+    def _training_threshold(self) -> int:
+        """Vectors needed before the candidate index is learned."""
+        threshold = INDEX_TRAINING_SIZE
+        if self.reducer is not None:
+            threshold = max(threshold, self.reducer.target_dimension)
+        if self.compression == "pq":
+            # 256 centroids per sub-quantizer
+            threshold = max(threshold, 256)
+        return threshold
+
+    def _create_candidate_index(self, dimension: int) -> faiss.Index:
+        """Empty index of the configured compression."""
+        if self.compression == "sq8":
+            return faiss.IndexScalarQuantizer(dimension, faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_INNER_PRODUCT)
+        if self.compression == "pq":
+            return faiss.IndexPQ(dimension, self.pq_subquantizers, 8, faiss.METRIC_INNER_PRODUCT)
+        return faiss.IndexFlatIP(dimension)
 
-    def _load_or_create_index(self) -> faiss.IndexFlatIP:
+    def _to_index_space(self, vectors: np.ndarray) -> np.ndarray:
+        return self.reducer.transform(vectors) if self.reducer is not None else vectors
+
+    def _publish(self, segments: List[Tuple[int, faiss.Index]], deleted_ids: Optional[np.ndarray] = None) -> None:
+        """
+        Make the next snapshot current. A search keeps the snapshot it
+        started with, so swapping the reference is the only synchronization.
+        """
+        if deleted_ids is None:
+            deleted_ids = self._snapshot.deleted_ids
+        candidates = self._is_candidate_index(segments[0][1])
+        self._snapshot = IndexSnapshot(
+            segments,
+            reducer=self.reducer if candidates else None,
+            full_vectors=self.full_vectors.array() if candidates else None,
+            deleted_ids=deleted_ids,
+            router=self.centroids.router() if self.routing_top_documents else None,
+            previous=self._snapshot
+        )
+
+    def _load_centroids(self) -> None:
+        """Rebuild the document centroids from the stored vectors."""
+        by_document: Dict[Any, List[int]] = {}
+        for embedding_id in self.metadata:
+            metadata = self.get_metadata(embedding_id)
+            if metadata is not None:
+                by_document.setdefault(metadata.get("document_id"), []).append(int(embedding_id))
+        for document_id, ids in by_document.items():
+            ids = np.asarray(ids, dtype=np.int64)
+            self.centroids.add(document_id, ids.tolist(), self._snapshot.vectors(ids))
+
+    def _update_centroids(self, embedding_ids: List[str], vectors: np.ndarray, add: bool) -> None:
+        """Add or remove vectors in the centroids of their documents."""
+        if not self.routing_top_documents:
+            return
+        by_document: Dict[Any, List[int]] = {}
+        for row, embedding_id in enumerate(embedding_ids):
+            document_id = (self.metadata.get(embedding_id) or {}).get("document_id")
+            by_document.setdefault(document_id, []).append(row)
+        for document_id, rows in by_document.items():
+            ids = [int(embedding_ids[row]) for row in rows]
+            if add:
+                self.centroids.add(document_id, ids, vectors[rows])
+            else:
+                self.centroids.remove(document_id, ids, vectors[rows])
+
+    def _new_segment(self) -> faiss.Index:
+        """Empty index of the same kind and training as the current ones."""
+        base = self._snapshot.segments[0][1]
+        if isinstance(base, faiss.IndexFlat):
+            return faiss.IndexFlatIP(base.d)
+        if self._segment_template is None:
+            template = faiss.clone_index(base)
+            template.reset()
+            self._segment_template = template
+        return faiss.clone_index(self._segment_template)
+
+    def _merge_segments(self, segments: List[Tuple[int, faiss.Index]]) -> List[Tuple[int, faiss.Index]]:
+        """
+        Merge the newest segment into the previous one while that one is not
+        larger, so there are O(log n) segments and each vector is copied
+        O(log n) times.
+
+        Only the newest segment is unpublished and may be emptied by the
+        merge; the older one is copied first.
+        """
+        segments = list(segments)
+        while len(segments) > 1 and (segments[-2][1].ntotal <= segments[-1][1].ntotal
+                                     or len(segments) > MAX_INDEX_SEGMENTS):
+            (start_id, older), (_, newer) = segments[-2], segments[-1]
+            merged = faiss.clone_index(older)
+            merged.merge_from(newer)
+            segments[-2:] = [(start_id, merged)]
+        return segments
+
+    def _compact(self) -> None:
+        """Merge all segments into one. Call with the write lock held."""
+        segments = self._snapshot.segments
+        if len(segments) == 1:
+            return
+        merged = faiss.clone_index(segments[0][1])
+        for _, segment in segments[1:]:
+            merged.merge_from(faiss.clone_index(segment))
+        self._publish([(0, merged)])
+
+    def _load_or_create_index(self) -> faiss.Index:
         """
         Load existing FAISS index or create a new one.
         """
@@ -31,8 +342,11 @@ class VectorStore:
             except Exception as e:
                 print(f"Error loading FAISS index: {str(e)}. Creating new index.")
 
-        # Create a new index
-        return faiss.IndexFlatIP(self.dimension)
+        # Create a new index. A compressed one starts as a flat index of the full
+        # vectors until its quantizer is trained, even with a reducer that needs no training
+        if self.compression != "none":
+            return faiss.IndexFlatIP(self.dimension)
+        return faiss.IndexFlatIP(self.index_dimension)
 
     def _load_metadata(self) -> Dict[int, Dict[str, Any]]:
         """
@@ -50,7 +364,7 @@ class VectorStore:
     def _save_metadata(self) -> None:
         """Save metadata to file."""
         os.makedirs(os.path.dirname(self.metadata_file ), exist_ok=True)
-        with open(self.metadata_file, 'w') as f:
+        with self._write_lock, open(self.metadata_file, 'w') as f:
             json.dump(self.metadata, f)
 
     def _save_index(self) -> None:
@@ -58,9 +372,41 @@ class VectorStore:
         os.makedirs(os.path.dirname(self.index_file), exist_ok=True)
         faiss.write_index(self.index, self.index_file)
 
-    def add_embeddings(self, embeddings: List[np.ndarray], metadata_list: List[Dict[str, Any]]) -> List[str]:
+    def save(self) -> None:
+        """Save the metadata and the FAISS index to disk."""
+        with self._write_lock:
+            self._save_metadata()
+            self._save_index()
+            if self.reducer is not None and self.reducer.is_trained:
+                self.reducer.save(self.reducer_file)
+
+    def _train_candidate_index(self) -> faiss.Index:
+        """
+        Learn the reduction and quantizer from the stored full vectors and
+        build the index in the reduced/compressed form.
+        """
+        vectors = self.full_vectors.array()
+        step = max(1, len(vectors) // MAX_TRAINING_VECTORS)
+        sample = np.asarray(vectors[::step][:MAX_TRAINING_VECTORS])
+
+        if self.reducer is not None:
+            self.reducer.fit(sample)
+
+        index = self._create_candidate_index(self.index_dimension)
+        if not index.is_trained:
+            index.train(self._to_index_space(sample))
+        for start in range(0, len(vectors), 65536):
+            index.add(self._to_index_space(vectors[start:start + 65536]))
+        self._segment_template = None
+        print(f"Trained {type(index).__name__} over {self.index_dimension} dimensions on {len(sample)} vectors")
+        return index
+
+    def add_embeddings(self, embeddings: List[np.ndarray], metadata_list: List[Dict[str, Any]],
+                       persist: bool = True) -> List[str]:
         """
         Add embeddings to the vector store.
+
+        Pass persist=False to batch several additions and call save() once.
         """
         if not embeddings:
             return []
@@ -69,30 +415,44 @@ class VectorStore:
         embeddings_array = np.array(embeddings, dtype=np.float32)
         if embeddings_array.ndim == 1:
             embeddings_array = embeddings_array.reshape(1, -1)
-        # Get starting ID
-        start_id = self.next_id
 
-        # Add embeddings to FAISS index
         # Ensure embeddings are 2D and of correct shape
-        if embeddings_array.shape[1] != self.index.d:
-            raise ValueError(f"Embedding dimension mismatch: Expected {self.index.d}, but got {embeddings_array.shape[1]}")
+        if embeddings_array.shape[1] != self.dimension:
+            raise ValueError(f"Embedding dimension mismatch: Expected {self.dimension}, but got {embeddings_array.shape[1]}")
+
+        with self._write_lock:
+            # Get starting ID
+            start_id = self.next_id
+
+            # Build the new vectors as a segment of their own; published segments are never modified
+            segments = list(self._snapshot.segments)
+            if self.full_vectors is not None:
+                self.full_vectors.append(embeddings_array)
 
-        self.index.add(embeddings_array)
+            if self.full_vectors is not None and not self.uses_candidates \
+                    and self.full_vectors.count >= self._training_threshold():
+                segments = [(0, self._train_candidate_index())]
+            else:
+                segment = self._new_segment()
+                segment.add(self._to_index_space(embeddings_array) if self.uses_candidates else embeddings_array)
+                segments = self._merge_segments(segments + [(start_id, segment)])
 
-        # Create IDs for the new embeddings
-        embedding_ids = [str(i) for i in range(start_id, start_id + len(embeddings))]
+            # Create IDs for the new embeddings
+            embedding_ids = [str(i) for i in range(start_id, start_id + len(embeddings))]
 
-        # Store metadata
-        for i, (embedding_id, metadata) in enumerate(zip(embedding_ids, metadata_list)):
-            metadata["embedding_id"] = embedding_id
-            self.metadata[embedding_id] = metadata
+            # Store metadata before publishing, so every vector a search can find has it
+            for i, (embedding_id, metadata) in enumerate(zip(embedding_ids, metadata_list)):
+                metadata["embedding_id"] = embedding_id
+                self.metadata[embedding_id] = metadata
 
-        # Update next ID
-        self.next_id = start_id + len(embeddings)
+            # Update next ID
+            self.next_id = start_id + len(embeddings)
+            self._update_centroids(embedding_ids, embeddings_array, add=True)
+            self._publish(segments)
 
-        # Save metadata and index
-        self._save_metadata()
-        self._save_index()
+            # Save metadata and index
+            if persist:
+                self.save()
 
         return embedding_ids
 
@@ -100,63 +460,128 @@ class VectorStore:
         """
         Search for similar vectors.
         """
-        if self.index.ntotal == 0:
-            return []
-
         # Convert query to float32 numpy array and reshape
         query_embedding = np.array([query_embedding]).astype('float32')
 
-        # Search
-        distances, indices = self.index.search(query_embedding, top_k)
+        while True:
+            snapshot = self._snapshot
+            results, missing = self._search_snapshot(snapshot, query_embedding, top_k)
+            # A vector deleted since the snapshot was taken has lost its metadata;
+            # the newer snapshot skips it inside FAISS
+            if not missing or self._snapshot is snapshot:
+                return results
 
-        # Flatten results
-        distances = distances[0].tolist()
-        indices = indices[0].tolist()
+    def _search_snapshot(self, snapshot: IndexSnapshot, query_embedding: np.ndarray,
+                         top_k: int) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Search one snapshot. Returns the results and the number of hits without metadata.
+        """
+        if snapshot.ntotal == 0:
+            return [], 0
+
+        # Deleted vectors are still in the index but FAISS skips them
+        fetch_k = min(top_k, snapshot.ntotal)
 
-        results = []
+        router = snapshot.router
+        if router is not None and len(router) >= self.routing_min_documents:
+            # Only the chunks of the documents closest to the query are scored
+            with span("document_routing"):
+                candidates = router.candidates(router.route(query_embedding[0], self.routing_top_documents))
+            with span("faiss_search"):
+                distances, indices = snapshot.exact_search(query_embedding[0], candidates, fetch_k)
+        elif snapshot.full_vectors is not None:
+            # Candidates from the reduced/compressed index, re-scored with the full vectors
+            index_query = snapshot.reducer.transform(query_embedding) if snapshot.reducer is not None \
+                else query_embedding
+            with span("faiss_search"):
+                _, candidates = snapshot.search(index_query, max(RERANK_CANDIDATES, fetch_k))
+            with span("rerank"):
+                distances, indices = rerank(query_embedding[0], candidates, snapshot.full_vectors, fetch_k)
+        else:
+            # Search
+            with span("faiss_search"):
+                distances, indices = snapshot.search(query_embedding, fetch_k)
+
+        results, missing = [], 0
         for i, idx in enumerate(indices):
             # Skip invalid indices (faiss returns -1 for empty results)
             if idx == -1:
                 continue
 
-            str_idx = str(idx)
-            if str_idx in self.metadata:
-                results.append({
-                    "distance": distances[i],
-                    "score": (1 + distances[i]) / 2,  
-                    "metadata": self.metadata[str_idx]
-                })
+            metadata = self.get_metadata(str(idx))
+            if metadata is None:
+                missing += 1
+                continue
+            results.append({
+                "distance": distances[i],
+                "score": (1 + distances[i]) / 2,
+                "metadata": metadata
+            })
+
+        return results[:top_k], missing
 
-        return results
+    def delete_embeddings(self, embedding_ids: List[str], persist: bool = True) -> int:
+        """
+        Delete embeddings from the vector store.
 
-    def delete_embedding(self, embedding_id: str) -> bool:
+        Embedding IDs are positions in the index and the full-vector file, so
+        a deleted vector stays in place and its metadata becomes a tombstone:
+        it is no longer returned and its ID is never reused.
+        Returns the number of embeddings deleted.
         """
-        Delete an embedding from the vector store.
+        with self._write_lock:
+            deleted = [embedding_id for embedding_id in dict.fromkeys(embedding_ids)
+                       if self.get_metadata(embedding_id) is not None]
+            if not deleted:
+                return 0
+
+            if self.routing_top_documents:
+                self._update_centroids(deleted, self._snapshot.vectors(np.asarray(deleted, dtype=np.int64)),
+                                       add=False)
+
+            # Searches skip the vectors before their tombstones appear
+            self._publish(list(self._snapshot.segments),
+                          np.union1d(self._snapshot.deleted_ids, np.asarray(deleted, dtype=np.int64)))
+            for embedding_id in deleted:
+                self.metadata[embedding_id] = {"embedding_id": embedding_id, "deleted": True}
+
+            if persist:
+                self._save_metadata()
+        return len(deleted)
+
+    def update_metadata(self, updates: Dict[str, Dict[str, Any]], persist: bool = True) -> None:
         """
-        if embedding_id not in self.metadata:
-            return False
+        Merge fields into the metadata of existing embeddings and save once.
 
-        # Remove from metadata
-        del self.metadata[embedding_id]
-        self._rebuild_index()
-        return True
+        Each entry is replaced by an updated copy, so readers see either the
+        old or the new metadata, never a mix.
+        """
+        with self._write_lock:
+            updated, moved = False, {}
+            for embedding_id, fields in updates.items():
+                metadata = self.get_metadata(embedding_id)
+                if metadata is not None:
+                    if "document_id" in fields and fields["document_id"] != metadata.get("document_id"):
+                        moved[embedding_id] = (metadata.get("document_id"), fields["document_id"])
+                    self.metadata[embedding_id] = {**metadata, **fields}
+                    updated = True
 
-    def _rebuild_index(self) -> None:
-        """Rebuild the FAISS index from metadata."""
-        # Create a new index
-        new_index = faiss.IndexFlatIP(self.dimension)
+            # Vectors handed over to another document move to its centroid
+            if moved and self.routing_top_documents:
+                vectors = self._snapshot.vectors(np.asarray(list(moved), dtype=np.int64))
+                for (embedding_id, (previous, current)), vector in zip(moved.items(), vectors):
+                    self.centroids.remove(previous, [int(embedding_id)], vector[None])
+                    self.centroids.add(current, [int(embedding_id)], vector[None])
+                self._publish(list(self._snapshot.segments))
 
-        # No embeddings to add
-        if not self.metadata:
-            self.index = new_index
-            self._save_index()
-            return
-        
-        self._save_metadata()
-        self._save_index()
+            if updated and persist:
+                self._save_metadata()
 
     def get_metadata(self, embedding_id: str) -> Optional[Dict[str, Any]]:
         """
         Get metadata for an embedding.
         """
-        return self.metadata.get(embedding_id)
\ No newline at end of file
+        metadata = self.metadata.get(embedding_id)
+        if metadata is None or metadata.get("deleted"):
+            return None
+        return metadata
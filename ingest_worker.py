@@ -0,0 +1,169 @@
+"""
+Single writer process for multi-worker deployments.
+
+Reader workers (SERVER_ROLE=reader) queue uploads in INBOX_FOLDER. This
+process owns the mutable index: it ingests queued PDFs, publishes a new
+read-only index generation, and the readers switch to it atomically.
+
+    python ingest_worker.py
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import threading
+import argparse
+import traceback
+from typing import List, Dict, Any
+
+from config import INBOX_FOLDER, UPLOAD_FOLDER, INDEX_PATH, RESET_ON_START, PRESUMMARIZE_ENABLED, reset_directory
+from utils.helpers import write_json_atomic
+
+RESULTS_DIR = "results"
+
+
+def job_result_path(job_id: str, inbox: str = INBOX_FOLDER) -> str:
+    """Path of the result file the writer leaves for a queued upload."""
+    return os.path.join(inbox, RESULTS_DIR, f"{job_id}.json")
+
+
+class IngestWorker:
+    def __init__(self, inbox: str = INBOX_FOLDER, index_root: str = INDEX_PATH):
+        """
+        Build the writer-side components.
+        """
+        from indexing.document_parser import DocumentParser
+        from indexing.embeddings import EmbeddingGenerator
+        from indexing.vector_store import VectorStore
+        from indexing.pipeline import IngestionPipeline
+        from database.db_manager import DatabaseManager
+        from database.document_registry import DocumentRegistry
+
+        self.inbox = inbox
+        self.index_root = index_root
+        self.vector_store = VectorStore()
+        self.db_manager = DatabaseManager()
+
+        # Set when background summaries are stored that readers have not seen yet
+        self.summaries_ready = threading.Event()
+
+        presummarizer = None
+        if PRESUMMARIZE_ENABLED:
+            from llm.llm_manager import LLMManager
+            from llm.summarization import TextSummarizer
+            from llm.presummarization import PreSummarizer
+            presummarizer = PreSummarizer(TextSummarizer(LLMManager()), self.vector_store,
+                                          on_complete=lambda stats: self.summaries_ready.set())
+
+        self.registry = DocumentRegistry()
+        self.pipeline = IngestionPipeline(DocumentParser(), EmbeddingGenerator(), self.vector_store,
+                                          self.registry, presummarizer)
+
+        os.makedirs(os.path.join(self.inbox, RESULTS_DIR), exist_ok=True)
+
+    def pending_jobs(self) -> List[str]:
+        """List queued job IDs, oldest first."""
+        jobs = [name for name in os.listdir(self.inbox) if name.endswith(".pdf")]
+        jobs.sort(key=lambda name: os.path.getmtime(os.path.join(self.inbox, name)))
+        return [name[:-len(".pdf")] for name in jobs]
+
+    def process_pending(self) -> int:
+        """
+        Ingest every queued upload and publish one generation for the batch.
+        With no uploads queued, publish one if background summaries are waiting.
+        """
+        from indexing.generations import publish_generation
+
+        jobs = self.pending_jobs()
+        if not jobs:
+            if self.summaries_ready.is_set():
+                # Readers only see the summaries in a generation, which no upload may publish soon
+                self.summaries_ready.clear()
+                generation = publish_generation(self.vector_store, self.index_root)
+                print(f"Published {generation} with new pre-computed summaries")
+            return 0
+
+        results = {}
+        for job_id in jobs:
+            results[job_id] = self._ingest_job(job_id)
+
+        self.summaries_ready.clear()
+        generation = publish_generation(self.vector_store, self.index_root)
+
+        # Documents are listed as indexed only once readers can search them
+        self.registry.mark_indexed([r['document_id'] for r in results.values() if r['status'] == 'indexed'])
+
+        # To clear all the cache present in the db
+        self.db_manager.clean_all_cache()
+
+        for job_id, result in results.items():
+            result['generation'] = generation
+            write_json_atomic(job_result_path(job_id, self.inbox), result)
+
+        print(f"Published {generation} with {len(jobs)} new upload(s)")
+        return len(jobs)
+
+    def _ingest_job(self, job_id: str) -> Dict[str, Any]:
+        """Ingest one queued upload and move the PDF to the upload folder."""
+        pdf_path = os.path.join(self.inbox, f"{job_id}.pdf")
+        info_path = os.path.join(self.inbox, f"{job_id}.json")
+
+        try:
+            with open(info_path, 'r') as f:
+                filename = json.load(f)['filename']
+        except Exception:
+            filename = f"{job_id}.pdf"
+
+        os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+        file_path = os.path.join(UPLOAD_FOLDER, filename)
+        shutil.move(pdf_path, file_path)
+        if os.path.exists(info_path):
+            os.remove(info_path)
+
+        try:
+            document = self.pipeline.ingest(file_path, mark_indexed=False)
+            if document['duplicate']:
+                return {'status': 'duplicate', 'document_id': document['id'], 'filename': filename}
+            return {'status': 'indexed', 'document_id': document['id'], 'filename': filename,
+                    'near_duplicate_chunks': document['near_duplicate_chunks']}
+        except Exception as e:
+            traceback.print_exc()
+            return {'status': 'failed', 'error': str(e), 'filename': filename}
+
+    def run_forever(self, poll_interval: float) -> None:
+        """Poll the inbox until interrupted."""
+        print(f"Watching {self.inbox} for uploads")
+        while True:
+            try:
+                self.process_pending()
+            except Exception:
+                traceback.print_exc()
+            time.sleep(poll_interval)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Ingest queued uploads and publish index generations.")
+    parser.add_argument("--poll-interval", type=float, default=1.0, help="Seconds between inbox scans")
+    parser.add_argument("--once", action="store_true", help="Process the current inbox and exit")
+    args = parser.parse_args()
+
+    if RESET_ON_START:
+        reset_directory(UPLOAD_FOLDER)
+        reset_directory(INDEX_PATH)
+    os.makedirs(INBOX_FOLDER, exist_ok=True)
+
+    worker = IngestWorker()
+    if args.once:
+        worker.process_pending()
+        return 0
+
+    try:
+        worker.run_forever(args.poll_interval)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
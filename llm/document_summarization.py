@@ -0,0 +1,133 @@
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Callable
+
+from llm.summarization import TextSummarizer
+from database.document_registry import DocumentRegistry
+from utils.helpers import count_tokens, truncate_to_tokens
+from config import SUMMARY_GROUP_TOKENS, SUMMARY_GROUP_CHUNKS, SUMMARY_CONCURRENCY
+
+# Detail level of the intermediate (map and reduce) summaries
+INTERMEDIATE_LEVEL = "medium"
+
+
+def _digest(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def group_texts(texts: List[str], max_tokens: int, average_size: int) -> List[str]:
+    """
+    Pack consecutive texts into groups of at most max_tokens tokens.
+
+    Besides the token bound, a group ends after a text whose hash picks it as
+    a boundary (one in average_size). Boundaries then depend on content, not
+    on position, so an edit only changes the groups around it.
+    """
+    groups, current, current_tokens = [], [], 0
+    for text in texts:
+        tokens = count_tokens(text)
+        if tokens > max_tokens:
+            text, tokens = truncate_to_tokens(text, max_tokens), max_tokens
+        if current and current_tokens + tokens > max_tokens:
+            groups.append("\n\n".join(current))
+            current, current_tokens = [], 0
+
+        current.append(text)
+        current_tokens += tokens
+        if int(_digest(text)[:8], 16) % average_size == 0:
+            groups.append("\n\n".join(current))
+            current, current_tokens = [], 0
+
+    if current:
+        groups.append("\n\n".join(current))
+    return groups
+
+
+class DocumentSummarizer:
+    def __init__(self, summarizer: TextSummarizer, registry: DocumentRegistry,
+                 group_tokens: int = SUMMARY_GROUP_TOKENS, group_chunks: int = SUMMARY_GROUP_CHUNKS,
+                 max_workers: int = SUMMARY_CONCURRENCY):
+        """
+        Map-reduce summarization of whole documents.
+
+        Args:
+            summarizer: Summarizer used for every LLM call
+            registry: Registry holding the chunk references and the summary cache
+            group_tokens: Token budget of each group sent to the LLM
+            group_chunks: Average number of texts per group
+            max_workers: Maximum number of summaries generated at the same time
+        """
+        self.summarizer = summarizer
+        self.registry = registry
+        self.group_tokens = group_tokens
+        self.group_chunks = group_chunks
+
+        # Shared by every request, so concurrency stays bounded across them
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="summarize")
+
+    def document_chunks(self, document_id: int, get_metadata: Callable[[str], Dict[str, Any]]) -> List[str]:
+        """The text of a document's chunks, in document order."""
+        texts, cursor = [], None
+        while True:
+            chunks, cursor = self.registry.list_chunks(document_id, limit=500, cursor=cursor)
+            for chunk in chunks:
+                content = (get_metadata(chunk['embedding_id']) or {}).get('content')
+                if content:
+                    texts.append(content)
+            if cursor is None:
+                return texts
+
+    def summarize_texts(self, texts: List[str], detail_level: str = "medium") -> Dict[str, Any]:
+        """
+        Summarize texts of any length.
+
+        The texts are grouped and each group summarized concurrently; the
+        group summaries are then grouped and summarized again until they fit
+        in one final call at the requested detail level. Every summary is
+        cached by the hash of its input, so only changed groups are redone.
+        """
+        stats = {"chunks": len(texts), "levels": 0, "llm_calls": 0, "cached": 0}
+        if not texts:
+            return {"summary": "", "stats": stats}
+
+        groups = group_texts(texts, self.group_tokens, self.group_chunks)
+        stats["groups"] = len(groups)
+        while len(groups) > 1:
+            summaries = self._summarize_all(groups, INTERMEDIATE_LEVEL, stats)
+            stats["levels"] += 1
+            groups = group_texts(summaries, self.group_tokens, self.group_chunks)
+            if len(groups) >= len(summaries):
+                # Summaries too long to merge would never converge; fold them into one group
+                groups = ["\n\n".join(truncate_to_tokens(summary, self.group_tokens // len(summaries))
+                                      for summary in summaries)]
+
+        summary = self._summarize_all(groups, detail_level, stats)[0]
+        stats["levels"] += 1
+        return {"summary": summary, "stats": stats}
+
+    def _summarize_all(self, texts: List[str], detail_level: str, stats: Dict[str, Any]) -> List[str]:
+        """Summarize each text, from the cache where possible and concurrently otherwise."""
+        # A new LLM model gets fresh summaries
+        model = getattr(self.summarizer.llm_manager, "model", "")
+        keys = [_digest(f"{model}\n{detail_level}\n{text}") for text in texts]
+        cached = self.registry.get_cached_summaries(keys)
+        stats["cached"] += sum(1 for key in keys if key in cached)
+
+        missing = {key: text for key, text in zip(keys, texts) if key not in cached}
+        futures = {key: self.executor.submit(self.summarizer.summarize, text, detail_level)
+                   for key, text in missing.items()}
+        new_summaries, error = {}, None
+        for key, future in futures.items():
+            try:
+                new_summaries[key] = future.result()
+            except Exception as e:
+                error = e
+        stats["llm_calls"] += len(futures)
+
+        # Groups that did succeed are kept, so a retry only redoes the failed ones
+        if new_summaries:
+            self.registry.cache_summaries(new_summaries)
+        if error is not None:
+            raise error
+        summaries = {**cached, **new_summaries}
+        return [summaries[key] for key in keys]
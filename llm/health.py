@@ -0,0 +1,53 @@
+import threading
+import numpy as np
+from collections import deque
+from typing import Dict, Any, Optional
+
+from utils.circuit_breaker import CircuitBreaker
+from config import (LLM_HEALTH_WINDOW, LLM_HEALTH_DECAY, LLM_HEDGE_MIN_SAMPLES, LLM_BREAKER_FAILURES,
+                    LLM_BREAKER_RESET_SECONDS)
+
+
+class ProviderHealth:
+    def __init__(self, key: str, window: int = LLM_HEALTH_WINDOW, decay: float = LLM_HEALTH_DECAY):
+        """
+        Recent behaviour of one LLM provider/model.
+
+        The score is an exponentially weighted success rate in [0, 1]; the
+        latencies of recent successful calls give the hedging delay.
+        """
+        self.key = key
+        self.decay = decay
+        self.success_rate = 1.0
+        self.latencies = deque(maxlen=window)
+        self.breaker = CircuitBreaker(f"llm:{key}", LLM_BREAKER_FAILURES, LLM_BREAKER_RESET_SECONDS)
+        self.lock = threading.Lock()
+
+    def record_success(self, seconds: float) -> None:
+        with self.lock:
+            self.success_rate = self.decay * self.success_rate + (1 - self.decay)
+            self.latencies.append(seconds)
+        self.breaker.record_success()
+
+    def record_failure(self) -> None:
+        with self.lock:
+            self.success_rate = self.decay * self.success_rate
+        self.breaker.record_failure()
+
+    def score(self) -> float:
+        return self.success_rate
+
+    def latency_percentile(self, percentile: float) -> Optional[float]:
+        """Latency percentile of recent successful calls, or None with too few of them."""
+        with self.lock:
+            if len(self.latencies) < LLM_HEDGE_MIN_SAMPLES:
+                return None
+            return float(np.percentile(self.latencies, percentile))
+
+    def status(self) -> Dict[str, Any]:
+        p50 = self.latency_percentile(50)
+        return {
+            "score": round(self.score(), 3),
+            "p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+            **self.breaker.status()
+        }
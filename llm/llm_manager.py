@@ -1,93 +1,173 @@
-import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
 from typing import Dict, Any, List, Optional
-import openai
-import google.generativeai as genai
-from time import sleep
 
-from config import LLM_PROVIDER, GEMINI_API_KEY, OPENAI_API_KEY, LLM_MODEL, MAX_TOKENS 
+from llm.providers import LLMProvider, create_provider
+from llm.health import ProviderHealth
+from utils.metrics import span, LLM_REQUESTS, LLM_HEDGES
+from config import (LLM_PROVIDER, LLM_MODEL, MAX_TOKENS, LLM_BACKUP_PROVIDER, LLM_BACKUP_MODEL, LLM_HEDGING,
+                    LLM_HEDGE_PERCENTILE, LLM_HEDGE_DELAY_SECONDS, LLM_HEDGE_WORKERS, LLM_FAILOVER_MIN_SCORE)
 
 class LLMManager:
-    def __init__(self, provider=LLM_PROVIDER, model=LLM_MODEL, max_tokens=MAX_TOKENS):
+    def __init__(self, provider=LLM_PROVIDER, model=LLM_MODEL, max_tokens=MAX_TOKENS,
+                 backup_provider=LLM_BACKUP_PROVIDER, backup_model=LLM_BACKUP_MODEL, hedging=LLM_HEDGING,
+                 providers: Optional[List[LLMProvider]] = None):
         """
         Initialze the LLM Manager
+
+        Args:
+            provider, model: Primary provider ("google" or "openai") and model
+            max_tokens: Completion token limit
+            backup_provider, backup_model: Optional backup for failover and hedging
+            hedging: Ask the backup too when the primary is slower than usual
+            providers: Ready-made providers in priority order (e.g. stubs), instead of the above
         """
-        self.provider = provider
-        self.model = model
+        if providers is None:
+            providers = [create_provider(provider, model, max_tokens)]
+            if backup_model or backup_provider:
+                providers.append(create_provider(backup_provider or provider, backup_model or model, max_tokens))
+
+        self.providers = providers
+        self.provider = providers[0].name
+        self.model = providers[0].model
         self.max_tokens = max_tokens
+        self.hedging = hedging and len(providers) > 1
+        self.health = {p.key: ProviderHealth(p.key) for p in providers}
 
-        if provider == "google":
-            genai.configure(api_key=GEMINI_API_KEY)
-        elif provider == "openai":
-            openai.api_key = OPENAI_API_KEY
-        else:
-            raise ValueError(f"Unsupported LLM provider: {self.provider}")
+        # Calls run in this pool so a slow one can be raced by a hedge
+        self._executor = None
+        self._executor_lock = threading.Lock()
 
-    def generate_response(self, prompt: str, temperature: float = 0.7,
-                          system_prompt: Optional[str] = None) -> str:
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=LLM_HEDGE_WORKERS, thread_name_prefix="llm")
+            return self._executor
+
+    def _candidates(self) -> List[LLMProvider]:
         """
-        Generate a respomse using the LLM 
+        Providers in the order to try them: healthy ones in configured order,
+        then the others best score first.
         """
+        healthy = [p for p in self.providers if self.health[p.key].score() >= LLM_FAILOVER_MIN_SCORE]
+        unhealthy = sorted((p for p in self.providers if p not in healthy),
+                           key=lambda p: self.health[p.key].score(), reverse=True)
+        candidates = healthy + unhealthy
+        # A single provider gets one immediate retry
+        return candidates * 2 if len(candidates) == 1 else candidates
 
-        if self.provider == "openai":
-            return self._generate_openai_response(prompt, temperature, system_prompt)
-        elif self.provider == "google":
-            return self._generate_gemini_response(prompt, temperature, system_prompt)
-        else:
-            raise ValueError(f"Unsupported LLM provider: {self.provider}")
+    def _hedge_delay(self, provider: LLMProvider) -> float:
+        delay = self.health[provider.key].latency_percentile(LLM_HEDGE_PERCENTILE)
+        return LLM_HEDGE_DELAY_SECONDS if delay is None else delay
 
-    def _generate_gemini_response(self, prompt: str, temperature: float,
-                                  system_prompt: Optional[str] = None) -> str:
-        """
-        Generate response using Gemini API
-        """
+    def _call(self, provider: LLMProvider, prompt: str, temperature: float, system_prompt: Optional[str],
+              settled: threading.Event, started: Optional[threading.Event] = None) -> str:
+        """Call one provider and record the outcome in its health."""
+        health = self.health[provider.key]
+        if started is not None:
+            started.set()
+        start = time.perf_counter()
+        try:
+            response = provider.generate(prompt, temperature, system_prompt)
+        except Exception as e:
+            print(f"LLM error from {provider.key}: {str(e)}")
+            health.record_failure()
+            LLM_REQUESTS.inc(provider=provider.name, model=provider.model, outcome="error")
+            raise
 
-        messages = []
-        if system_prompt:
-            messages.append(system_prompt)
-        messages.append(prompt)
+        health.record_success(time.perf_counter() - start)
+        # A call that finishes after another one answered the request is the loser of a hedge
+        outcome = "cancelled" if settled.is_set() else "success"
+        LLM_REQUESTS.inc(provider=provider.name, model=provider.model, outcome=outcome)
+        return response
 
-        max_retries = 2
-        for attemt in range(1, max_retries+1):
-            try:
-                model = genai.GenerativeModel(self.model)
-                response = model.generate_content(
-                    messages,
-                    generation_config={"temperature": temperature, "max_output_tokens": self.max_tokens}
-                )
-                generated_text = response.text.strip() if response else ""
-                return generated_text
-            except Exception as e:
-                if attemt < max_retries:
-                    print(f" Gemini API error: {str(e)}. Retrying in {attemt**2} seconds...")
-                    sleep(attemt**2)
-                else:
-                    raise
-
-    def _generate_openai_response(self, prompt: str, temperature: float,
-                                  system_prompt: Optional[str]) -> str:
-        """
-        Generate response using OPENAI API
+    def generate_response(self, prompt: str, temperature: float = 0.7,
+                          system_prompt: Optional[str] = None) -> str:
         """
+        Generate a respomse using the LLM
 
-        messages = []
-        if system_prompt:
-            messages.append({"role": "system", "content": system_prompt})
-        messages.append({"role": "user", "content": prompt})
+        Providers are tried in health order until one answers. With hedging,
+        a backup request is started when the first one is slower than usual,
+        and whichever answers first wins.
+        """
+        with span("llm_call"):
+            if self.hedging:
+                return self._generate_hedged(prompt, temperature, system_prompt)
+            return self._generate_sequential(prompt, temperature, system_prompt)
 
-        max_retries = 2
-        for attemt in range(1, max_retries+1):
+    def _generate_sequential(self, prompt: str, temperature: float, system_prompt: Optional[str]) -> str:
+        last_error = None
+        for provider in self._candidates():
+            if not self.health[provider.key].breaker.allow():
+                continue
             try:
-                response = openai.chat.completions.create(
-                    model=self.model,
-                    messages=messages,
-                    temperature=temperature,
-                    max_tokens=self.max_tokens,
-                )
-                return response.choices[0].message.content
-            
+                return self._call(provider, prompt, temperature, system_prompt, threading.Event())
             except Exception as e:
-                if attemt < max_retries:
-                    print(f" Gemini API error: {str(e)}. Retrying in {attemt**2} seconds...")
-                    sleep(attemt**2)
-                else:
-                    raise
\ No newline at end of file
+                last_error = e
+        raise last_error or RuntimeError("No LLM provider available: all circuit breakers are open")
+
+    def _generate_hedged(self, prompt: str, temperature: float, system_prompt: Optional[str]) -> str:
+        candidates = self._candidates()
+        executor = self._get_executor()
+        settled = threading.Event()
+        pending: Dict[Future, LLMProvider] = {}
+        last_error = None
+        may_hedge, hedge_sent = True, False
+
+        def start_next(started: Optional[threading.Event] = None) -> bool:
+            while candidates:
+                provider = candidates.pop(0)
+                if self.health[provider.key].breaker.allow():
+                    future = executor.submit(self._call, provider, prompt, temperature, system_prompt, settled,
+                                             started)
+                    pending[future] = provider
+                    return True
+            return False
+
+        first_started = threading.Event()
+        start_next(first_started)
+        first = next(iter(pending.values()), None)
+        if first is not None and candidates:
+            # The hedge delay counts from when the call runs: time queued for a busy pool is not provider latency
+            first_started.wait()
+        while pending:
+            # Only the first request is hedged, and only once
+            timeout = self._hedge_delay(first) if may_hedge and candidates else None
+
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                may_hedge = False
+                hedge_sent = start_next()
+                if hedge_sent:
+                    LLM_HEDGES.inc(outcome="sent")
+                continue
+
+            for future in done:
+                provider = pending.pop(future)
+                try:
+                    response = future.result()
+                except Exception as e:
+                    last_error = e
+                    continue
+
+                # The SDK calls cannot be aborted mid-flight; the losers' answers are dropped
+                settled.set()
+                for loser in pending:
+                    loser.cancel()
+                if hedge_sent:
+                    LLM_HEDGES.inc(outcome="primary_won" if provider is first else "backup_won")
+                return response
+
+            if not pending:
+                # Failed with no other request in flight: fail over right away
+                may_hedge = False
+                start_next()
+
+        raise last_error or RuntimeError("No LLM provider available: all circuit breakers are open")
+
+    def status(self) -> Dict[str, Any]:
+        """
+        Health of each provider, in priority order.
+        """
+        return {p.key: self.health[p.key].status() for p in self.providers}
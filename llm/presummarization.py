@@ -0,0 +1,124 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Dict, Any, Tuple, Optional, Callable
+
+from llm.summarization import TextSummarizer
+from indexing.vector_store import VectorStore
+from config import PRESUMMARIZE_LEVELS, PRESUMMARIZE_SCOPE, PRESUMMARIZE_CONCURRENCY
+
+
+class PreSummarizer:
+    def __init__(self, summarizer: TextSummarizer, vector_store: VectorStore,
+                 levels: List[str] = PRESUMMARIZE_LEVELS, scope: str = PRESUMMARIZE_SCOPE,
+                 max_workers: int = PRESUMMARIZE_CONCURRENCY,
+                 on_complete: Optional[Callable[[Dict[str, int]], None]] = None):
+        """
+        Initialize the pre-summarizer.
+
+        Args:
+            summarizer: Summarizer used to generate the summaries
+            vector_store: Vector store holding the chunk metadata
+            levels: Detail levels to pre-generate
+            scope: "chunk" to summarize each chunk, "page" to summarize each page
+            max_workers: Maximum number of summaries generated at the same time
+            on_complete: Called with the stats of each batch once its summaries are stored
+        """
+        if scope not in ("chunk", "page"):
+            raise ValueError(f"Unsupported pre-summarization scope: {scope}")
+
+        self.summarizer = summarizer
+        self.vector_store = vector_store
+        self.levels = list(levels)
+        self.scope = scope
+        self.on_complete = on_complete
+
+        # Shared by every batch, so concurrency stays bounded across uploads
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="presummarize")
+
+    def submit(self, embedding_ids: List[str]) -> threading.Thread:
+        """
+        Pre-summarize chunks in the background.
+        """
+        thread = threading.Thread(target=self.presummarize, args=(embedding_ids,), daemon=True)
+        thread.start()
+        return thread
+
+    def presummarize(self, embedding_ids: List[str]) -> Dict[str, int]:
+        """
+        Generate and store summaries for the given chunks.
+        """
+        jobs = self._build_jobs(embedding_ids)
+        futures = {
+            self.executor.submit(self.summarizer.summarize, text, level): (target_ids, level)
+            for target_ids, text in jobs
+            for level in self.levels
+        }
+
+        summaries = {}
+        failed = 0
+        for future in as_completed(futures):
+            target_ids, level = futures[future]
+            try:
+                summary = future.result()
+            except Exception as e:
+                print(f"Error pre-summarizing chunks {target_ids[:3]}: {str(e)}")
+                failed += 1
+                continue
+
+            for embedding_id in target_ids:
+                summaries.setdefault(embedding_id, {})[level] = summary
+
+        updates = {}
+        for embedding_id, new_summaries in summaries.items():
+            metadata = self.vector_store.get_metadata(embedding_id) or {}
+            updates[embedding_id] = {
+                "summaries": {**metadata.get("summaries", {}), **new_summaries},
+                "summary_scope": self.scope
+            }
+        self.vector_store.update_metadata(updates)
+
+        stats = {"summarized_chunks": len(summaries), "llm_calls": len(futures), "failed_calls": failed}
+        print(f"Pre-summarization finished: {stats}")
+        if self.on_complete is not None and summaries:
+            self.on_complete(stats)
+        return stats
+
+    def _build_jobs(self, embedding_ids: List[str]) -> List[Tuple[List[str], str]]:
+        """
+        Group chunks into (target chunk IDs, text to summarize) jobs.
+        """
+        chunks = []
+        for embedding_id in embedding_ids:
+            metadata = self.vector_store.get_metadata(embedding_id)
+            if metadata:
+                chunks.append((embedding_id, metadata))
+
+        if self.scope == "chunk":
+            # Only long chunks are summarized on the direct-answer path
+            return [
+                ([embedding_id], metadata["content"])
+                for embedding_id, metadata in chunks
+                if self._needs_summary(metadata)
+            ]
+
+        pages = {}
+        for embedding_id, metadata in chunks:
+            key = (metadata.get("document_id"), metadata.get("page_number"))
+            pages.setdefault(key, []).append((embedding_id, metadata))
+
+        jobs = []
+        for page_chunks in pages.values():
+            page_chunks.sort(key=lambda item: item[1].get("chunk_index", 0))
+            text = "\n\n".join(metadata["content"] for _, metadata in page_chunks)
+            # A page is judged by its whole text, which is longer than any of its chunks
+            if not self.summarizer.needs_summary(text):
+                continue
+            jobs.append(([embedding_id for embedding_id, _ in page_chunks], text))
+        return jobs
+
+    def _needs_summary(self, metadata: Dict[str, Any]) -> bool:
+        """Check whether a chunk would be summarized when answered directly."""
+        features = metadata.get("features")
+        if features:
+            return self.summarizer.needs_summary_from_features(features)
+        return self.summarizer.needs_summary(metadata.get("content", ""))
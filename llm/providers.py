@@ -0,0 +1,113 @@
+from typing import Optional
+
+from utils.helpers import count_tokens
+from utils.metrics import LLM_TOKENS
+from config import GEMINI_API_KEY, OPENAI_API_KEY
+
+
+class LLMProvider:
+    name = "base"
+
+    def __init__(self, model: str, max_tokens: int):
+        """
+        One model of one provider, called once per generate() without retries;
+        retrying and failover are up to LLMManager.
+        """
+        self.model = model
+        self.max_tokens = max_tokens
+        # The provider SDK is only imported once the first request is made
+        self._client = None
+
+    @property
+    def key(self) -> str:
+        return f"{self.name}/{self.model}"
+
+    def _record_usage(self, prompt_tokens: Optional[int], completion_tokens: Optional[int],
+                      prompt_text: str, completion_text: str) -> None:
+        """
+        Count the tokens of a call, estimating them when the provider reports no usage.
+        """
+        if not prompt_tokens:
+            prompt_tokens = count_tokens(prompt_text)
+        if not completion_tokens:
+            completion_tokens = count_tokens(completion_text or "")
+        LLM_TOKENS.inc(prompt_tokens, provider=self.name, model=self.model, direction="prompt")
+        LLM_TOKENS.inc(completion_tokens, provider=self.name, model=self.model, direction="completion")
+
+
+class GeminiProvider(LLMProvider):
+    name = "google"
+
+    def _get_client(self):
+        """Import and configure the Gemini SDK on first use."""
+        if self._client is None:
+            import google.generativeai as genai
+            genai.configure(api_key=GEMINI_API_KEY)
+            self._client = genai
+        return self._client
+
+    def generate(self, prompt: str, temperature: float, system_prompt: Optional[str] = None) -> str:
+        """
+        Generate response using Gemini API
+        """
+        messages = []
+        if system_prompt:
+            messages.append(system_prompt)
+        messages.append(prompt)
+
+        model = self._get_client().GenerativeModel(self.model)
+        response = model.generate_content(
+            messages,
+            generation_config={"temperature": temperature, "max_output_tokens": self.max_tokens}
+        )
+        generated_text = response.text.strip() if response else ""
+
+        usage = getattr(response, "usage_metadata", None)
+        self._record_usage(getattr(usage, "prompt_token_count", None),
+                           getattr(usage, "candidates_token_count", None),
+                           "\n".join(messages), generated_text)
+        return generated_text
+
+
+class OpenAIProvider(LLMProvider):
+    name = "openai"
+
+    def _get_client(self):
+        """Import and configure the OpenAI SDK on first use."""
+        if self._client is None:
+            import openai
+            openai.api_key = OPENAI_API_KEY
+            self._client = openai
+        return self._client
+
+    def generate(self, prompt: str, temperature: float, system_prompt: Optional[str] = None) -> str:
+        """
+        Generate response using OPENAI API
+        """
+        messages = []
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+        messages.append({"role": "user", "content": prompt})
+
+        response = self._get_client().chat.completions.create(
+            model=self.model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=self.max_tokens,
+        )
+        generated_text = response.choices[0].message.content
+
+        usage = getattr(response, "usage", None)
+        self._record_usage(getattr(usage, "prompt_tokens", None),
+                           getattr(usage, "completion_tokens", None),
+                           "\n".join(m["content"] for m in messages), generated_text)
+        return generated_text
+
+
+PROVIDERS = {provider.name: provider for provider in (GeminiProvider, OpenAIProvider)}
+
+
+def create_provider(name: str, model: str, max_tokens: int) -> LLMProvider:
+    if name not in PROVIDERS:
+        raise ValueError(f"Unsupported LLM provider: {name}")
+    return PROVIDERS[name](model, max_tokens)
@@ -1,13 +1,7 @@
 from typing import List, Dict, Any, Optional
 from llm.llm_manager import LLMManager
 
-import re
-import nltk
-from nltk.tokenize import sent_tokenize
-from textstat import flesch_kincaid_grade
-
-# Ensure required NLTK resources are available
-nltk.download("punkt_tab")
+from indexing.text_features import compute_text_features, TECHNICAL_TERMS, PASSIVE_VOICE_PATTERN
 
 class TextRephraser:
     def __init__(self, llm_manager: LLMManager):
@@ -16,14 +10,8 @@ class TextRephraser:
         """
         self.llm_manager = llm_manager
         
-        self.TECHNICAL_TERMS = {
-            "hereby", "aforementioned", "hereinafter", "pursuant",
-            "wherein", "therein", "thereto", "whereby", "whereas",
-            "notwithstanding", "henceforth", "thereupon", "heretofore",
-            "inasmuch", "aforestated"
-        }
-
-        self.PASSIVE_VOICE_PATTERN = r'\b(is|was|were|are|been|being) (\w+ed)\b'
+        self.TECHNICAL_TERMS = TECHNICAL_TERMS
+        self.PASSIVE_VOICE_PATTERN = PASSIVE_VOICE_PATTERN
 
         self.HIGH_COMPLEXITY_THRESHOLD = 30  # Average sentence length threshold
         self.READABILITY_THRESHOLD = 10  # Flesch-Kincaid Grade Level threshold
@@ -64,21 +52,13 @@ class TextRephraser:
         Returns:
             True if rephrasing is recommended, False otherwise.
         """
-        # Tokenize sentences properly
-        sentences = sent_tokenize(text)
-        avg_sentence_length = sum(len(s.split()) for s in sentences) / max(len(sentences), 1)
-
-        # Compute readability score (Flesch-Kincaid Grade Level)
-        readability_score = flesch_kincaid_grade(text)
-
-        # Check for technical jargon
-        has_technical_jargon = any(term in text.lower() for term in self.TECHNICAL_TERMS)
+        return self.needs_rephrasing_from_features(compute_text_features([text])[0])
 
-        # Detect passive voice using regex
-        has_passive_voice = bool(re.search(self.PASSIVE_VOICE_PATTERN, text.lower()))
-
-        # Determine if text needs rephrasing
-        return (avg_sentence_length > self.HIGH_COMPLEXITY_THRESHOLD or
-                readability_score > self.READABILITY_THRESHOLD or
-                has_technical_jargon or
-                has_passive_voice)
+    def needs_rephrasing_from_features(self, features: Dict[str, Any]) -> bool:
+        """
+        Determine if text needs rephrasing from its precomputed text features.
+        """
+        return (features["avg_sentence_length"] > self.HIGH_COMPLEXITY_THRESHOLD or
+                features["readability_grade"] > self.READABILITY_THRESHOLD or
+                features["has_technical_jargon"] or
+                features["has_passive_voice"])
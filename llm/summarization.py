@@ -1,5 +1,6 @@
 from typing import List, Dict, Any, Optional
 from llm.llm_manager import LLMManager
+from config import SUMMARY_MIN_CHARS
 
 class TextSummarizer:
     def __init__(self, llm_manager: LLMManager):
@@ -41,9 +42,14 @@ class TextSummarizer:
         
         return summary
     
-    def needs_summary(self, text: str, max_length: int = 1000) -> bool:
+    def needs_summary(self, text: str, max_length: int = SUMMARY_MIN_CHARS) -> bool:
         """
         Determine if text needs summarization based on length.
         """
-        #TO DO
-        return len(text) > max_length
\ No newline at end of file
+        return len(text) > max_length
+
+    def needs_summary_from_features(self, features: Dict[str, Any], max_length: int = SUMMARY_MIN_CHARS) -> bool:
+        """
+        Determine if text needs summarization from its precomputed text features.
+        """
+        return features["char_count"] > max_length
@@ -0,0 +1,125 @@
+import re
+from typing import List, Dict, Any, Tuple, Set
+
+from utils.helpers import extract_snippets, count_tokens, truncate_to_tokens
+from utils.metrics import span
+from config import CONTEXT_TOKEN_BUDGET, CONTEXT_MAX_RESULTS, CONTEXT_DEDUP_THRESHOLD
+
+
+class ContextPacker:
+    def __init__(self, token_budget: int = CONTEXT_TOKEN_BUDGET, max_results: int = CONTEXT_MAX_RESULTS,
+                 dedup_threshold: float = CONTEXT_DEDUP_THRESHOLD, shingle_size: int = 3):
+        """
+        Initialize the context packer.
+
+        Args:
+            token_budget: Maximum number of tokens in the packed context
+            max_results: Number of top search results to draw passages from
+            dedup_threshold: Shingle overlap above which a passage counts as a duplicate
+            shingle_size: Number of words per shingle used for duplicate detection
+        """
+        self.token_budget = token_budget
+        self.max_results = max_results
+        self.dedup_threshold = dedup_threshold
+        self.shingle_size = shingle_size
+
+    def pack(self, results: List[Dict[str, Any]], query: str) -> Tuple[str, Dict[str, Any]]:
+        """
+        Pack the most relevant, non-duplicate passages into the token budget.
+
+        Returns the packed context and the packing stats for the request.
+        """
+        candidates = self._collect_candidates(results, query)
+        raw_tokens = sum(candidate["tokens"] for candidate in candidates)
+
+        packed = []
+        kept_shingles = []
+        used_tokens = 0
+        duplicates_dropped = 0
+        over_budget_dropped = 0
+
+        # Greedy by relevance: best result first, best snippet of each result first
+        for candidate in sorted(candidates, key=lambda c: (-c["score"], c["rank"], c["snippet_rank"])):
+            shingles = self._shingles(candidate["snippet"])
+            if self._is_duplicate(shingles, kept_shingles):
+                duplicates_dropped += 1
+                continue
+
+            remaining = self.token_budget - used_tokens
+            passage = candidate["passage"]
+            tokens = candidate["tokens"]
+
+            if tokens > remaining:
+                # Only the first passage is cut down; later ones must fit whole
+                if packed:
+                    over_budget_dropped += 1
+                    continue
+                passage = truncate_to_tokens(passage, remaining)
+                tokens = count_tokens(passage)
+                if not passage:
+                    over_budget_dropped += 1
+                    continue
+
+            packed.append(passage)
+            kept_shingles.append(shingles)
+            used_tokens += tokens
+
+        stats = {
+            "token_budget": self.token_budget,
+            "candidate_passages": len(candidates),
+            "packed_passages": len(packed),
+            "duplicates_dropped": duplicates_dropped,
+            "over_budget_dropped": over_budget_dropped,
+            "raw_tokens": raw_tokens,
+            "packed_tokens": used_tokens,
+            "tokens_saved": max(raw_tokens - used_tokens, 0)
+        }
+        return "\n\n".join(packed), stats
+
+    def _collect_candidates(self, results: List[Dict[str, Any]], query: str) -> List[Dict[str, Any]]:
+        """
+        Turn the top search results into tagged candidate passages.
+        """
+        candidates = []
+        for rank, result in enumerate(results[:self.max_results]):
+            metadata = result["metadata"]
+            content = metadata.get("content", "")
+            source = metadata.get("document_title", "Unknown")
+            page = metadata.get("page_number", "")
+
+            with span("snippet_extraction"):
+                snippets = extract_snippets(content, query) or [content]
+            for snippet_rank, snippet in enumerate(snippets):
+                passage = f"[Source: {source}, Page: {page}] {snippet}"
+                candidates.append({
+                    "rank": rank,
+                    "snippet_rank": snippet_rank,
+                    "score": result.get("score", 0.0),
+                    "snippet": snippet,
+                    "passage": passage,
+                    "tokens": count_tokens(passage)
+                })
+
+        return candidates
+
+    def _shingles(self, text: str) -> Set[Tuple[str, ...]]:
+        """
+        Build the set of word shingles for a passage.
+        """
+        words = re.findall(r"\w+", text.lower())
+        if len(words) < self.shingle_size:
+            return {tuple(words)} if words else set()
+        return {tuple(words[i:i + self.shingle_size]) for i in range(len(words) - self.shingle_size + 1)}
+
+    def _is_duplicate(self, shingles: Set[Tuple[str, ...]], kept_shingles: List[Set[Tuple[str, ...]]]) -> bool:
+        """
+        Check whether a passage is mostly contained in one already packed.
+        """
+        if not shingles:
+            return True
+
+        for kept in kept_shingles:
+            overlap = len(shingles & kept) / min(len(shingles), len(kept))
+            if overlap >= self.dedup_threshold:
+                return True
+        return False
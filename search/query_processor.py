@@ -1,4 +1,5 @@
 import json
+from contextlib import nullcontext
 from typing import List, Dict, Any, Optional, Tuple
 import re
 
@@ -6,56 +7,98 @@ from search.semantic_search import SemanticSearch
 from llm.llm_manager import LLMManager
 from llm.summarization import TextSummarizer
 from llm.rephrasing import TextRephraser
-from utils.helpers import truncate_text_for_llm, extract_snippets
+from search.context_packer import ContextPacker
+from indexing.text_features import compute_text_features, aggregate_text_features
 from utils.cache import ResponseCache
+from utils.admission import AdmissionController
+from utils.metrics import span
+from config import DEFAULT_CLIENT_PRIORITY
 
 
 class QueryProcessor:
-    def __init__(self, search_engine: SemanticSearch, llm_manager: LLMManager, cache: ResponseCache):
+    def __init__(self, search_engine: SemanticSearch, llm_manager: LLMManager, cache: ResponseCache,
+                 admission: Optional[AdmissionController] = None):
         """
         Initialize the query processor.
+
+        With an AdmissionController, every LLM call of a query waits for a
+        slot; a query that is shed gets its search results without an LLM answer.
         """
         self.search_engine = search_engine
         self.llm_manager = llm_manager
+        self.admission = admission
         self.summarizer = TextSummarizer(llm_manager)
         self.rephraser = TextRephraser(llm_manager)
+        self.context_packer = ContextPacker()
         self.cache = cache
 
-    def process_query(self, query: str, detail_level: str = "medium") -> Dict[str, Any]:
+    def process_query(self, query: str, detail_level: str = "medium", collection=None,
+                      priority: str = DEFAULT_CLIENT_PRIORITY) -> Dict[str, Any]:
         """
         Process a query and return the result.
+
+        Pass a Collection to search its vector store instead of the default one.
+        The priority orders the query's LLM calls under admission control.
         """
 
         cache_key = f"{query}_{detail_level}"
-        cached_result = self.cache.get_cached_response(cache_key)
+        if collection is not None:
+            cache_key = f"{cache_key}_{collection.name}"
+        with span("query_cache_lookup"):
+            cached_result = self.cache.get_cached_response(cache_key)
         if cached_result:
             return json.loads(cached_result)
 
-        search_results = self.search_engine.search(query)
+        with span("semantic_search"):
+            search_results, embedding_model = self.search_engine.search_with_model(
+                query, collection.vector_store if collection else None
+            )
         need_llm = self.search_engine.determine_llm_need(search_results)
 
         result = {
             "query": query,
             "results": search_results,
             "used_llm": need_llm,
-            "detail_level": detail_level
+            "detail_level": detail_level,
+            "embedding_model": embedding_model
         }
 
         # No results, generate a fallback response
         if not search_results:
-            result["response"] = self._generate_fallback_response(query)
-            result["used_llm"] = True
-            result["response_type"] = "fallback"
+            with self._admit(priority) as shed_reason:
+                if shed_reason is None:
+                    with span("fallback_response"):
+                        result["response"] = self._generate_fallback_response(query)
+                    result["used_llm"] = True
+                    result["response_type"] = "fallback"
+                else:
+                    self._degrade(result, shed_reason)
 
         # Direct response from search results
         elif not need_llm:
             best_result = search_results[0]
             content = best_result["metadata"].get("content", "")
+            with span("text_features"):
+                features = self._get_result_features(search_results[:1])
 
             # Check if content needs summarization
-            if self.summarizer.needs_summary(content) and detail_level != "detailed":
-                content = self.summarizer.summarize(content, detail_level)
-                result["response_type"] = "summarized"
+            if self.summarizer.needs_summary_from_features(features) and detail_level != "detailed":
+                summary = best_result["metadata"].get("summaries", {}).get(detail_level)
+                if summary:
+                    content = summary
+                    result["summary_source"] = "precomputed"
+                    result["response_type"] = "summarized"
+                else:
+                    with self._admit(priority) as shed_reason:
+                        if shed_reason is None:
+                            with span("summarization"):
+                                content = self.summarizer.summarize(content, detail_level)
+                            result["summary_source"] = "llm"
+                            result["response_type"] = "summarized"
+                        else:
+                            # The best passage is still an answer, only unsummarized
+                            self._degrade(result, shed_reason)
+                            result["response_type"] = "direct"
             else:
                 if content[0].islower():
                     cutoff_index = next((i for i, char in enumerate(content) if char in ".?!"), None)
@@ -69,47 +112,77 @@ class QueryProcessor:
         # Enhanced response with LLM
         else:
             # Combine relevant passages
-            combined_text = self._combine_relevant_passages(search_results, query)
+            with span("context_packing"):
+                combined_text, context_stats = self._combine_relevant_passages(search_results, query)
+            with span("text_features"):
+                features = self._get_result_features(search_results[:self.context_packer.max_results])
 
             # Generate enhanced response
-            response = self._generate_enhanced_response(combined_text, query, detail_level)
-
-            result["response"] = response
-            result["response_type"] = "enhanced"
+            with self._admit(priority) as shed_reason:
+                if shed_reason is None:
+                    with span("enhanced_response"):
+                        response = self._generate_enhanced_response(combined_text, query, detail_level, features)
+
+                    result["response"] = response
+                    result["response_type"] = "enhanced"
+                    result["context_stats"] = context_stats
+                else:
+                    self._degrade(result, shed_reason)
         
         return result
 
-    def _combine_relevant_passages(self, results: List[Dict[str, Any]], query: str) -> str:
+    def _admit(self, priority: str):
+        """Context manager yielding None once the query may call the LLM, else why it may not."""
+        if self.admission is None:
+            return nullcontext(None)
+        return self.admission.admit(priority)
+
+    def _degrade(self, result: Dict[str, Any], shed_reason: str) -> None:
+        """Turn a result into a search-results-only answer."""
+        result["response"] = None
+        result["response_type"] = "search_only"
+        result["used_llm"] = False
+        result["degraded"] = True
+        result["degraded_reason"] = shed_reason
+
+    def _combine_relevant_passages(self, results: List[Dict[str, Any]], query: str) -> Tuple[str, Dict[str, Any]]:
         """
-        Combine relevant passages from search results.
+        Combine relevant passages from search results into a token-budgeted context.
         """
         if not results:
-            return ""
+            return "", {}
 
-        passages = []
-        for i, result in enumerate(results[:3]):
-            content = result["metadata"].get("content", "")
-            source = result["metadata"].get("document_title", "Unknown")
-            page = result["metadata"].get("page_number", "")
+        return self.context_packer.pack(results, query)
 
-            snippets = extract_snippets(content, query)
+    def _get_result_features(self, results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Aggregate the text features stored with the result chunks.
 
-            if snippets:
-                for snippet in snippets:
-                    passages.append(f"[Source: {source}, Page: {page}] {snippet}")
+        Chunks indexed before features were stored are analysed on the fly.
+        """
+        features_list = []
+        missing = []
+        for result in results:
+            features = result["metadata"].get("features")
+            if features:
+                features_list.append(features)
             else:
-                passages.append(f"[Source: {source}, Page: {page}] {content}")
+                missing.append(result["metadata"].get("content", ""))
 
-        combined_text = "\n\n".join(passages)
-        return truncate_text_for_llm(combined_text)
+        features_list.extend(compute_text_features(missing))
+        return aggregate_text_features(features_list)
 
-    def _generate_enhanced_response(self, text: str, query: str, detail_level: str) -> str:
+    def _generate_enhanced_response(self, text: str, query: str, detail_level: str,
+                                    features: Optional[Dict[str, Any]] = None) -> str:
         """
         Generate an enhanced response using LLM.
         """
+        if features is None:
+            features = compute_text_features([text])[0]
+
         # Determine if we need to summarize, rephrase, or both
-        needs_summary = self.summarizer.needs_summary(text)
-        needs_rephrasing = self.rephraser.needs_rephrasing(text)
+        needs_summary = self.summarizer.needs_summary_from_features(features)
+        needs_rephrasing = self.rephraser.needs_rephrasing_from_features(features)
 
         system_prompt = (
             f"You are a helpful assistant that provides accurate answers based on the given context. "
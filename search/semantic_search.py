@@ -3,7 +3,8 @@ from typing import List, Dict, Any, Optional, Tuple
 
 from indexing.embeddings import EmbeddingGenerator
 from indexing.vector_store import VectorStore
-from config import TOP_K_RESULTS, SIMILARITY_THRESHOLD
+from utils.metrics import span
+from config import TOP_K_RESULTS, SIMILARITY_THRESHOLD, MAX_SEARCH_FETCH
 
 
 class SemanticSearch:
@@ -23,15 +24,38 @@ class SemanticSearch:
         self.top_k = top_k
         self.threshold = threshold
 
-    def search(self, query: str) -> List[Dict[str, Any]]:
+    def search(self, query: str, vector_store: Optional[VectorStore] = None) -> List[Dict[str, Any]]:
         """
-        Perform a semantic search for a query.
+        Perform a semantic search for a query, in the given vector store
+        (e.g. a collection's) or the default one.
         """
+        return self.search_with_model(query, vector_store)[0]
 
-        query_embedding = self.embedding_generator.get_embedding(query)
-        results = self.vector_store.search(query_embedding, self.top_k)
-        filtered_results = [result for result in results if result["score"] >= self.threshold]
-        return filtered_results
+    def search_with_model(self, query: str,
+                          vector_store: Optional[VectorStore] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Like search(), but also return the embedding model the query was embedded with.
+        """
+        with span("query_embedding"):
+            embeddings, model = self.embedding_generator.embed([query])
+
+        # Scores are only meaningful between vectors of the same model; vectors
+        # indexed before models were recorded are kept. Hits of other models are
+        # skipped, so more are fetched until top_k remain or no more can match.
+        store = vector_store or self.vector_store
+        fetch_k = self.top_k
+        with span("vector_search"):
+            while True:
+                results = store.search(embeddings[0], fetch_k)
+                filtered_results = [
+                    result for result in results
+                    if result["score"] >= self.threshold and result["metadata"].get("embedding_model", model) == model
+                ]
+                if (len(filtered_results) >= self.top_k or len(results) < fetch_k or fetch_k >= MAX_SEARCH_FETCH
+                        or results[-1]["score"] < self.threshold):
+                    break
+                fetch_k = min(fetch_k * 4, MAX_SEARCH_FETCH)
+        return filtered_results[:self.top_k], model
 
     def get_query_hash(self, query: str) -> str:
         """
@@ -0,0 +1,149 @@
+import heapq
+import itertools
+import threading
+from contextlib import contextmanager
+from typing import Dict, Any, List, Optional, Iterator
+
+from config import LLM_MAX_CONCURRENCY, LLM_QUEUE_SIZE, LLM_QUEUE_TIMEOUT_SECONDS, LLM_PRIORITIES
+from utils.metrics import REGISTRY, span
+
+QUEUE_FULL = "queue_full"
+EVICTED = "evicted"
+TIMEOUT = "timeout"
+
+LLM_QUEUE_DEPTH = REGISTRY.gauge(
+    "pdf_search_llm_queue_depth", "Queries waiting for an LLM slot by priority")
+LLM_IN_FLIGHT = REGISTRY.gauge(
+    "pdf_search_llm_in_flight", "Queries holding an LLM slot")
+LLM_ADMITTED = REGISTRY.counter(
+    "pdf_search_llm_admitted_total", "Queries admitted to the LLM by priority")
+LLM_SHED = REGISTRY.counter(
+    "pdf_search_llm_shed_total", "Queries answered without the LLM by priority and reason (queue_full, evicted, timeout)")
+
+
+class _Waiter:
+    def __init__(self, rank: int, sequence: int):
+        self.rank = rank
+        self.sequence = sequence
+        self.event = threading.Event()
+        self.admitted = False
+        self.shed_reason: Optional[str] = None
+
+    def __lt__(self, other: "_Waiter") -> bool:
+        return (self.rank, self.sequence) < (other.rank, other.sequence)
+
+
+class AdmissionController:
+    def __init__(self, max_concurrency: int = LLM_MAX_CONCURRENCY, max_queue: int = LLM_QUEUE_SIZE,
+                 queue_timeout: float = LLM_QUEUE_TIMEOUT_SECONDS, priorities=LLM_PRIORITIES):
+        """
+        Bound the LLM work a process takes on.
+
+        At most max_concurrency queries hold a slot; up to max_queue more wait
+        for one, highest priority first (priorities are listed highest first),
+        then in arrival order. A query that finds the queue full takes the
+        place of the newest waiter of a lower priority, or is shed. A waiter
+        that gets no slot within queue_timeout seconds is shed too.
+        """
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.priorities = list(priorities)
+        self.ranks = {priority: rank for rank, priority in enumerate(self.priorities)}
+        self.in_flight = 0
+        self.waiting: List[_Waiter] = []
+        self.shed: Dict[str, int] = {}
+        self.sequence = itertools.count()
+        self.lock = threading.Lock()
+        self._update_gauges()
+
+    @contextmanager
+    def admit(self, priority: str) -> Iterator[Optional[str]]:
+        """
+        Hold an LLM slot for the duration of the block.
+
+        Yields None once admitted, or the reason the query was shed, in which
+        case the caller answers without the LLM.
+        """
+        shed_reason = self._acquire(priority)
+        try:
+            yield shed_reason
+        finally:
+            if shed_reason is None:
+                self._release()
+
+    def _acquire(self, priority: str) -> Optional[str]:
+        if priority not in self.ranks:
+            raise ValueError(f"Unknown priority: {priority}")
+        rank = self.ranks[priority]
+
+        with self.lock:
+            if self.in_flight < self.max_concurrency and not self.waiting:
+                self.in_flight += 1
+                self._update_gauges()
+                LLM_ADMITTED.inc(priority=priority)
+                return None
+
+            if len(self.waiting) >= self.max_queue:
+                victim = max(self.waiting, key=lambda waiter: (waiter.rank, waiter.sequence), default=None)
+                if victim is None or victim.rank <= rank:
+                    return self._record_shed(priority, QUEUE_FULL)
+                self.waiting.remove(victim)
+                heapq.heapify(self.waiting)
+                victim.shed_reason = EVICTED
+                victim.event.set()
+
+            waiter = _Waiter(rank, next(self.sequence))
+            heapq.heappush(self.waiting, waiter)
+            self._update_gauges()
+
+        with span("llm_queue_wait"):
+            waiter.event.wait(self.queue_timeout)
+
+        with self.lock:
+            if waiter.admitted:
+                LLM_ADMITTED.inc(priority=priority)
+                return None
+            if waiter.shed_reason is None:
+                self.waiting.remove(waiter)
+                heapq.heapify(self.waiting)
+                waiter.shed_reason = TIMEOUT
+                self._update_gauges()
+            return self._record_shed(priority, waiter.shed_reason)
+
+    def _release(self) -> None:
+        with self.lock:
+            if self.waiting:
+                # The slot passes straight to the next waiter
+                waiter = heapq.heappop(self.waiting)
+                waiter.admitted = True
+                waiter.event.set()
+            else:
+                self.in_flight -= 1
+            self._update_gauges()
+
+    def _record_shed(self, priority: str, reason: str) -> str:
+        self.shed[reason] = self.shed.get(reason, 0) + 1
+        LLM_SHED.inc(priority=priority, reason=reason)
+        return reason
+
+    def _update_gauges(self) -> None:
+        depth = {priority: 0 for priority in self.priorities}
+        for waiter in self.waiting:
+            depth[self.priorities[waiter.rank]] += 1
+        for priority, count in depth.items():
+            LLM_QUEUE_DEPTH.set(count, priority=priority)
+        LLM_IN_FLIGHT.set(self.in_flight)
+
+    def status(self) -> Dict[str, Any]:
+        with self.lock:
+            waiting = {priority: 0 for priority in self.priorities}
+            for waiter in self.waiting:
+                waiting[self.priorities[waiter.rank]] += 1
+            return {
+                "in_flight": self.in_flight,
+                "max_concurrency": self.max_concurrency,
+                "waiting": waiting,
+                "max_queue": self.max_queue,
+                "shed": dict(self.shed)
+            }
@@ -0,0 +1,70 @@
+import time
+import threading
+from typing import Dict, Any
+
+from utils.metrics import REGISTRY
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+BREAKER_TRANSITIONS = REGISTRY.counter(
+    "pdf_search_circuit_breaker_transitions_total", "Circuit breaker state changes by breaker and new state")
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, failure_threshold: int = 3, reset_timeout: float = 30.0):
+        """
+        Stop calling a failing dependency for a while, then probe it.
+
+        After failure_threshold consecutive failures the breaker opens and
+        allow() refuses calls. Once reset_timeout seconds have passed it lets
+        a single probe call through (half-open): a success closes it again, a
+        failure re-opens it for another reset_timeout. A probe that reports
+        nothing for reset_timeout is taken as lost and another is allowed.
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probe_started_at = 0.0
+        self.lock = threading.Lock()
+
+    def _set_state(self, state: str) -> None:
+        if state != self.state:
+            self.state = state
+            BREAKER_TRANSITIONS.inc(breaker=self.name, state=state)
+
+    def allow(self) -> bool:
+        """Whether a call may go through now; a True in half-open state is the probe."""
+        with self.lock:
+            if self.state == CLOSED:
+                return True
+            now = time.monotonic()
+            if self.state == OPEN and now - self.opened_at >= self.reset_timeout:
+                self._set_state(HALF_OPEN)
+                self.probe_started_at = now
+                return True
+            if self.state == HALF_OPEN and now - self.probe_started_at >= self.reset_timeout:
+                self.probe_started_at = now
+                return True
+            # Open, or half-open with the probe still in flight
+            return False
+
+    def record_success(self) -> None:
+        with self.lock:
+            self.failures = 0
+            self._set_state(CLOSED)
+
+    def record_failure(self) -> None:
+        with self.lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+                self._set_state(OPEN)
+
+    def status(self) -> Dict[str, Any]:
+        with self.lock:
+            return {"state": self.state, "consecutive_failures": self.failures}
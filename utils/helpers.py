@@ -1,9 +1,33 @@
 import os
 import re
 import json
-from typing import Dict, Any, List, Optional
+import hashlib
+import tempfile
+from functools import lru_cache
+from typing import Dict, Any, List, Optional, Tuple
 from werkzeug.utils import secure_filename
-from config import ALLOWED_EXTENSIONS, UPLOAD_FOLDER
+from config import ALLOWED_EXTENSIONS, UPLOAD_FOLDER, TOKENIZER_ENCODING, MAX_SNIPPETS
+
+# Rough stand-in for a BPE tokenizer: words and individual punctuation marks
+APPROX_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+ELLIPSIS = "..."
+# Where tiktoken downloads the BPE file of an encoding from, and caches it under a hash of
+TIKTOKEN_URL = "https://openaipublic.blob.core.windows.net/encodings/{encoding}.tiktoken"
+QUERY_TERM_PATTERN = re.compile(r'\b\w+\b')
+
+# Words too common to say anything about where the answer is
+STOPWORDS = frozenset({
+    "a", "about", "above", "after", "again", "all", "am", "an", "and", "any", "are", "as", "at",
+    "be", "because", "been", "before", "being", "below", "between", "both", "but", "by",
+    "can", "could", "did", "do", "does", "doing", "down", "during", "each", "few", "for", "from",
+    "further", "had", "has", "have", "having", "he", "her", "here", "hers", "him", "his", "how",
+    "i", "if", "in", "into", "is", "it", "its", "itself", "just", "me", "more", "most", "my",
+    "no", "nor", "not", "now", "of", "off", "on", "once", "only", "or", "other", "our", "ours",
+    "out", "over", "own", "same", "she", "should", "so", "some", "such", "than", "that", "the",
+    "their", "theirs", "them", "then", "there", "these", "they", "this", "those", "through",
+    "to", "too", "under", "until", "up", "very", "was", "we", "were", "what", "when", "where",
+    "which", "while", "who", "whom", "why", "will", "with", "would", "you", "your", "yours"
+})
 
 def allowed_file(filename: str) -> bool:
     """
@@ -11,49 +35,181 @@ def allowed_file(filename: str) -> bool:
     """
     return '.' in filename and filename.rsplit('.',1)[1].lower() in ALLOWED_EXTENSIONS
 
-def save_uploaded_file(file) -> str:
-    filename = secure_filename(file.filename)
-    os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-    file_path = os.path.join(UPLOAD_FOLDER, filename)
-    file.save(file_path)
-    return file_path
+def upload_path(filename: str, subfolder: Optional[str] = None) -> str:
+    """
+    Where an uploaded file is kept in UPLOAD_FOLDER.
+    """
+    folder = os.path.join(UPLOAD_FOLDER, subfolder) if subfolder else UPLOAD_FOLDER
+    return os.path.join(folder, secure_filename(filename))
+
+def hash_stream(stream, block_size: int = 1 << 20) -> str:
+    """
+    SHA-256 of a binary stream, read in blocks and rewound afterwards.
+    """
+    digest = hashlib.sha256()
+    for block in iter(lambda: stream.read(block_size), b""):
+        digest.update(block)
+    stream.seek(0)
+    return digest.hexdigest()
+
+def hash_file(file_path: str) -> str:
+    """
+    SHA-256 of a file's content.
+    """
+    with open(file_path, 'rb') as f:
+        return hash_stream(f)
+
+def write_json_atomic(path: str, data: Any) -> None:
+    """
+    Write JSON to a file so that readers never see it half-written.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+@lru_cache(maxsize=1)
+def _get_token_encoder():
+    """
+    Load the tiktoken encoder once, or None if it is unavailable.
+
+    The encoding is only loaded from tiktoken's cache: on a cold cache,
+    tiktoken would download it, which hangs an offline start.
+    """
+    cache_dir = os.environ.get("TIKTOKEN_CACHE_DIR", os.environ.get(
+        "DATA_GYM_CACHE_DIR", os.path.join(tempfile.gettempdir(), "data-gym-cache")))
+    cache_key = hashlib.sha1(TIKTOKEN_URL.format(encoding=TOKENIZER_ENCODING).encode()).hexdigest()
+    if not os.path.exists(os.path.join(cache_dir, cache_key)):
+        print(f"Tokenizer {TOKENIZER_ENCODING} is not cached in {cache_dir}; using approximate token counts. "
+              f"Run `python -c \"import tiktoken; tiktoken.get_encoding('{TOKENIZER_ENCODING}')\"` once to cache it.")
+        return None
+
+    try:
+        import tiktoken
+        return tiktoken.get_encoding(TOKENIZER_ENCODING)
+    except Exception as e:
+        print(f"Tokenizer unavailable: {str(e)}. Falling back to approximate token counts.")
+        return None
+
+def count_tokens(text: str) -> int:
+    """
+    Count the tokens in text with the configured tokenizer.
+    """
+    if not text:
+        return 0
+
+    encoder = _get_token_encoder()
+    if encoder is None:
+        return len(APPROX_TOKEN_PATTERN.findall(text))
+    return len(encoder.encode(text, disallowed_special=()))
 
-def truncate_text_for_llm(text: str, max_tokens: int = 4000) -> str:
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
     """
-    Truncate text to a maximum numbuer of tokens for LLM.
+    Cut text down to at most max_tokens tokens, ellipsis included.
     """
-    max_chars = max_tokens*4
-    if len(text) <= max_chars:
+    # The ellipsis is one BPE token but three approximate ones
+    kept_tokens = max_tokens - count_tokens(ELLIPSIS)
+
+    encoder = _get_token_encoder()
+    if encoder is None:
+        matches = list(APPROX_TOKEN_PATTERN.finditer(text))
+        if len(matches) <= max_tokens:
+            return text
+        if kept_tokens <= 0:
+            return ""
+        return text[:matches[kept_tokens - 1].end()] + ELLIPSIS
+
+    tokens = encoder.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
         return text
-    
-    truncated = text[:max_chars]
-    last_period = truncated.rfind('.')
+    if kept_tokens <= 0:
+        return ""
+    return encoder.decode(tokens[:kept_tokens]) + ELLIPSIS
 
-    if last_period > max_chars * 0.8:
-        return truncated[:last_period+1]
+@lru_cache(maxsize=1)
+def _has_punkt_data() -> bool:
+    """
+    Check the local NLTK data path for the punkt sentence tokenizer.
+    """
+    try:
+        import nltk
+        nltk.data.find("tokenizers/punkt_tab")
+        return True
+    except (ImportError, LookupError):
+        print("NLTK punkt_tab data not found locally; using a regex sentence splitter. "
+              "Run `python -m nltk.downloader punkt_tab` to install it.")
+        return False
 
-    return truncated + "..."
+def split_sentences(text: str) -> List[str]:
+    """
+    Split text into sentences, with NLTK if its data is installed.
+    """
+    if _has_punkt_data():
+        from nltk.tokenize import sent_tokenize
+        return sent_tokenize(text)
+    return [s for s in re.split(r'(?<=[.!?])\s+', text.strip()) if s]
 
-def extract_snippets(text: str, query: str, context_size: int = 100) -> List[str]:
+@lru_cache(maxsize=512)
+def _compile_terms_pattern(terms: Tuple[str, ...]) -> re.Pattern:
     """
-    Extract snippets from text that contain the query terms.
+    Compile (and cache) a case-insensitive pattern matching any of the terms.
     """
-    # Convert query to regex pattern
-    terms = re.findall(r'\b\w+\b', query.lower())
-    pattern = '|'.join(re.escape(term) for term in terms)
+    # Longest terms first so a term is not shadowed by one of its prefixes
+    alternation = '|'.join(re.escape(term) for term in sorted(terms, key=len, reverse=True))
+    return re.compile(rf'\b(?:{alternation})', re.IGNORECASE)
 
-    # Find all matches
-    matches = list(re.finditer(pattern, text.lower()))
+def get_query_terms(query: str) -> Tuple[str, ...]:
+    """
+    Extract the distinct, non-stopword terms of a query.
+    """
+    words = QUERY_TERM_PATTERN.findall(query.lower())
+    terms = [word for word in words if word not in STOPWORDS]
+    # A query made only of stopwords still needs something to match
+    return tuple(sorted(set(terms or words)))
 
-    if not matches:
+def extract_snippets(text: str, query: str, context_size: int = 100,
+                     max_snippets: int = MAX_SNIPPETS) -> List[str]:
+    """
+    Extract snippets from text that contain the query terms.
+
+    Match windows that overlap are merged into a single snippet in one pass,
+    and snippets are returned best first by query-term density.
+    """
+    terms = get_query_terms(query)
+    if not terms or not text:
         return []
 
-    snippets = []
-    for match in matches:
+    pattern = _compile_terms_pattern(terms)
+
+    intervals = []
+    current = None
+    for match in pattern.finditer(text):
         start = max(0, match.start() - context_size)
         end = min(len(text), match.end() + context_size)
+        term = match.group(0).lower()
 
-        # Extract snippet
+        if current and start <= current["end"]:
+            current["end"] = end
+            current["hits"] += 1
+            current["terms"].add(term)
+        else:
+            if current:
+                intervals.append(current)
+            current = {"start": start, "end": end, "hits": 1, "terms": {term}}
+
+    if current is None:
+        return []
+    intervals.append(current)
+
+    # Density of query terms, weighted by how many distinct terms the window covers
+    def density(interval: Dict[str, Any]) -> float:
+        coverage = len(interval["terms"]) / len(terms)
+        return coverage * interval["hits"] / (interval["end"] - interval["start"])
+
+    snippets = []
+    for interval in sorted(intervals, key=density, reverse=True)[:max_snippets]:
+        start, end = interval["start"], interval["end"]
         snippet = text[start:end]
 
         # Add ellipsis if needed
@@ -64,6 +220,4 @@ def extract_snippets(text: str, query: str, context_size: int = 100) -> List[str
 
         snippets.append(snippet)
 
-    # Remove duplicates and sort by length
-    unique_snippets = list(set(snippets))
-    return sorted(unique_snippets, key=len)
\ No newline at end of file
+    return snippets
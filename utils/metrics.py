@@ -0,0 +1,179 @@
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Dict, Any, Optional, Tuple, List
+
+from config import METRICS_LATENCY_BUCKETS
+
+# Timings of the request being handled in the current thread, if it asked for them
+_current_timings: contextvars.ContextVar = contextvars.ContextVar("pdf_search_timings", default=None)
+
+LabelValues = Tuple[Tuple[str, str], ...]
+
+
+def _format_labels(labels: LabelValues, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str):
+        """
+        Monotonic counter with optional labels.
+        """
+        self.name = name
+        self.documentation = documentation
+        self.values: Dict[LabelValues, float] = {}
+        self.lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            self.values[key] = self.values.get(key, 0.0) + amount
+
+    def expose(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self.lock:
+            for labels, value in sorted(self.values.items()):
+                lines.append(f"{self.name}{_format_labels(labels)} {value}")
+        return lines
+
+
+class Gauge:
+    def __init__(self, name: str, documentation: str):
+        """
+        Value that goes up and down, with optional labels.
+        """
+        self.name = name
+        self.documentation = documentation
+        self.values: Dict[LabelValues, float] = {}
+        self.lock = threading.Lock()
+
+    def set(self, value: float, **labels) -> None:
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            self.values[key] = value
+
+    def expose(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge"]
+        with self.lock:
+            for labels, value in sorted(self.values.items()):
+                lines.append(f"{self.name}{_format_labels(labels)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, buckets: List[float] = METRICS_LATENCY_BUCKETS):
+        """
+        Histogram with fixed cumulative buckets and optional labels.
+        """
+        self.name = name
+        self.documentation = documentation
+        self.buckets = sorted(buckets)
+        self.values: Dict[LabelValues, Dict[str, Any]] = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            series = self.values.get(key)
+            if series is None:
+                series = self.values[key] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series["counts"][i] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    def expose(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            for labels, series in sorted(self.values.items()):
+                for bound, count in zip(self.buckets, series["counts"]):
+                    lines.append(f"{self.name}_bucket{_format_labels(labels, ('le', repr(float(bound))))} {count}")
+                lines.append(f"{self.name}_bucket{_format_labels(labels, ('le', '+Inf'))} {series['count']}")
+                lines.append(f"{self.name}_sum{_format_labels(labels)} {series['sum']}")
+                lines.append(f"{self.name}_count{_format_labels(labels)} {series['count']}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        """
+        Collection of the process's metrics, exposed in Prometheus text format.
+        """
+        self.metrics: Dict[str, Any] = {}
+        self.lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, documentation: str, **kwargs):
+        with self.lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = self.metrics[name] = cls(name, documentation, **kwargs)
+            return metric
+
+    def counter(self, name: str, documentation: str) -> Counter:
+        return self._get_or_create(Counter, name, documentation)
+
+    def gauge(self, name: str, documentation: str) -> Gauge:
+        return self._get_or_create(Gauge, name, documentation)
+
+    def histogram(self, name: str, documentation: str, buckets: List[float] = METRICS_LATENCY_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, documentation, buckets=buckets)
+
+    def expose(self) -> str:
+        """Render all metrics in the Prometheus text exposition format."""
+        with self.lock:
+            metrics = list(self.metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.expose())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "pdf_search_stage_duration_seconds", "Time spent in each stage of handling a request")
+REQUEST_SECONDS = REGISTRY.histogram(
+    "pdf_search_request_duration_seconds", "End-to-end request latency by endpoint")
+LLM_TOKENS = REGISTRY.counter(
+    "pdf_search_llm_tokens_total", "LLM tokens by provider, model and direction (prompt or completion)")
+LLM_REQUESTS = REGISTRY.counter(
+    "pdf_search_llm_requests_total", "LLM requests by provider, model and outcome")
+LLM_HEDGES = REGISTRY.counter(
+    "pdf_search_llm_hedges_total", "Hedged LLM calls by outcome (sent, primary_won, backup_won)")
+
+
+@contextmanager
+def span(stage: str):
+    """
+    Time a stage of request handling.
+
+    The duration is recorded in the stage histogram and, if the current
+    request collects timings, added to its timings block.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, stage=stage)
+        timings = _current_timings.get()
+        if timings is not None:
+            timings[stage] = timings.get(stage, 0.0) + elapsed * 1000
+
+
+def start_request_timings() -> Dict[str, float]:
+    """Collect the stage timings of the current request, in milliseconds."""
+    timings: Dict[str, float] = {}
+    _current_timings.set(timings)
+    return timings
+
+
+def stop_request_timings() -> None:
+    _current_timings.set(None)
@@ -0,0 +1,109 @@
+import io
+import os
+import mmap
+import tempfile
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Iterator, Optional
+from flask import Request
+
+from config import UPLOAD_SPOOL_THRESHOLD_MB
+
+
+class UploadRequest(Request):
+    """
+    Flask request that keeps file uploads in memory up to the spool threshold.
+
+    Werkzeug writes the multipart body into the stream chunk by chunk; a
+    SpooledTemporaryFile moves to disk once it outgrows the threshold.
+    """
+    spool_threshold = UPLOAD_SPOOL_THRESHOLD_MB * 1024 * 1024
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return tempfile.SpooledTemporaryFile(max_size=self.spool_threshold)
+
+
+def _memory_buffer(stream) -> Optional[io.BytesIO]:
+    """The in-memory buffer behind an upload stream, or None once it is on disk."""
+    if isinstance(stream, io.BytesIO):
+        return stream
+    if isinstance(stream, tempfile.SpooledTemporaryFile) and not stream._rolled:
+        return stream._file
+    return None
+
+
+@contextmanager
+def upload_content(stream) -> Iterator[memoryview]:
+    """
+    The bytes of an uploaded file without copying them: a view of the
+    in-memory buffer, or of a memory map of the spool file.
+
+    The view is only valid inside the with block.
+    """
+    buffer = _memory_buffer(stream)
+    mapped = None
+    if buffer is not None:
+        view = buffer.getbuffer()
+    else:
+        stream.flush()
+        mapped = mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(mapped)
+    try:
+        yield view
+    finally:
+        view.release()
+        if mapped is not None:
+            mapped.close()
+
+
+class UploadPersister:
+    def __init__(self, max_workers: int = 2):
+        """
+        Write uploaded PDFs to UPLOAD_FOLDER in the background, after they
+        have been parsed from the request buffer.
+        """
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="persist-upload")
+
+    def submit(self, stream, file_path: str) -> Future:
+        """
+        Save an upload stream to file_path in the background.
+
+        The request closes its streams when it ends, so an in-memory upload
+        is copied first and a spooled one is kept open through a duplicate
+        file descriptor.
+        """
+        buffer = _memory_buffer(stream)
+        if buffer is not None:
+            source = buffer.getvalue()
+        else:
+            stream.flush()
+            source = os.dup(stream.fileno())
+        return self.executor.submit(self._save, source, file_path)
+
+    def _save(self, source, file_path: str, block_size: int = 1 << 20) -> None:
+        # Written under a temporary name so a half-written file is never mistaken for the upload
+        part_path = f"{file_path}.part"
+        try:
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            with open(part_path, "wb") as f:
+                if isinstance(source, bytes):
+                    f.write(source)
+                else:
+                    # pread leaves the offset shared with the request's descriptor alone
+                    offset = 0
+                    while True:
+                        block = os.pread(source, block_size, offset)
+                        if not block:
+                            break
+                        f.write(block)
+                        offset += len(block)
+            os.replace(part_path, file_path)
+        except Exception as e:
+            print(f"Error saving upload {file_path}: {str(e)}")
+        finally:
+            if not isinstance(source, bytes):
+                os.close(source)
+
+    def close(self) -> None:
+        """Wait for pending writes."""
+        self.executor.shutdown(wait=True)